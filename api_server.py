@@ -0,0 +1,265 @@
+"""
+Headless HTTP API for blog generation, for CMS and other integrations.
+
+    python api_server.py --port 8080
+    uvicorn api_server:app --port 8080
+
+Jobs go through the same JobExecutor as the Streamlit app: a bounded
+priority queue drained by `--concurrency` workers. When the queue is full,
+POST /jobs answers 429 with a Retry-After estimate instead of queueing more.
+
+    POST   /jobs                  submit -> 202 {job_id, ...}
+    GET    /jobs/{job_id}         status, progress and queue position
+    GET    /jobs/{job_id}/result  outputs once done (202 while pending)
+    GET    /jobs/{job_id}/events  server-sent events of per-stage progress
+    DELETE /jobs/{job_id}         cancel a queued or running job
+    GET    /health, GET /metrics
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import os
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Literal, Optional
+
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+import pipeline
+from utils.metrics import metrics
+
+if TYPE_CHECKING:
+    from pipeline import Job, JobExecutor
+
+USER_ID = "api_user"
+DEFAULT_QUEUE_SIZE = int(os.getenv("API_QUEUE_SIZE", "100"))
+DEFAULT_KEEP_FINISHED = int(os.getenv("API_KEEP_FINISHED", "1000"))
+# SSE: how often a stream checks its job, and how often it sends a keep-alive comment
+EVENT_POLL_SEC = 0.25
+KEEPALIVE_SEC = 15.0
+
+
+class JobRequest(BaseModel):
+    topic: str = Field(min_length=1)
+    tone: str = "Professional"
+    audience: str = "beginner developers"
+    word_count: int = Field(1500, ge=100, le=10000)
+    extra_instructions: str = ""
+    priority: Literal["high", "normal", "low"] = "normal"
+    research_mode: Literal[pipeline.RESEARCH_MODES] = "agent"
+    draft_mode: Literal[pipeline.DRAFT_MODES] = "single"
+    review_mode: Literal[pipeline.REVIEW_MODES] = "full"
+    recall: bool = True
+    use_cache: bool = True
+
+
+def build_executor(
+    concurrency: Optional[int] = None,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    keep_finished: int = DEFAULT_KEEP_FINISHED,
+) -> JobExecutor:
+    """
+    The API's AgentRuntime, with the default tools assigned, behind a
+    bounded JobExecutor (`concurrency` defaults to JOB_CONCURRENCY).
+    """
+    load_dotenv()
+    from config import config
+    from utils.genai_client import share_agent_models
+
+    runtime = pipeline.AgentRuntime(
+        app_name=config.APP_NAME,
+        user_id=USER_ID,
+        cache=pipeline.ResponseCache(),
+        keep_sessions=config.KEEP_SESSIONS,
+        session_ttl_sec=config.SESSION_TTL_SEC,
+    )
+    pipeline.assign_tools(pipeline.BLOG_AGENTS, pipeline.default_tools())
+    share_agent_models(pipeline.BLOG_AGENTS)
+    return pipeline.JobExecutor(
+        runtime,
+        concurrency=concurrency or pipeline.DEFAULT_JOB_CONCURRENCY,
+        keep_finished=keep_finished,
+        max_queued=queue_size,
+    )
+
+
+def _status(executor: JobExecutor, job: Job) -> Dict[str, Any]:
+    snap = job.snapshot(since=len(job.events))
+    for key in ("text", "prompts", "events", "version"):
+        snap.pop(key)
+    snap["position"] = executor.position(job)
+    return snap
+
+
+def _retry_after(executor: JobExecutor) -> int:
+    """Seconds until a queue slot is likely to free up, from the mean job duration so far."""
+    durations = metrics.histogram("job_duration_seconds")
+    mean = durations.sum / durations.count if durations.count else 60.0
+    return max(1, math.ceil(mean / executor.concurrency))
+
+
+def _sse(event: Dict[str, Any]) -> str:
+    return f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+def create_app(executor: Optional[JobExecutor] = None, **executor_options: Any) -> FastAPI:
+    """
+    The ASGI app. Without `executor`, one is built on startup from
+    `executor_options` (see build_executor) and shut down on exit,
+    cancelling unfinished jobs; their completed stages stay checkpointed.
+    """
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        owned = executor is None
+        app.state.executor = build_executor(**executor_options) if owned else executor
+        try:
+            yield
+        finally:
+            if owned:
+                await asyncio.to_thread(app.state.executor.shutdown)
+
+    app = FastAPI(title="AI Blog Agent API", lifespan=lifespan)
+
+    def _job(request: Request, job_id: str) -> Job:
+        job = request.app.state.executor.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+        return job
+
+    @app.post("/jobs", status_code=202)
+    async def submit(body: JobRequest, request: Request):
+        executor: JobExecutor = request.app.state.executor
+        stages = pipeline.build_blog_pipeline(
+            research_mode=body.research_mode,
+            draft_mode=body.draft_mode,
+            review_mode=body.review_mode,
+            recall=body.recall,
+        )
+        try:
+            job = executor.submit(
+                pipeline.pipeline_inputs(body.topic, body.tone, body.audience, body.word_count, body.extra_instructions),
+                stages,
+                run_store=pipeline.RunStore(),
+                use_cache=body.use_cache,
+                stream=False,
+                session_prefix="api",
+                priority=body.priority,
+            )
+        except pipeline.JobQueueFull as exc:
+            return JSONResponse(
+                status_code=429,
+                content={"detail": str(exc)},
+                headers={"Retry-After": str(_retry_after(executor))},
+            )
+        return _status(executor, job)
+
+    @app.get("/jobs/{job_id}")
+    async def status(job_id: str, request: Request):
+        return _status(request.app.state.executor, _job(request, job_id))
+
+    @app.get("/jobs/{job_id}/result")
+    async def result(job_id: str, request: Request):
+        job = _job(request, job_id)
+        if not job.done:
+            return JSONResponse(status_code=202, content={"job_id": job_id, "status": job.status})
+        if job.status != "done":
+            return JSONResponse(
+                status_code=409, content={"job_id": job_id, "status": job.status, "error": job.error}
+            )
+        return {
+            "job_id": job_id,
+            "run_id": job.run_id,
+            "status": job.status,
+            "final": job.outputs.get("final", ""),
+            "outputs": job.outputs,
+            "failed_stages": job.failed_stages,
+        }
+
+    @app.delete("/jobs/{job_id}", status_code=202)
+    async def cancel(job_id: str, request: Request):
+        job = _job(request, job_id)
+        if not request.app.state.executor.cancel(job_id):
+            return JSONResponse(status_code=409, content={"job_id": job_id, "status": job.status})
+        # a running job stops at its next await
+        return {"job_id": job_id, "status": "cancelled" if job.done else "cancelling"}
+
+    @app.get("/jobs/{job_id}/events")
+    async def events(job_id: str, request: Request):
+        """
+        stage_start / stage_end / status events as they happen; ends after
+        the job finishes. Reconnecting with Last-Event-ID resumes after it.
+        """
+        job = _job(request, job_id)
+        last = request.headers.get("last-event-id", "")
+        since = int(last) + 1 if last.isdigit() else 0
+
+        async def stream() -> AsyncIterator[str]:
+            nonlocal since
+            idle = 0.0
+            while True:
+                done = job.done
+                fresh = job.events[since:]
+                for event in fresh:
+                    yield _sse(event)
+                since += len(fresh)
+                if done:
+                    return
+                if fresh:
+                    idle = 0.0
+                elif idle >= KEEPALIVE_SEC:
+                    idle = 0.0
+                    yield ": keep-alive\n\n"
+                if await request.is_disconnected():
+                    return
+                await asyncio.sleep(EVENT_POLL_SEC)
+                idle += EVENT_POLL_SEC
+
+        return StreamingResponse(
+            stream(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @app.get("/health")
+    async def health(request: Request):
+        return {"status": "ok", **request.app.state.executor.stats()}
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def prometheus():
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+    return app
+
+
+# `uvicorn api_server:app`; settings come from JOB_CONCURRENCY, API_QUEUE_SIZE and API_KEEP_FINISHED
+app = create_app()
+
+
+def main(argv=None) -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--concurrency", type=int, help="Pipelines run at once (default: JOB_CONCURRENCY or 4).")
+    parser.add_argument(
+        "--queue-size", type=int, default=DEFAULT_QUEUE_SIZE, help="Queued jobs before POST /jobs answers 429."
+    )
+    parser.add_argument(
+        "--keep-finished", type=int, default=DEFAULT_KEEP_FINISHED, help="Finished jobs kept for their results."
+    )
+    args = parser.parse_args(argv)
+    uvicorn.run(
+        create_app(concurrency=args.concurrency, queue_size=args.queue_size, keep_finished=args.keep_finished),
+        host=args.host,
+        port=args.port,
+    )
+
+
+if __name__ == "__main__":
+    main()
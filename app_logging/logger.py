@@ -1,11 +1,16 @@
+import atexit
+import datetime
+import gzip
 import json
 import os
+import queue
+import shutil
+import threading
 import time
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 
 LOG_DIR = "logs"
-os.makedirs(LOG_DIR, exist_ok=True)
 EVENT_LOG_PATH = os.path.join(LOG_DIR, "events.jsonl")
 
 
@@ -17,10 +22,41 @@ class AppLogger:
     - duration
     - tokens (if you add)
     - errors
+
+    `log_event` only puts the record on a bounded queue; a background thread
+    serialises records and writes them in batches (every `batch_size`
+    records or `flush_interval_sec`, whichever comes first) to a file it
+    keeps open. The file is rotated once it exceeds `max_bytes` or the day
+    changes, and rotated segments are gzipped when `compress` is set. When
+    the queue is full, events are dropped and counted rather than blocking
+    the caller. Pending events are flushed at interpreter exit.
     """
 
-    def __init__(self, path: str = EVENT_LOG_PATH) -> None:
+    def __init__(
+        self,
+        path: str = EVENT_LOG_PATH,
+        max_queue: int = 10_000,
+        batch_size: int = 256,
+        flush_interval_sec: float = 1.0,
+        max_bytes: int = 50 * 1024 * 1024,
+        rotate_daily: bool = True,
+        compress: bool = True,
+        max_field_chars: int = 2000,
+    ) -> None:
         self.path = path
+        self.batch_size = batch_size
+        self.flush_interval_sec = flush_interval_sec
+        self.max_bytes = max_bytes
+        self.rotate_daily = rotate_daily
+        self.compress = compress
+        self.max_field_chars = max_field_chars
+        self.dropped = 0
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._start_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._file = None
+        self._size = 0
+        self._day: Optional[datetime.date] = None
 
     def log_event(
         self,
@@ -41,12 +77,13 @@ class AppLogger:
             "duration_sec": duration_sec,
             "extra": extra or {},
         }
+        if self._thread is None:
+            self._start()
         try:
-            with open(self.path, "a", encoding="utf-8") as f:
-                f.write(json.dumps(record, ensure_ascii=False) + "\n")
-        except Exception:
-            # fail-soft: don't crash if logging fails
-            pass
+            self._queue.put_nowait(record)
+        except queue.Full:
+            # never block the caller; the count is reported with the next write
+            self.dropped += 1
 
     def log_error(self, agent: str, step: str, message: str, extra: Optional[Dict[str, Any]] = None) -> None:
         self.log_event(
@@ -57,6 +94,146 @@ class AppLogger:
             extra=extra,
         )
 
+    def flush(self, timeout: Optional[float] = 5.0) -> bool:
+        """Wait until every event logged so far is written; False on timeout."""
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self) -> None:
+        """Flush pending events and stop the writer thread."""
+        if self._thread is None:
+            return
+        self.flush()
+        try:
+            self._queue.put(None, timeout=1.0)
+        except queue.Full:
+            return
+        self._thread.join(timeout=5.0)
+        self._thread = None
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="app-logger", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
 
-app_logger = AppLogger()
+    def _run(self) -> None:
+        batch: List[Dict[str, Any]] = []
+        waiters: List[threading.Event] = []
+        deadline = time.monotonic() + self.flush_interval_sec
+        stop = False
+        while not stop:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+            except queue.Empty:
+                pass
+            if stop or waiters or len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._write(batch)
+                batch = []
+                for waiter in waiters:
+                    waiter.set()
+                waiters = []
+                deadline = time.monotonic() + self.flush_interval_sec
+        self._close_file()
 
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            batch.append(self._dropped_record(dropped))
+        if not batch:
+            return
+        try:
+            data = "".join(json.dumps(self._clip(r), ensure_ascii=False, default=str) + "\n" for r in batch)
+            self._rotate_if_needed(len(data.encode("utf-8")))
+            self._file.write(data)
+            self._file.flush()
+            self._size += len(data.encode("utf-8"))
+        except Exception:
+            # fail-soft: don't crash if logging fails
+            pass
+
+    @staticmethod
+    def _dropped_record(count: int) -> Dict[str, Any]:
+        return {
+            "ts": time.time(),
+            "event_type": "log_dropped",
+            "agent": None,
+            "step": None,
+            "message": f"{count} events dropped: log queue full",
+            "duration_sec": None,
+            "extra": {"dropped": count},
+        }
+
+    def _clip(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Cap long string fields so one record cannot hold a whole article."""
+        limit = self.max_field_chars
+
+        def clip(value: Any) -> Any:
+            if isinstance(value, str) and len(value) > limit:
+                return value[:limit] + f"…[+{len(value) - limit} chars]"
+            if isinstance(value, dict):
+                return {k: clip(v) for k, v in value.items()}
+            if isinstance(value, (list, tuple)):
+                return [clip(v) for v in value]
+            return value
+
+        return clip(record)
+
+    def _rotate_if_needed(self, incoming: int) -> None:
+        today = datetime.date.today()
+        if self._file is not None and (
+            (self._size and self._size + incoming > self.max_bytes) or (self.rotate_daily and today != self._day)
+        ):
+            self._close_file()
+            self._rotate(self._day)
+        if self._file is None:
+            if os.path.exists(self.path):
+                # a file left by an earlier process may already be due for rotation
+                size = os.path.getsize(self.path)
+                day = datetime.date.fromtimestamp(os.path.getmtime(self.path))
+                if size and (size + incoming > self.max_bytes or (self.rotate_daily and day != today)):
+                    self._rotate(day)
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+            self._size = self._file.tell()
+            self._day = today
+
+    def _rotate(self, day: Optional[datetime.date] = None) -> None:
+        """Move the current file aside as `<name>.<day>.<n>.jsonl[.gz]`."""
+        if not os.path.exists(self.path):
+            return
+        stem, ext = os.path.splitext(self.path)
+        day_str = (day or datetime.date.today()).isoformat()
+        n = 1
+        while any(os.path.exists(f"{stem}.{day_str}.{n}{ext}{gz}") for gz in ("", ".gz")):
+            n += 1
+        target = f"{stem}.{day_str}.{n}{ext}"
+        os.replace(self.path, target)
+        if self.compress:
+            with open(target, "rb") as src, gzip.open(target + ".gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(target)
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+app_logger = AppLogger()
@@ -0,0 +1,163 @@
+import contextvars
+import json
+import os
+import secrets
+import time
+import urllib.request
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+from .logger import app_logger
+
+SERVICE_NAME = "ai_blog_agent"
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    start: float = 0.0
+    end: Optional[float] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    status: str = "ok"
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update({k: v for k, v in attributes.items() if v is not None})
+
+    def to_record(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "end": self.end,
+            "attributes": self.attributes,
+            "status": self.status,
+        }
+
+
+_current: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def _new_span(name: str, attributes: Dict[str, Any], parent: Optional[Span]) -> Span:
+    span = Span(
+        name=name,
+        trace_id=parent.trace_id if parent else secrets.token_hex(16),
+        span_id=secrets.token_hex(8),
+        parent_id=parent.span_id if parent else None,
+        start=time.time(),
+    )
+    span.set(**attributes)
+    return span
+
+
+def _emit(span: Span) -> None:
+    app_logger.log_event(
+        event_type="span",
+        agent=span.attributes.get("agent"),
+        step=span.name,
+        duration_sec=(span.end or span.start) - span.start,
+        message=span.status,
+        extra=span.to_record(),
+    )
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    Time a block as a child of the current span (a new trace if there is
+    none). The span is current inside the block, so spans opened there,
+    including in asyncio tasks started from it, become its children. It is
+    written to the event log as a `span` event when the block exits.
+    """
+    current = _new_span(name, attributes, _current.get())
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.status = "error"
+        current.set(error=f"{type(exc).__name__}: {exc}")
+        raise
+    finally:
+        _current.reset(token)
+        current.end = time.time()
+        _emit(current)
+
+
+def record_span(name: str, start: float, end: float, status: str = "ok", **attributes: Any) -> Span:
+    """Log an already finished span (wall-clock `start`/`end`) under the current span."""
+    finished = _new_span(name, attributes, _current.get())
+    finished.start, finished.end, finished.status = start, end, status
+    _emit(finished)
+    return finished
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": value if isinstance(value, str) else json.dumps(value, default=str)}
+
+
+def to_otlp(spans: List[Dict[str, Any]], service_name: str = SERVICE_NAME) -> Dict[str, Any]:
+    """
+    Span records (as logged) in the OTLP/JSON trace format accepted by
+    OpenTelemetry collectors on /v1/traces.
+    """
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+                "scopeSpans": [
+                    {
+                        "scope": {"name": "app_logging.tracing"},
+                        "spans": [
+                            {
+                                "traceId": s["trace_id"],
+                                "spanId": s["span_id"],
+                                **({"parentSpanId": s["parent_id"]} if s.get("parent_id") else {}),
+                                "name": s["name"],
+                                "kind": 1,
+                                "startTimeUnixNano": str(int(s["start"] * 1e9)),
+                                "endTimeUnixNano": str(int((s.get("end") or s["start"]) * 1e9)),
+                                "attributes": [
+                                    {"key": k, "value": _otlp_value(v)} for k, v in s.get("attributes", {}).items()
+                                ],
+                                "status": {"code": 2 if s.get("status") == "error" else 1},
+                            }
+                            for s in spans
+                        ],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+def export_otlp(spans: List[Dict[str, Any]], target: str, timeout: float = 10.0) -> None:
+    """
+    Write spans as OTLP/JSON to a file, or POST them to a collector when
+    `target` is an http(s) URL (e.g. http://localhost:4318/v1/traces).
+    """
+    payload = json.dumps(to_otlp(spans)).encode("utf-8")
+    if target.startswith(("http://", "https://")):
+        request = urllib.request.Request(target, data=payload, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+        return
+    directory = os.path.dirname(target)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(target, "wb") as f:
+        f.write(payload)
@@ -0,0 +1,124 @@
+"""
+Render a run's trace waterfall from the event log, or export it as OTLP/JSON.
+
+    python -m app_logging.waterfall                     # latest run
+    python -m app_logging.waterfall --run <run_id>
+    python -m app_logging.waterfall --export trace.json
+    python -m app_logging.waterfall --export http://localhost:4318/v1/traces
+"""
+import argparse
+import glob
+import gzip
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Set
+
+from .logger import EVENT_LOG_PATH
+from .tracing import export_otlp
+
+
+def _log_files(path: str) -> List[str]:
+    """Rotated segments oldest first, then the live file."""
+    stem, ext = os.path.splitext(path)
+    rotated = glob.glob(f"{stem}.*{ext}") + glob.glob(f"{stem}.*{ext}.gz")
+    rotated.sort(key=os.path.getmtime)
+    return rotated + ([path] if os.path.exists(path) else [])
+
+
+def iter_spans(path: str = EVENT_LOG_PATH) -> Iterator[Dict]:
+    for file in _log_files(path):
+        opener = gzip.open if file.endswith(".gz") else open
+        with opener(file, "rt", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                if event.get("event_type") == "span" and event.get("extra", {}).get("trace_id"):
+                    yield event["extra"]
+
+
+def load_trace(path: str = EVENT_LOG_PATH, run_id: Optional[str] = None, trace_id: Optional[str] = None) -> List[Dict]:
+    """Spans of one trace: `trace_id`, the latest run with `run_id`, or the latest run."""
+    spans = list(iter_spans(path))
+    if trace_id is None:
+        roots = [
+            s for s in spans
+            if not s.get("parent_id") and (run_id is None or s.get("attributes", {}).get("run_id") == run_id)
+        ]
+        if not roots:
+            return []
+        trace_id = max(roots, key=lambda s: s["start"])["trace_id"]
+    return sorted((s for s in spans if s["trace_id"] == trace_id), key=lambda s: s["start"])
+
+
+def critical_path(spans: List[Dict]) -> Set[str]:
+    """Span ids on the chain that ends last: from each root, follow the child that finishes last."""
+    children: Dict[Optional[str], List[Dict]] = {}
+    for s in spans:
+        children.setdefault(s.get("parent_id"), []).append(s)
+    path: Set[str] = set()
+    level = children.get(None, [])
+    while level:
+        last = max(level, key=lambda s: s.get("end") or s["start"])
+        path.add(last["span_id"])
+        level = children.get(last["span_id"], [])
+    return path
+
+
+def _label(s: Dict) -> str:
+    attrs = s.get("attributes", {})
+    detail = attrs.get("stage") or attrs.get("agent") or attrs.get("tool") or attrs.get("topic") or ""
+    return f"{s['name']} {detail}".strip()
+
+
+def render(spans: List[Dict], width: int = 60) -> str:
+    if not spans:
+        return "No spans found."
+    t0 = min(s["start"] for s in spans)
+    total = max((s.get("end") or s["start"]) for s in spans) - t0 or 1e-9
+    ids = {s["span_id"] for s in spans}
+    children: Dict[Optional[str], List[Dict]] = {}
+    for s in spans:
+        parent = s.get("parent_id") if s.get("parent_id") in ids else None
+        children.setdefault(parent, []).append(s)
+    critical = critical_path(spans)
+
+    lines = [f"trace {spans[0]['trace_id']}  total {total:.2f}s  (* = critical path)", ""]
+
+    def walk(parent: Optional[str], depth: int) -> None:
+        for s in sorted(children.get(parent, []), key=lambda c: c["start"]):
+            start = s["start"] - t0
+            duration = (s.get("end") or s["start"]) - s["start"]
+            offset = int(start / total * width)
+            bar = "█" * max(1, int(round(duration / total * width)))
+            mark = "*" if s["span_id"] in critical else " "
+            status = " !" if s.get("status") == "error" else ""
+            name = ("  " * depth + _label(s))[:38]
+            lines.append(f"{mark} {name:<38} {start:7.2f}s {duration:7.2f}s |{' ' * offset}{bar}{status}")
+            walk(s["span_id"], depth + 1)
+
+    walk(None, 0)
+    return "\n".join(lines)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--log", default=EVENT_LOG_PATH, help="Event log to read (rotated segments are included).")
+    parser.add_argument("--run", metavar="RUN_ID", help="Show the latest trace of this run.")
+    parser.add_argument("--trace", metavar="TRACE_ID", help="Show this trace.")
+    parser.add_argument("--export", metavar="FILE_OR_URL", help="Write OTLP/JSON to a file or POST it to a collector.")
+    parser.add_argument("--width", type=int, default=60)
+    args = parser.parse_args(argv)
+
+    spans = load_trace(args.log, run_id=args.run, trace_id=args.trace)
+    if args.export:
+        if spans:
+            export_otlp(spans, args.export)
+        print(f"Exported {len(spans)} spans to {args.export}")
+        return
+    print(render(spans, args.width))
+
+
+if __name__ == "__main__":
+    main()
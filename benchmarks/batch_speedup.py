@@ -0,0 +1,49 @@
+"""
+Measure batch speedup against a stub model that only sleeps.
+
+    python -m benchmarks.batch_speedup --jobs 16 --latency 0.2
+    python -m benchmarks.batch_speedup --rpm 600   # under a client rate limit
+
+With six agents per job, serial wall time is roughly jobs * 6 * latency;
+batch wall time should shrink close to linearly up to the concurrency limit.
+"""
+import argparse
+import asyncio
+import time
+
+import main
+from pipeline import BLOG_AGENTS
+from benchmarks.fake_llm import SleepyLlm, install_fake_model
+from utils import rate_limiter
+
+
+def _run(jobs: int, concurrency: int) -> float:
+    batch = [main.BatchJob(topic=f"Topic {i}") for i in range(jobs)]
+    start = time.perf_counter()
+    results = asyncio.run(main.run_batch(batch, concurrency=concurrency, use_cache=False))
+    elapsed = time.perf_counter() - start
+    failed = sum(1 for r in results if not r.ok)
+    if failed:
+        print(f"  {failed} jobs failed")
+    return elapsed
+
+
+def run(jobs: int, latency: float, levels, rpm: float = 0.0) -> None:
+    install_fake_model(BLOG_AGENTS, SleepyLlm(latency_sec=latency))
+    # a GEMINI_RPM from the environment would measure the limiter, not the batch
+    rate_limiter.gemini_limiter = rate_limiter.RateLimiter(requests_per_min=rpm)
+    baseline = None
+    for concurrency in levels:
+        elapsed = _run(jobs, concurrency)
+        baseline = baseline or elapsed
+        print(f"concurrency={concurrency:>3}  wall={elapsed:6.2f}s  speedup={baseline / elapsed:5.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--rpm", type=float, default=0.0, help="Client rate limit; 0 = unlimited.")
+    args = parser.parse_args()
+    run(args.jobs, args.latency, args.levels, args.rpm)
@@ -0,0 +1,195 @@
+import asyncio
+import math
+import random
+import threading
+import time
+import zlib
+from typing import AsyncGenerator, Dict, Optional
+
+from pydantic import PrivateAttr
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+
+class SleepyLlm(BaseLlm):
+    """
+    Stub model that sleeps to mimic network latency and echoes a fixed-size reply.
+    Lets us measure pipeline concurrency without spending API quota.
+    """
+
+    model: str = "sleepy-llm"
+    latency_sec: float = 0.5
+    reply_chars: int = 2000
+    stream_chunks: int = 8
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        text = ("# Stub heading\n\n" + "lorem ipsum " * self.reply_chars)[: self.reply_chars]
+        if stream:
+            # SSE-style: partial deltas spread over the latency, then the aggregate.
+            size = max(1, -(-len(text) // self.stream_chunks))
+            for start in range(0, len(text), size):
+                await asyncio.sleep(self.latency_sec / self.stream_chunks)
+                yield LlmResponse(
+                    content=types.Content(role="model", parts=[types.Part(text=text[start : start + size])]),
+                    partial=True,
+                )
+        else:
+            await asyncio.sleep(self.latency_sec)
+        prompt_chars = sum(
+            len(part.text or "")
+            for content in llm_request.contents
+            for part in (content.parts or [])
+        )
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text=text)]),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_chars // 4,
+                candidates_token_count=len(text) // 4,
+                total_token_count=(prompt_chars + len(text)) // 4,
+            ),
+        )
+
+
+_WORDS = (
+    "agent model latency cache token stream search outline draft review "
+    "batch context budget section memory retry quota throughput result"
+).split()
+
+
+def _jittered(rng: random.Random, median: float, sigma: float) -> float:
+    """Log-normal around `median`: mostly close to it, with a long right tail."""
+    return median * math.exp(rng.gauss(0.0, sigma)) if sigma > 0 else median
+
+
+def _markdown(rng: random.Random, chars: int) -> str:
+    """Headings and bullet points, so outline parsing and section drafting have real structure."""
+    lines = ["# Stub heading", ""]
+    size = 16
+    while size < chars:
+        if len(lines) % 6 == 2:
+            line = f"## Section {len(lines) // 6 + 1}"
+        else:
+            line = "- " + " ".join(rng.choice(_WORDS) for _ in range(rng.randint(6, 14))) + "."
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines)[:chars]
+
+
+class FakeApiError(Exception):
+    """Stand-in for a GenAI API error; `code` is read by the retry logic like a real status."""
+
+    def __init__(self, code: int = 503) -> None:
+        super().__init__(f"{code} fake backend error")
+        self.code = code
+
+
+class FakeGemini(SleepyLlm):
+    """
+    Deterministic fake backend: latency, reply size and failures are drawn
+    from a generator seeded by `seed`, the request and the attempt number,
+    so a run is reproducible however its calls interleave.
+    """
+
+    model: str = "fake-gemini"
+    latency_sigma: float = 0.0
+    reply_chars_max: int = 0
+    error_rate: float = 0.0
+    error_code: int = 503
+    seed: int = 0
+    _attempts: Dict[int, int] = PrivateAttr(default_factory=dict)
+
+    def _rng(self, llm_request: LlmRequest) -> random.Random:
+        system = getattr(llm_request.config, "system_instruction", None) or ""
+        prompt = "".join(
+            part.text or "" for content in llm_request.contents for part in (content.parts or [])
+        )
+        key = zlib.crc32(f"{self.seed}|{system}|{prompt}".encode("utf-8"))
+        attempt = self._attempts[key] = self._attempts.get(key, 0) + 1
+        return random.Random(key * 1000 + attempt)
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        rng = self._rng(llm_request)
+        latency = _jittered(rng, self.latency_sec, self.latency_sigma)
+        chars = rng.randint(self.reply_chars, max(self.reply_chars, self.reply_chars_max))
+        if rng.random() < self.error_rate:
+            # fail after part of the latency, as a real overloaded backend would
+            await asyncio.sleep(latency / 2)
+            raise FakeApiError(self.error_code)
+        text = _markdown(rng, chars)
+        if stream:
+            size = max(1, -(-len(text) // self.stream_chunks))
+            for start in range(0, len(text), size):
+                await asyncio.sleep(latency / self.stream_chunks)
+                yield LlmResponse(
+                    content=types.Content(role="model", parts=[types.Part(text=text[start : start + size])]),
+                    partial=True,
+                )
+        else:
+            await asyncio.sleep(latency)
+        prompt_chars = sum(
+            len(part.text or "")
+            for content in llm_request.contents
+            for part in (content.parts or [])
+        )
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text=text)]),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_chars // 4,
+                candidates_token_count=len(text) // 4,
+                total_token_count=(prompt_chars + len(text)) // 4,
+            ),
+        )
+
+
+class FakeSearch:
+    """
+    Replacement for the grounded search behind `GoogleSearchTool`. Blocks
+    like the real client does, and reports failures as text the way the
+    tool does, so callers see the same shapes.
+    """
+
+    def __init__(
+        self,
+        latency_sec: float = 0.3,
+        latency_sigma: float = 0.0,
+        result_chars: int = 800,
+        error_rate: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        self.latency_sec = latency_sec
+        self.latency_sigma = latency_sigma
+        self.result_chars = result_chars
+        self.error_rate = error_rate
+        self.seed = seed
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, query: str, fallback_summary: Optional[str] = None) -> str:
+        with self._lock:
+            self.calls += 1
+        rng = random.Random(zlib.crc32(f"{self.seed}|{query}".encode("utf-8")))
+        time.sleep(_jittered(rng, self.latency_sec, self.latency_sigma))
+        if rng.random() < self.error_rate:
+            return "Google Search error: fake backend error"
+        return _markdown(rng, self.result_chars).replace("Stub heading", query, 1)
+
+
+def install_fake_model(agents, llm: BaseLlm) -> None:
+    for agent in agents:
+        agent.model = llm
+
+
+def install_fake_search(agents, search: FakeSearch) -> None:
+    """Route every `google_search` tool on `agents` to `search`, uncached."""
+    for agent in agents:
+        for tool in getattr(agent, "tools", None) or []:
+            if getattr(tool, "name", None) == "google_search":
+                tool.cache = None
+                tool._grounded_search = search
@@ -0,0 +1,317 @@
+"""
+Offline benchmark of the whole pipeline against fake Gemini and Google Search backends.
+
+    python -m benchmarks.pipeline_suite
+    python -m benchmarks.pipeline_suite --levels 1 4 16 --jobs 16 --error-rate 0.02
+    python -m benchmarks.pipeline_suite --compare benchmarks/results/abc1234.json benchmarks/results/def5678.json
+
+Every scenario runs in a fresh process, so peak RSS belongs to that
+scenario alone:
+- `pipeline`: `--runs` back-to-back `run_agent_pipeline` calls, streaming
+  into the CLI printer (pointed at /dev/null)
+- `batch@N`: `--jobs` jobs through `run_batch` at concurrency N, for each
+  of `--levels`
+
+Each scenario gets one warm-up job first, then one timed pass. Unless
+`--no-alloc` is given, a second pass runs under tracemalloc to measure
+allocations; tracemalloc slows everything down, so it is kept out of the
+timings.
+
+The JSON report (default `benchmarks/results/<commit>.json`) holds the
+settings and, per scenario:
+- throughput
+- job latency p50/p95/p99
+- per-agent p95
+- peak RSS
+- allocation peak and net growth
+- model and search call counts
+
+`--compare` prints the change in throughput, p95 and RSS between two reports.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from multiprocessing import get_context
+from typing import Dict, List, Optional
+
+RESULTS_DIR = os.path.join("benchmarks", "results")
+
+
+@dataclass
+class Settings:
+    latency: float = 0.2
+    latency_sigma: float = 0.5
+    reply_chars: int = 1500
+    reply_chars_max: int = 4000
+    error_rate: float = 0.0
+    search_latency: float = 0.3
+    search_error_rate: float = 0.0
+    research_mode: str = "fanout"
+    draft_mode: str = "sections"
+    review_mode: str = "sections"
+    rpm: float = 0.0
+    seed: int = 7
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = q * (len(ordered) - 1)
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _setup(settings: Settings):
+    """Import the app inside the worker and point it at the fakes. Returns (main, model, search)."""
+    import main
+    from benchmarks.fake_llm import FakeGemini, FakeSearch, install_fake_model, install_fake_search
+    from pipeline import BLOG_AGENTS
+    from utils import rate_limiter
+
+    model = FakeGemini(
+        latency_sec=settings.latency,
+        latency_sigma=settings.latency_sigma,
+        reply_chars=settings.reply_chars,
+        reply_chars_max=settings.reply_chars_max,
+        error_rate=settings.error_rate,
+        seed=settings.seed,
+    )
+    search = FakeSearch(
+        latency_sec=settings.search_latency,
+        latency_sigma=settings.latency_sigma,
+        error_rate=settings.search_error_rate,
+        seed=settings.seed,
+    )
+    # injected failures are expected; keep ADK's tracebacks and warnings out of the report
+    logging.getLogger("google_adk").setLevel(logging.CRITICAL)
+    warnings.filterwarnings("ignore", module="google.adk")
+    # tools are assigned when the runtime is first built
+    main.get_runtime()
+    install_fake_model(BLOG_AGENTS, model)
+    install_fake_search(BLOG_AGENTS, search)
+    # the real limits and backoff would measure the sleeps, not the pipeline
+    rate_limiter.gemini_limiter = rate_limiter.RateLimiter(requests_per_min=settings.rpm)
+    rate_limiter.default_retry_policy = rate_limiter.RetryPolicy(max_attempts=5, base_delay=0.05, max_delay=1.0)
+    return main, model, search
+
+
+def _stages(settings: Settings):
+    """
+    The pipeline for one pass. Its section memo lives in memory and starts
+    empty, so no pass reuses the sections of an earlier pass or benchmark.
+    """
+    from pipeline import SectionMemo, build_blog_pipeline
+
+    return build_blog_pipeline(
+        research_mode=settings.research_mode,
+        draft_mode=settings.draft_mode,
+        review_mode=settings.review_mode,
+        recall=False,
+        section_memo=SectionMemo(path=None),
+    )
+
+
+async def _pipeline_pass(main, stages, runs: int, offset: int) -> List[float]:
+    durations = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for i in range(runs):
+            start = time.perf_counter()
+            await main.run_agent_pipeline_async(
+                f"Topic {offset + i}", "Professional", "developers", "1500", use_cache=False, stages=stages
+            )
+            durations.append(time.perf_counter() - start)
+    return durations
+
+
+async def _batch_pass(main, stages, jobs: int, concurrency: int, offset: int) -> List[float]:
+    batch = [main.BatchJob(topic=f"Topic {offset + i}") for i in range(jobs)]
+    results = await main.run_batch(batch, concurrency=concurrency, use_cache=False, stages=stages)
+    return [r.duration_sec for r in results if r.ok]
+
+
+def _pass(main, stages, mode: str, jobs: int, concurrency: int, offset: int) -> List[float]:
+    if mode == "pipeline":
+        return asyncio.run(_pipeline_pass(main, stages, jobs, offset))
+    return asyncio.run(_batch_pass(main, stages, jobs, concurrency, offset))
+
+
+def run_scenario(mode: str, jobs: int, concurrency: int, settings: Settings, alloc: bool) -> Dict:
+    """One scenario, meant to run in its own process."""
+    main, model, search = _setup(settings)
+    from app_logging.logger import app_logger
+    from utils.metrics import agent_summary, metrics
+
+    _pass(main, _stages(settings), mode, 1, 1, offset=10_000)
+    metrics.reset()
+    model_calls, search_calls = sum(model._attempts.values()), search.calls
+
+    start = time.perf_counter()
+    durations = _pass(main, _stages(settings), mode, jobs, concurrency, offset=0)
+    wall = time.perf_counter() - start
+    result = {
+        "name": "pipeline" if mode == "pipeline" else f"batch@{concurrency}",
+        "mode": mode,
+        "jobs": jobs,
+        "concurrency": 1 if mode == "pipeline" else concurrency,
+        "failed": jobs - len(durations),
+        "wall_sec": round(wall, 3),
+        "throughput_jobs_per_min": round(60 * len(durations) / wall, 2) if wall else 0.0,
+        "latency_sec": {
+            "mean": round(statistics.fmean(durations), 3) if durations else 0.0,
+            "p50": round(_percentile(durations, 0.50), 3),
+            "p95": round(_percentile(durations, 0.95), 3),
+            "p99": round(_percentile(durations, 0.99), 3),
+        },
+        "agent_p95_sec": {row["agent"]: row["p95_sec"] for row in agent_summary()},
+        "model_calls": sum(model._attempts.values()) - model_calls,
+        "search_calls": search.calls - search_calls,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+    if alloc:
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        _pass(main, _stages(settings), mode, jobs, concurrency, offset=jobs)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["alloc_peak_mb"] = round((peak - baseline) / 2**20, 2)
+        result["alloc_net_mb"] = round((current - baseline) / 2**20, 2)
+
+    app_logger.flush()
+    return result
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(jobs: int, runs: int, levels: List[int], settings: Settings, alloc: bool, output: Optional[str]) -> Dict:
+    scenarios = [("pipeline", runs, 1)] + [("batch", jobs, level) for level in levels]
+    results = []
+    for mode, n, concurrency in scenarios:
+        # a fresh interpreter per scenario: ru_maxrss only ever grows
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            result = pool.submit(run_scenario, mode, n, concurrency, settings, alloc).result()
+        results.append(result)
+        latency = result["latency_sec"]
+        print(
+            f"{result['name']:<12} {result['throughput_jobs_per_min']:8.2f} jobs/min  "
+            f"p50={latency['p50']:6.2f}s p95={latency['p95']:6.2f}s p99={latency['p99']:6.2f}s  "
+            f"rss={result['peak_rss_mb']:7.1f}MB"
+            + (f"  alloc_peak={result['alloc_peak_mb']:6.1f}MB" if alloc else "")
+            + (f"  failed={result['failed']}" if result["failed"] else "")
+        )
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": asdict(settings),
+        "scenarios": results,
+    }
+    output = output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {output}")
+    return report
+
+
+def compare(old_path: str, new_path: str) -> None:
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+    if old["settings"] != new["settings"]:
+        print("warning: the reports were made with different settings\n")
+    before = {s["name"]: s for s in old["scenarios"]}
+
+    def change(a: float, b: float) -> str:
+        return f"{(b - a) / a * 100:+6.1f}%" if a else "   n/a"
+
+    print(f"{old['commit']} -> {new['commit']}")
+    for s in new["scenarios"]:
+        o = before.get(s["name"])
+        if o is None:
+            continue
+        print(
+            f"{s['name']:<12} throughput {change(o['throughput_jobs_per_min'], s['throughput_jobs_per_min'])}  "
+            f"p95 {change(o['latency_sec']['p95'], s['latency_sec']['p95'])}  "
+            f"rss {change(o['peak_rss_mb'], s['peak_rss_mb'])}"
+        )
+
+
+if __name__ == "__main__":
+    defaults = Settings()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--jobs", type=int, default=8, help="Jobs per batch scenario.")
+    parser.add_argument("--runs", type=int, default=3, help="Back-to-back runs in the pipeline scenario.")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--latency", type=float, default=defaults.latency, help="Median model latency (s).")
+    parser.add_argument("--latency-sigma", type=float, default=defaults.latency_sigma, help="Log-normal spread.")
+    parser.add_argument("--reply-chars", type=int, nargs=2, default=[defaults.reply_chars, defaults.reply_chars_max])
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate, help="Share of model calls failing with 503.")
+    parser.add_argument("--search-latency", type=float, default=defaults.search_latency)
+    parser.add_argument("--search-error-rate", type=float, default=defaults.search_error_rate)
+    parser.add_argument("--research-mode", default=defaults.research_mode)
+    parser.add_argument("--draft-mode", default=defaults.draft_mode)
+    parser.add_argument("--review-mode", default=defaults.review_mode)
+    parser.add_argument("--rpm", type=float, default=defaults.rpm, help="Client rate limit; 0 = unlimited.")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--no-alloc", action="store_true", help="Skip the tracemalloc pass.")
+    parser.add_argument("--output", help="Report path (default: benchmarks/results/<commit>.json).")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two reports and exit.")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        sys.exit(0)
+    run(
+        args.jobs,
+        args.runs,
+        args.levels,
+        Settings(
+            latency=args.latency,
+            latency_sigma=args.latency_sigma,
+            reply_chars=args.reply_chars[0],
+            reply_chars_max=args.reply_chars[1],
+            error_rate=args.error_rate,
+            search_latency=args.search_latency,
+            search_error_rate=args.search_error_rate,
+            research_mode=args.research_mode,
+            draft_mode=args.draft_mode,
+            review_mode=args.review_mode,
+            rpm=args.rpm,
+            seed=args.seed,
+        ),
+        not args.no_alloc,
+        args.output,
+    )
@@ -0,0 +1,78 @@
+"""
+Drive the shared rate limiter against a local endpoint that answers 429.
+
+The fake server rejects the first `--throttle` requests with
+`429 Retry-After: <n>` and then returns 200, so the run shows the limiter
+pausing every worker, halving its rate and recovering.
+
+    python -m benchmarks.rate_limit_check --requests 20 --workers 4
+"""
+import argparse
+import json
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.rate_limiter import RateLimiter, RetryPolicy, call_with_retry
+
+
+def _serve(throttle: int, retry_after: float) -> ThreadingHTTPServer:
+    state = {"seen": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            with lock:
+                state["seen"] += 1
+                throttled = state["seen"] <= throttle
+            if throttled:
+                self.send_response(429)
+                self.send_header("Retry-After", str(retry_after))
+            else:
+                self.send_response(200)
+            self.end_headers()
+            self.wfile.write(b"ok" if not throttled else b"slow down")
+
+        def log_message(self, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run(requests: int, workers: int, throttle: int, retry_after: float, rpm: float) -> None:
+    server = _serve(throttle, retry_after)
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    limiter = RateLimiter(requests_per_min=rpm)
+    policy = RetryPolicy(max_attempts=5, base_delay=0.1, max_delay=2.0)
+
+    def fetch(_: int) -> int:
+        return call_with_retry(
+            lambda: urllib.request.urlopen(url, timeout=5).status,
+            "fake_endpoint",
+            limiter=limiter,
+            policy=policy,
+        )
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        statuses = list(pool.map(fetch, range(requests)))
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    print(f"{statuses.count(200)}/{requests} succeeded in {elapsed:.2f}s")
+    print(json.dumps(limiter.metrics(), indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--throttle", type=int, default=3, help="number of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--rpm", type=float, default=600)
+    args = parser.parse_args()
+    run(args.requests, args.workers, args.throttle, args.retry_after, args.rpm)
@@ -0,0 +1,84 @@
+"""
+Compare how many characters each rendering strategy pushes to the UI while a
+blog streams in.
+
+    python -m benchmarks.render_cost --chars 9000 --chunk 12 --delay 0.002
+
+- `per-char`: the whole text redrawn after every character
+- `fragment`: the Streamlit app's path. A writer thread streams deltas into
+  a Job while a poller takes a snapshot every `--poll` seconds and draws the
+  stage's text up to its last word, then the final text once the stage ends.
+  The time spent in snapshot() is reported too: the writer waits on the
+  same lock.
+"""
+import argparse
+import threading
+import time
+
+from pipeline import Job
+from utils.rendering import cut_frame
+
+
+class _Counter:
+    def __init__(self) -> None:
+        self.frames = 0
+        self.chars = 0
+        self.snapshot_sec = 0.0
+
+    def render(self, text: str) -> None:
+        self.frames += 1
+        self.chars += len(text)
+
+
+def per_char(text: str) -> _Counter:
+    counter = _Counter()
+    output = ""
+    for char in text:
+        output += char
+        counter.render(output)
+    return counter
+
+
+def fragment(text: str, chunk: int, delay: float, poll: float) -> _Counter:
+    counter = _Counter()
+    job = Job(job_id="bench", inputs={}, stage_names=["draft"])
+
+    def _stream() -> None:
+        for start in range(0, len(text), chunk):
+            job._chunk("draft", text[start : start + chunk])
+            time.sleep(delay)
+        job._stage_end("draft", text, None)
+
+    writer = threading.Thread(target=_stream)
+    writer.start()
+    while True:
+        # a fragment redraws on every tick, whether or not the text changed
+        time.sleep(poll)
+        start = time.perf_counter()
+        snap = job.snapshot()
+        counter.snapshot_sec += time.perf_counter() - start
+        if "draft" in snap["completed"]:
+            counter.render(snap["text"]["draft"])
+            break
+        counter.render(cut_frame(snap["text"].get("draft", "")))
+    writer.join()
+    return counter
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chars", type=int, default=9000)
+    parser.add_argument("--chunk", type=int, default=12, help="Characters per streamed delta.")
+    parser.add_argument("--delay", type=float, default=0.002, help="Seconds between deltas.")
+    parser.add_argument("--poll", type=float, default=0.5, help="Fragment redraw interval (POLL_SEC in streamlit_app).")
+    args = parser.parse_args()
+
+    text = ("lorem ipsum dolor sit amet " * args.chars)[: args.chars]
+    for name, counter in [
+        ("per-char", per_char(text)),
+        ("fragment", fragment(text, args.chunk, args.delay, args.poll)),
+    ]:
+        print(
+            f"{name:>10}: {counter.frames:>6} frames  {counter.chars:>12,} chars pushed"
+            f"  {counter.snapshot_sec * 1000:8.2f} ms in snapshot()"
+        )
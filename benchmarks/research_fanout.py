@@ -0,0 +1,48 @@
+"""
+Research wall time with sequential vs fanned-out searches, against a fake search.
+
+    python -m benchmarks.research_fanout --queries 6 --latency 0.5
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from pipeline.research import fan_out_search, merge_search_results
+
+
+def _fake_search(latency_sec: float):
+    def search(query: str) -> str:
+        # jittered latency so the slowest search dominates the fan-out time
+        time.sleep(latency_sec * random.uniform(0.5, 1.5))
+        return f"- Shared fact about the topic.\n- A fact about {query}.\nMore detail on {query}. Another sentence."
+
+    return search
+
+
+def run(queries: int, latency_sec: float, concurrency: int) -> None:
+    search = _fake_search(latency_sec)
+    plan = [f"subtopic {i}" for i in range(queries)]
+
+    start = time.perf_counter()
+    sequential = [(q, search(q)) for q in plan]
+    sequential_sec = time.perf_counter() - start
+
+    start = time.perf_counter()
+    fanned = asyncio.run(fan_out_search(plan, search, concurrency=concurrency))
+    fanout_sec = time.perf_counter() - start
+
+    notes = merge_search_results(fanned)
+    assert notes == merge_search_results(sequential)
+    print(f"sequential: {sequential_sec:.2f}s")
+    print(f"fan-out x{concurrency}: {fanout_sec:.2f}s ({sequential_sec / fanout_sec:.1f}x)")
+    print(f"shared snippet kept once: {notes.count('Shared fact') == 1}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--queries", type=int, default=6)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--concurrency", type=int, default=6)
+    args = parser.parse_args()
+    run(args.queries, args.latency, args.concurrency)
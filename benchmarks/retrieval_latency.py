@@ -0,0 +1,56 @@
+"""
+Knowledge store query latency over a synthetic corpus.
+
+    python -m benchmarks.retrieval_latency --docs 100000 --queries 200
+"""
+import argparse
+import itertools
+import random
+import statistics
+import time
+
+from memory.retrieval import KnowledgeStore
+
+
+def _vocabulary(size: int, rng: random.Random):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = {"".join(rng.choice(letters) for _ in range(rng.randint(3, 9))) for _ in range(size)}
+    words = sorted(words)
+    # Zipf-like weights: a few very common words, a long tail of rare ones
+    weights = [1.0 / (rank + 1) for rank in range(len(words))]
+    return words, list(itertools.accumulate(weights))
+
+
+def run(docs: int, queries: int, words_per_doc: int, k: int, seed: int) -> None:
+    rng = random.Random(seed)
+    vocab, cum_weights = _vocabulary(50_000, rng)
+    store = KnowledgeStore(":memory:")
+
+    start = time.perf_counter()
+    for i in range(docs):
+        text = " ".join(rng.choices(vocab, cum_weights=cum_weights, k=words_per_doc))
+        store.add("research", f"doc {i}", text)
+    print(f"indexed {len(store):,} chunks in {time.perf_counter() - start:.1f}s")
+
+    latencies = []
+    for _ in range(queries):
+        query = " ".join(rng.choices(vocab, cum_weights=cum_weights, k=rng.randint(3, 8)))
+        start = time.perf_counter()
+        store.search(query, k=k)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    print(
+        f"query latency over {queries} queries: p50 {statistics.median(latencies):.2f} ms, "
+        f"p95 {latencies[int(len(latencies) * 0.95) - 1]:.2f} ms, max {latencies[-1]:.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--docs", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--words", type=int, default=120, help="words per document")
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    run(args.docs, args.queries, args.words, args.k, args.seed)
@@ -0,0 +1,53 @@
+"""
+Per-stage overhead with fresh vs pooled Runners, against a zero-latency stub.
+
+    python -m benchmarks.runner_reuse --calls 50
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.fake_llm import SleepyLlm, install_fake_model
+from pipeline import AgentRuntime, BLOG_AGENTS
+from utils import rate_limiter
+
+
+async def _calls(runtime: AgentRuntime, calls: int, pooled: bool) -> float:
+    agent = BLOG_AGENTS[0]
+    elapsed = 0.0
+    for i in range(calls):
+        # fresh session per call so growing history does not skew the numbers
+        session_id = f"bench_{pooled}_{i}"
+        await runtime.create_session(session_id)
+        start = time.perf_counter()
+        if not pooled:
+            runtime._runners.clear()
+        await runtime.call_agent(agent, f"prompt {i}", session_id, use_cache=False)
+        elapsed += time.perf_counter() - start
+    return elapsed / calls
+
+
+def run(calls: int, rpm: float = 0.0) -> None:
+    install_fake_model(BLOG_AGENTS, SleepyLlm(latency_sec=0.0, reply_chars=200))
+    # a GEMINI_RPM from the environment would measure the limiter, not the runners
+    rate_limiter.gemini_limiter = rate_limiter.RateLimiter(requests_per_min=rpm)
+    # warm imports and lazy SDK state so neither variant pays for them
+    asyncio.run(_calls(AgentRuntime(app_name="bench", user_id="bench"), 3, True))
+    for pooled in (False, True):
+        runtime = AgentRuntime(app_name="bench", user_id="bench")
+        start = time.perf_counter()
+        first = asyncio.run(_calls(runtime, 1, pooled))
+        per_call = asyncio.run(_calls(runtime, calls, pooled))
+        label = "pooled" if pooled else "fresh "
+        print(
+            f"{label}  first call={first * 1000:7.2f} ms  "
+            f"per call={per_call * 1000:7.2f} ms  total={time.perf_counter() - start:6.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--rpm", type=float, default=0.0, help="Client rate limit; 0 = unlimited.")
+    args = parser.parse_args()
+    run(args.calls, args.rpm)
@@ -0,0 +1,186 @@
+"""
+Cold-start and rerun cost of the CLI and the Streamlit app, tracked per commit.
+
+    python -m benchmarks.startup_cost
+    python -m benchmarks.startup_cost --compare benchmarks/results/startup-<old>.json benchmarks/results/startup-<new>.json
+
+Every measurement runs in a fresh interpreter:
+- `python -X importtime` for each startup path in PATHS. It reports the
+  wall time (best of `--repeat`) and the modules with the largest
+  cumulative import time.
+- the Streamlit script under AppTest, once cold and then for `--reruns`
+  reruns. The reruns are what every widget interaction pays; they are
+  timed after the background preload of the agents has finished.
+
+The JSON report defaults to `benchmarks/results/startup-<commit>.json`.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+from benchmarks.pipeline_suite import RESULTS_DIR, git_commit
+
+# name -> statement timed from a cold interpreter
+PATHS = {
+    "import_main": "import main",
+    "cli_ready": "import main; main.get_runtime()",
+    "pipeline_loaded": "import pipeline.blog",
+}
+
+_STREAMLIT_PROBE = """
+import json, sys, threading, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("streamlit_app.py", default_timeout=120)
+start = time.perf_counter()
+at.run()
+cold = time.perf_counter() - start
+# the agents finish importing in the background; time reruns once that is done
+start = time.perf_counter()
+for thread in threading.enumerate():
+    if thread.name == "preload-pipeline":
+        thread.join()
+preload = time.perf_counter() - start
+reruns = []
+for _ in range(int(sys.argv[1])):
+    start = time.perf_counter()
+    at.run()
+    reruns.append(time.perf_counter() - start)
+print(json.dumps({"cold": cold, "preload": preload, "reruns": reruns, "exceptions": len(at.exception)}))
+"""
+
+
+def _env() -> Dict[str, str]:
+    # startup must not depend on a real key; nothing here calls the API
+    return {**os.environ, "GOOGLE_API_KEY": os.environ.get("GOOGLE_API_KEY") or "startup-cost", "PYTHONPATH": os.getcwd()}
+
+
+def _parse_importtime(stderr: str) -> List[Dict]:
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        modules.append(
+            {
+                "module": name.strip(),
+                "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+                "self_ms": int(own) / 1000,
+                "cumulative_ms": int(cumulative) / 1000,
+            }
+        )
+    return modules
+
+
+def profile_path(statement: str, repeat: int, top: int) -> Dict:
+    walls = []
+    modules: List[Dict] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", statement],
+            capture_output=True,
+            text=True,
+            env=_env(),
+        )
+        walls.append(time.perf_counter() - start)
+        if proc.returncode != 0:
+            raise RuntimeError(f"`{statement}` failed:\n{proc.stderr[-2000:]}")
+        modules = _parse_importtime(proc.stderr)
+    # top-level imports of the statement, plus the heaviest modules anywhere
+    roots = [m for m in modules if m["depth"] == 0]
+    return {
+        "statement": statement,
+        "wall_sec": round(min(walls), 3),
+        "modules": len(modules),
+        "import_ms": round(sum(m["self_ms"] for m in modules), 1),
+        "top_level": sorted(roots, key=lambda m: -m["cumulative_ms"])[:top],
+        "heaviest": sorted(modules, key=lambda m: -m["self_ms"])[:top],
+    }
+
+
+def profile_streamlit(reruns: int) -> Dict:
+    proc = subprocess.run(
+        [sys.executable, "-c", _STREAMLIT_PROBE, str(reruns)],
+        capture_output=True,
+        text=True,
+        env=_env(),
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Streamlit probe failed:\n{proc.stderr[-2000:]}")
+    data = json.loads(proc.stdout.strip().splitlines()[-1])
+    return {
+        "cold_sec": round(data["cold"], 3),
+        "preload_sec": round(data.get("preload", 0.0), 3),
+        "rerun_ms_mean": round(1000 * statistics.fmean(data["reruns"]), 1) if data["reruns"] else 0.0,
+        "rerun_ms_max": round(1000 * max(data["reruns"]), 1) if data["reruns"] else 0.0,
+        "exceptions": data["exceptions"],
+    }
+
+
+def run(repeat: int, reruns: int, top: int, output: str = None) -> Dict:
+    paths = {}
+    for name, statement in PATHS.items():
+        paths[name] = result = profile_path(statement, repeat, top)
+        print(f"{name:<16} {result['wall_sec']:6.2f}s  {result['modules']:5d} modules  `{statement}`")
+        for m in result["top_level"][:5]:
+            print(f"    {m['cumulative_ms']:8.1f} ms  {m['module']}")
+    streamlit = profile_streamlit(reruns)
+    print(
+        f"streamlit        cold {streamlit['cold_sec']:.2f}s  preload {streamlit['preload_sec']:.2f}s  rerun mean {streamlit['rerun_ms_mean']:.1f} ms "
+        f"(max {streamlit['rerun_ms_max']:.1f} ms)"
+    )
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "paths": paths,
+        "streamlit": streamlit,
+    }
+    output = output or os.path.join(RESULTS_DIR, f"startup-{commit}.json")
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {output}")
+    return report
+
+
+def compare(old_path: str, new_path: str) -> None:
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+
+    def change(a: float, b: float) -> str:
+        return f"{(b - a) / a * 100:+6.1f}%" if a else "   n/a"
+
+    print(f"{old['commit']} -> {new['commit']}")
+    for name, result in new["paths"].items():
+        before = old["paths"].get(name)
+        if before:
+            print(f"{name:<16} {before['wall_sec']:6.2f}s -> {result['wall_sec']:6.2f}s {change(before['wall_sec'], result['wall_sec'])}")
+    for key in ("cold_sec", "rerun_ms_mean"):
+        a, b = old["streamlit"][key], new["streamlit"][key]
+        print(f"streamlit {key:<7} {a:8.2f} -> {b:8.2f} {change(a, b)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=3, help="Cold starts per path; the best is reported.")
+    parser.add_argument("--reruns", type=int, default=10, help="Streamlit reruns after the cold run.")
+    parser.add_argument("--top", type=int, default=15, help="Modules listed per path.")
+    parser.add_argument("--output", help="Report path (default: benchmarks/results/startup-<commit>.json).")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two reports and exit.")
+    args = parser.parse_args()
+    if args.compare:
+        compare(*args.compare)
+        sys.exit(0)
+    run(args.repeat, args.reruns, args.top, args.output)
@@ -0,0 +1,94 @@
+"""
+Memory/session store throughput under thread contention: one global lock vs the sharded backend.
+
+    python -m benchmarks.store_contention --threads 1 8 32 --ops 20000
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from memory.backends import InMemoryBackend, SqliteBackend
+
+
+class _GlobalLockStore:
+    """The stores as they were: one lock around every read, write and copy."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._store: Dict[tuple, Any] = {}
+
+    def get(self, scope: str, key: str) -> Optional[Any]:
+        with self._lock:
+            return self._store.get((scope, key))
+
+    def set(self, scope: str, key: str, value: Any) -> None:
+        with self._lock:
+            self._store[(scope, key)] = value
+
+    def snapshot(self) -> Dict[tuple, Any]:
+        with self._lock:
+            return dict(self._store)
+
+
+def _worker(store, ops: int, keys: int, seed: int, barrier: threading.Barrier) -> None:
+    rng = random.Random(seed)
+    barrier.wait()
+    for _ in range(ops):
+        roll = rng.random()
+        scope = f"session-{rng.randrange(64)}"
+        key = f"key-{rng.randrange(keys)}"
+        if roll < 0.90:
+            store.get(scope, key)
+        elif roll < 0.99:
+            store.set(scope, key, {"value": rng.random()})
+        else:
+            store.snapshot()
+
+
+def measure(store, threads: int, total_ops: int, keys: int) -> float:
+    """Operations per second with `total_ops` split across `threads` threads."""
+    for i in range(keys):
+        store.set(f"session-{i % 64}", f"key-{i}", {"value": i})
+    barrier = threading.Barrier(threads + 1)
+    workers = [
+        threading.Thread(target=_worker, args=(store, total_ops // threads, keys, i, barrier))
+        for i in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    return total_ops / (time.perf_counter() - start)
+
+
+def run(thread_counts: List[int], total_ops: int, keys: int, sqlite: bool) -> None:
+    stores = {
+        "global lock": _GlobalLockStore,
+        "sharded": lambda: InMemoryBackend(max_keys=keys * 64),
+    }
+    if sqlite:
+        tmp = tempfile.mkdtemp()
+        stores["sqlite (WAL)"] = lambda: SqliteBackend(
+            os.path.join(tmp, f"store-{time.time_ns()}.sqlite3"), max_keys=keys * 64
+        )
+
+    print(f"{'store':<14}" + "".join(f"{f'{n} threads':>16}" for n in thread_counts))
+    for name, factory in stores.items():
+        rates = [measure(factory(), n, total_ops, keys) for n in thread_counts]
+        print(f"{name:<14}" + "".join(f"{f'{r:,.0f} op/s':>16}" for r in rates))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--ops", type=int, default=20000)
+    parser.add_argument("--keys", type=int, default=2000)
+    parser.add_argument("--sqlite", action="store_true", help="also measure the SQLite backend")
+    args = parser.parse_args()
+    run(args.threads, args.ops, args.keys, args.sqlite)
@@ -0,0 +1,21 @@
+from google.adk.agents import LlmAgent
+
+
+class ResearchPlannerAgent(LlmAgent):
+    """Local subclass to keep app_name inference aligned with this repo."""
+
+
+research_planner_agent = ResearchPlannerAgent(
+    name="research_planner_agent",
+    model="gemini-2.5-flash",
+    instruction="""
+    You are the ResearchPlannerAgent.
+
+    Your task:
+    - Break the blog topic into focused web search queries, one per subtopic.
+    - Cover: definitions, key facts, statistics, examples, use cases, recent developments.
+    - Output ONLY the queries, one per line.
+    - DO NOT number them or add any other text.
+    - DO NOT call any tools.
+    """
+)
@@ -12,13 +12,13 @@ seo_agent = SEOAgent(
     You are the SEOAgent.
 
     Your task:
-    - Read the improved blog draft and generate:
+    - Read the blog draft and generate:
     - SEO title
     - Meta description
     - URL slug
     - Keyword list
     - Social media caption
-    - Then output the final improved blog markdown below the metadata.
+    - Output ONLY the metadata as a short markdown block; do not repeat the blog body.
     - Ensure metadata is concise, SEO-optimized, and compelling.
     """
 )
@@ -15,6 +15,8 @@ class Config:
         self.APP_NAME = os.getenv("APP_NAME", "AI_BLOG_PRODUCTION_AGENT")
         self.ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
         self.DEBUG_MODE = os.getenv("DEBUG_MODE", "False").lower() == "true"
+        self.KEEP_SESSIONS = os.getenv("KEEP_SESSIONS", "False").lower() == "true"
+        self.SESSION_TTL_SEC = float(os.getenv("SESSION_TTL_SEC", "3600"))
 
         # Validate required fields
         self._validate()
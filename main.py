@@ -1,202 +1,426 @@
+from __future__ import annotations
+
+import argparse
 import asyncio
+import json
+import threading
 import time
 import traceback
 import os
+import sys
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence
 from dotenv import load_dotenv
 
-from google.genai import types
-from google.adk.runners import Runner
-from google.adk.artifacts.in_memory_artifact_service import InMemoryArtifactService
-from google.adk.sessions.in_memory_session_service import InMemorySessionService
-from google.adk.memory.in_memory_memory_service import InMemoryMemoryService
-
-from blog_agents.research_agent import research_agent
-from blog_agents.outline_agent import outline_agent
-from blog_agents.draft_agent import draft_agent
-from blog_agents.critic_agent import critic_agent
-from blog_agents.seo_agent import seo_agent
-from blog_agents.evaluation_agent import evaluation_agent
-
-from tools.google_search_tool import GoogleSearchTool
-from tools.code_execution_tool import CodeExecutionTool
-from tools.user_profile_tool import UserProfileTool
-
+import pipeline
 from app_logging.logger import app_logger
-from utils.context_manager import truncate_text
+from utils.genai_client import share_agent_models
+from utils.metrics import agent_summary, serve_metrics
+
+if TYPE_CHECKING:
+    from pipeline import AgentRuntime, RunStore, Stage
 
 load_dotenv()
 
 APP_NAME = "ai_blog_agent"
 USER_ID = "cli_user"
-SESSION_ID = "cli_session"
+DEFAULT_BATCH_CONCURRENCY = 4
 
-session_service = InMemorySessionService()
-memory_service = InMemoryMemoryService()
-artifact_service = InMemoryArtifactService()
+_runtime: Optional[AgentRuntime] = None
+_runtime_lock = threading.Lock()
 
-tools = [
-    GoogleSearchTool(),
-    CodeExecutionTool(),
-    UserProfileTool(),
-]
+def get_runtime() -> AgentRuntime:
+    """
+    The CLI's AgentRuntime, with the default tools assigned to every agent.
+    Built on first use, so importing this module does not load google-adk.
+    """
+    global _runtime
+    if _runtime is None:
+        with _runtime_lock:
+            if _runtime is None:
+                runtime = pipeline.AgentRuntime(app_name=APP_NAME, user_id=USER_ID, cache=pipeline.ResponseCache())
+                pipeline.assign_tools(pipeline.BLOG_AGENTS, pipeline.default_tools())
+                share_agent_models(pipeline.BLOG_AGENTS)
+                _runtime = runtime
+    return _runtime
 
-def _assign_tools_to_agents(agent_list, tool_instances):
-    for _agent in agent_list:
-        _agent.tools = list(tool_instances)
+_STAGE_MARKERS = {
+    "research": ("🔹 RESEARCH_OUTPUT 🔹", "🔹 END_RESEARCH 🔹"),
+    "outline": ("🔸 OUTLINE_OUTPUT 🔸", "🔸 END_OUTLINE 🔸"),
+    "draft": ("🔹 DRAFT_OUTPUT 🔹", "🔹 END_DRAFT 🔹"),
+    "critic": ("🔹 CRITIC_OUTPUT 🔹", "🔹 END_CRITIC 🔹"),
+    "seo": ("🔸 SEO_OUTPUT 🔸", "🔸 END_SEO 🔸"),
+    "evaluation": ("--- Evaluation ---", "------------------"),
+}
 
-_assign_tools_to_agents(
-    [research_agent, outline_agent, draft_agent, critic_agent, seo_agent, evaluation_agent],
-    tools,
-)
+class _CliStreamer:
+    """
+    Streams stage output to stdout as tokens arrive. Only one stage owns the
+    terminal at a time; a stage that runs alongside it (e.g. SEO next to the
+    critic) is printed in full when it finishes instead of interleaving.
+    """
 
-async def _ensure_session():
-    try:
-        await session_service.create_session(
-            app_name=APP_NAME,
-            user_id=USER_ID,
-            session_id=SESSION_ID,
-        )
-    except Exception:
-        pass
+    def __init__(self) -> None:
+        self.owner = None
+        self.streamed = set()
 
-asyncio.run(_ensure_session())
+    def on_chunk(self, stage, text: str) -> None:
+        if stage.name not in _STAGE_MARKERS:
+            return
+        if self.owner is None and stage.name not in self.streamed:
+            self.owner = stage.name
+            self.streamed.add(stage.name)
+            print(f"\n{_STAGE_MARKERS[stage.name][0]}")
+        if self.owner == stage.name:
+            sys.stdout.write(text)
+            sys.stdout.flush()
 
-def call_agent(runner: Runner, prompt: str, agent_name: str) -> str:
-    content = types.Content(role="user", parts=[types.Part(text=prompt)])
-    start = time.perf_counter()
-    try:
-        events = runner.run(
-            user_id=USER_ID,
-            session_id=SESSION_ID,
-            new_message=content,
+    def on_end(self, stage, text: str) -> None:
+        markers = _STAGE_MARKERS.get(stage.name)
+        if not markers:
+            return
+        if self.owner == stage.name:
+            self.owner = None
+            print(f"\n{markers[1]}\n")
+            return
+        print(f"\n{markers[0]}")
+        print(text)
+        print(f"{markers[1]}\n")
+
+async def run_agent_pipeline_async(
+    topic: str,
+    tone: str,
+    audience: str,
+    word_count: str,
+    *,
+    session_prefix: str = "cli",
+    verbose: bool = True,
+    use_cache: bool = True,
+    run_store: Optional[RunStore] = None,
+    extra_instructions: str = "",
+    stages: Optional[Sequence[Stage]] = None,
+) -> str:
+    streamer = _CliStreamer() if verbose else None
+    outputs = await pipeline.run_blog_pipeline(
+        get_runtime(),
+        pipeline.pipeline_inputs(topic, tone, audience, word_count, extra_instructions),
+        stages=stages if stages is not None else pipeline.BLOG_PIPELINE,
+        session_prefix=session_prefix,
+        on_stage_end=streamer.on_end if streamer else None,
+        on_stage_chunk=streamer.on_chunk if streamer else None,
+        use_cache=use_cache,
+        run_store=run_store,
+    )
+    return outputs["final"]
+
+def run_agent_pipeline(
+    topic: str,
+    tone: str,
+    audience: str,
+    word_count: str,
+    use_cache: bool = True,
+    run_store: Optional[RunStore] = None,
+    extra_instructions: str = "",
+    stages: Optional[Sequence[Stage]] = None,
+) -> str:
+    return asyncio.run(
+        run_agent_pipeline_async(
+            topic,
+            tone,
+            audience,
+            word_count,
+            use_cache=use_cache,
+            run_store=run_store,
+            extra_instructions=extra_instructions,
+            stages=stages,
         )
-    except Exception as exc:
-        error_msg = f"Error running {agent_name}: {exc}"
-        app_logger.log_error(agent_name, "run_exception", error_msg, extra={"traceback": traceback.format_exc()})
-        return error_msg
-
-    final_text = ""
-    for event in events:
-        if hasattr(event, "is_final_response") and event.is_final_response():
-            if event.content and event.content.parts:
-                for part in event.content.parts:
-                    if getattr(part, "text", None):
-                        final_text += part.text
-    
-    duration = time.perf_counter() - start
-
-    if not final_text.strip():
-        msg = "Error: No final response from agent."
-        app_logger.log_error(agent_name, "run", msg)
-        return msg
+    )
 
-    app_logger.log_event(
-        event_type="agent_run",
-        agent=agent_name,
-        step="run",
-        duration_sec=duration,
-        message="Agent completed successfully.",
-        extra={"chars_out": len(final_text)},
+@dataclass
+class BatchJob:
+    topic: str
+    tone: str = "Professional"
+    audience: str = "beginner developers"
+    word_count: str = "1500"
+
+@dataclass
+class BatchResult:
+    job: BatchJob
+    blog: Optional[str] = None
+    error: Optional[str] = None
+    duration_sec: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+async def _run_batch_job(
+    index: int,
+    job: BatchJob,
+    semaphore: asyncio.Semaphore,
+    use_cache: bool,
+    stages: Optional[Sequence[Stage]],
+) -> BatchResult:
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            # each run opens (and closes) its own session, so jobs never share history
+            blog = await run_agent_pipeline_async(
+                job.topic,
+                job.tone,
+                job.audience,
+                job.word_count,
+                session_prefix="batch",
+                verbose=False,
+                use_cache=use_cache,
+                stages=stages,
+            )
+        except Exception as exc:
+            app_logger.log_error(
+                "batch",
+                "job",
+                f"Batch job {index} failed: {exc}",
+                extra={"topic": job.topic, "traceback": traceback.format_exc()},
+            )
+            return BatchResult(job=job, error=str(exc), duration_sec=time.perf_counter() - start)
+        return BatchResult(job=job, blog=blog, duration_sec=time.perf_counter() - start)
+
+async def run_batch(
+    jobs: Iterable[BatchJob],
+    concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    use_cache: bool = True,
+    stages: Optional[Sequence[Stage]] = None,
+) -> List[BatchResult]:
+    """
+    Run many pipelines concurrently, at most `concurrency` at a time.
+    Results come back in job order; a failing job never cancels the others.
+    """
+    jobs = list(jobs)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(_run_batch_job(i, job, semaphore, use_cache, stages) for i, job in enumerate(jobs))
     )
-    return final_text.strip()
-
-def _build_runner(agent):
-    return Runner(
-        app_name=APP_NAME,
-        agent=agent,
-        session_service=session_service,
-        artifact_service=artifact_service,
-        memory_service=memory_service,
+    app_logger.log_event(
+        event_type="batch_run",
+        step="batch",
+        duration_sec=time.perf_counter() - start,
+        message="Batch completed.",
+        extra={
+            "jobs": len(jobs),
+            "failed": sum(1 for r in results if not r.ok),
+            "concurrency": concurrency,
+        },
     )
+    return list(results)
+
+async def replay_runs(
+    runs: Sequence[Dict],
+    speed: float = 1.0,
+    concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    use_cache: bool = True,
+    stages: Optional[Sequence[Stage]] = None,
+) -> List[BatchResult]:
+    """
+    Re-run the pipeline runs recorded on a cassette, each arriving at its
+    recorded offset divided by `speed` (0 = all at once), at most
+    `concurrency` at a time.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    first = runs[0]["t"] if runs else 0.0
+
+    async def _arrive(index: int, run: Dict) -> BatchResult:
+        if speed > 0:
+            await asyncio.sleep((run["t"] - first) / speed)
+        inputs = run["inputs"]
+        job = BatchJob(inputs["topic"], inputs["tone"], inputs["audience"], inputs["word_count"])
+        return await _run_batch_job(index, job, semaphore, use_cache, stages)
 
-def run_agent_pipeline(topic: str, tone: str, audience: str, word_count: str) -> str:
-    base = (
-        f"Topic: {topic}\n"
-        f"Tone: {tone}\n"
-        f"Audience: {audience}\n"
-        f"Word Count: {word_count}\n"
+    return list(await asyncio.gather(*(_arrive(i, run) for i, run in enumerate(runs))))
+
+def _load_batch_jobs(path: str) -> List[BatchJob]:
+    jobs = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                data = json.loads(line)
+                data["word_count"] = str(data.get("word_count", "1500"))
+                jobs.append(BatchJob(**data))
+    return jobs
+
+def _run_batch_cli(
+    path: str,
+    concurrency: int,
+    output: Optional[str],
+    use_cache: bool,
+    stages: Sequence[Stage],
+) -> None:
+    jobs = _load_batch_jobs(path)
+    print(f"\nRunning {len(jobs)} jobs with concurrency {concurrency}\n")
+    results = asyncio.run(run_batch(jobs, concurrency=concurrency, use_cache=use_cache, stages=stages))
+
+    out = open(output, "w", encoding="utf-8") if output else None
+    try:
+        for result in results:
+            status = "ok" if result.ok else f"failed: {result.error}"
+            print(f"- {result.job.topic} ({result.duration_sec:.1f}s) {status}")
+            if out:
+                record = {
+                    "topic": result.job.topic,
+                    "blog": result.blog,
+                    "error": result.error,
+                    "duration_sec": result.duration_sec,
+                }
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+    finally:
+        if out:
+            out.close()
+
+def _run_replay_cli(cassette, speed: float, concurrency: int, use_cache: bool, stages: Sequence[Stage]) -> None:
+    runs = cassette.runs()
+    if not runs:
+        print(f"No pipeline runs recorded in {cassette.path}.")
+        return
+    print(f"\nReplaying {len(runs)} recorded runs at {f'{speed:g}x' if speed else 'full'} speed\n")
+    start = time.perf_counter()
+    results = asyncio.run(replay_runs(runs, speed=speed, concurrency=concurrency, use_cache=use_cache, stages=stages))
+    wall = time.perf_counter() - start
+    for result in results:
+        status = "ok" if result.ok else f"failed: {result.error}"
+        print(f"- {result.job.topic} ({result.duration_sec:.1f}s) {status}")
+    durations = sorted(r.duration_sec for r in results)
+    print(
+        f"\nWall {wall:.1f}s; run p50 {durations[len(durations) // 2]:.1f}s, "
+        f"max {durations[-1]:.1f}s; cassette {cassette.stats}\n"
     )
 
-    # 1 — Research Agent
-    r1 = _build_runner(research_agent)
-    research_prompt = base + "\nYou are ResearchAgent. Provide structured notes using google_search tool when helpful."
-    research_text = call_agent(r1, research_prompt, "research_agent")
-    
-    print("\n🔹 RESEARCH_OUTPUT 🔹")
-    print(research_text)
-    print("🔹 END_RESEARCH 🔹\n")
-    
-    research_text = truncate_text(research_text, max_chars=6000)
-
-    # 2 — Outline Agent
-    r2 = _build_runner(outline_agent)
-    outline_prompt = base + "\nCreate a detailed outline from this research:\n" + research_text
-    outline_text = call_agent(r2, outline_prompt, "outline_agent")
-    
-    print("\n🔸 OUTLINE_OUTPUT 🔸")
-    print(outline_text)
-    print("🔸 END_OUTLINE 🔸\n")
-    
-    outline_text = truncate_text(outline_text, max_chars=6000)
-
-    # 3 — Draft Agent
-    r3 = _build_runner(draft_agent)
-    draft_prompt = base + "\nWrite the full blog from this outline:\n" + outline_text
-    draft_text = call_agent(r3, draft_prompt, "draft_agent")
-    
-    # NEW MARKER ADDED HERE 👇
-    print("\n🔹 DRAFT_OUTPUT 🔹")
-    print(draft_text)
-    print("🔹 END_DRAFT 🔹\n")
-    
-    draft_text = truncate_text(draft_text, max_chars=9000)
-
-    # 4 — Critic Agent
-    r4 = _build_runner(critic_agent)
-    critic_prompt = "Improve clarity & flow of this markdown blog:\n" + draft_text
-    critic_text = call_agent(r4, critic_prompt, "critic_agent")
-    
-    # NEW MARKER ADDED HERE 👇
-    print("\n🔹 CRITIC_OUTPUT 🔹")
-    print(critic_text)
-    print("🔹 END_CRITIC 🔹\n")
-    
-    critic_text = truncate_text(critic_text, max_chars=9000)
-
-    # 5 — SEO Agent
-    r5 = _build_runner(seo_agent)
-    seo_prompt = (
-        "Add SEO metadata (title, meta description, slug, keywords, social caption) "
-        "and return final improved blog markdown below the metadata:\n" + critic_text
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="AI Blog Production Agent (CLI Mode)")
+    parser.add_argument("--batch", metavar="JOBS_JSONL", help="Run every job in a JSONL file concurrently.")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_BATCH_CONCURRENCY, help="Max pipelines in flight in batch mode.")
+    parser.add_argument("--output", metavar="RESULTS_JSONL", help="Write batch results to this file.")
+    parser.add_argument("--resume", metavar="RUN_ID", help="Resume a checkpointed run ('latest' for the most recent).")
+    parser.add_argument("--no-cache", action="store_true", help="Always call the model, ignoring cached responses.")
+    parser.add_argument(
+        "--research-mode",
+        choices=pipeline.RESEARCH_MODES,
+        default="agent",
+        help="'fanout' plans subtopic queries and searches them concurrently.",
     )
-    final_text = call_agent(r5, seo_prompt, "seo_agent")
-
-    # 6 — Evaluation Agent
-    r_eval = _build_runner(evaluation_agent)
-    eval_prompt = (
-        "Evaluate this blog article and return JSON as specified in your instructions.\n\n"
-        f"Tone: {tone}\nAudience: {audience}\nTarget Word Count: {word_count}\n\n"
-        + final_text
+    parser.add_argument(
+        "--draft-mode",
+        choices=pipeline.DRAFT_MODES,
+        default="single",
+        help="'sections' drafts each outline section concurrently (for long articles).",
     )
-    eval_result = call_agent(r_eval, eval_prompt, "evaluation_agent")
-    
-    app_logger.log_event(
-        event_type="evaluation",
-        agent="evaluation_agent",
-        step="eval",
-        message="Evaluation completed.",
-        extra={"raw_eval": eval_result},
+    parser.add_argument(
+        "--review-mode",
+        choices=pipeline.REVIEW_MODES,
+        default="full",
+        help="'sections' re-runs critic/SEO only for draft sections that changed.",
+    )
+    parser.add_argument(
+        "--no-recall",
+        action="store_true",
+        help="Do not start research from earlier runs' notes, and do not index this run.",
+    )
+    parser.add_argument(
+        "--draft-file",
+        metavar="MARKDOWN",
+        help="With --resume: replace the run's draft with this (edited) file before resuming.",
+    )
+    parser.add_argument("--metrics", action="store_true", help="Print per-agent latency, token and cost metrics at the end.")
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="Serve Prometheus metrics on this local port while running (default: METRICS_PORT).",
+    )
+    parser.add_argument("--record", metavar="CASSETTE", help="Record model and search traffic to this cassette (.jsonl.gz).")
+    parser.add_argument(
+        "--replay",
+        metavar="CASSETTE",
+        help="Serve model and search traffic from a cassette; without --batch/--resume, re-run its recorded runs.",
     )
+    parser.add_argument(
+        "--replay-speed",
+        type=float,
+        default=1.0,
+        help="Divide recorded latencies and arrival times by this factor (0 = no waiting).",
+    )
+    return parser.parse_args(argv)
 
-    print("\n--- Evaluation ---")
-    print(eval_result)
-    print("------------------\n")
+def main(argv=None):
+    args = _parse_args(argv)
+    if args.record and args.replay:
+        print("Use either --record or --replay, not both.")
+        return
+    port = serve_metrics(args.metrics_port)
+    if port:
+        print(f"Metrics at http://127.0.0.1:{port}/metrics")
+    if args.record:
+        get_runtime()
+        pipeline.record_traffic(pipeline.BLOG_AGENTS, args.record)
+    try:
+        if args.replay:
+            get_runtime()
+            cassette = pipeline.replay_traffic(pipeline.BLOG_AGENTS, args.replay, speed=args.replay_speed)
+            if not (args.batch or args.resume):
+                _run_replay_cli(cassette, args.replay_speed, args.concurrency, not args.no_cache, _stages(args))
+                return
+        _run_cli(args)
+    finally:
+        if args.record:
+            pipeline.stop_recording(pipeline.BLOG_AGENTS)
+            print(f"Traffic recorded to {args.record}")
+        if args.metrics:
+            _print_metrics()
 
-    return final_text
+def _stages(args) -> List[Stage]:
+    return pipeline.build_blog_pipeline(
+        research_mode=args.research_mode,
+        draft_mode=args.draft_mode,
+        review_mode=args.review_mode,
+        recall=not args.no_recall,
+    )
 
-def main():
-    import sys
+def _run_cli(args) -> None:
     print("\n🧠 AI Blog Production Agent (CLI Mode)")
+    stages = _stages(args)
+    if args.batch:
+        _run_batch_cli(args.batch, args.concurrency, args.output, not args.no_cache, stages)
+        return
+
+    if args.draft_file and not args.resume:
+        print("--draft-file needs --resume RUN_ID.")
+        return
+
+    if args.resume:
+        run_id = pipeline.latest_run_id() if args.resume == "latest" else args.resume
+        store = pipeline.RunStore(run_id) if run_id else None
+        if store is None or not store.exists():
+            print(f"No checkpointed run found for '{args.resume}'.")
+            return
+        inputs = store.load_inputs()
+        if args.draft_file:
+            with open(args.draft_file, encoding="utf-8") as f:
+                rerun = store.replace_stage("draft", f.read(), stages)
+            print(f"\nReplaced the draft; will re-run: {', '.join(rerun)}")
+        print(f"\nResuming run {store.run_id} for: {inputs['topic']}\n")
+        blog = run_agent_pipeline(
+            inputs["topic"],
+            inputs["tone"],
+            inputs["audience"],
+            inputs["word_count"],
+            use_cache=not args.no_cache,
+            run_store=store,
+            extra_instructions=inputs.get("extra_instructions", ""),
+            stages=stages,
+        )
+        _print_final(blog, store)
+        return
+
     try:
         if not sys.stdin.isatty():
             lines = sys.stdin.read().splitlines()
@@ -221,13 +445,34 @@ def main():
         audience = "Tech"
         wc = "1000"
 
-    print(f"\nRunning pipeline for: {topic}\n")
-    blog = run_agent_pipeline(topic, tone, audience, wc)
+    store = pipeline.RunStore()
+    print(f"\nRunning pipeline for: {topic} (run id {store.run_id})\n")
+    blog = run_agent_pipeline(topic, tone, audience, wc, use_cache=not args.no_cache, run_store=store, stages=stages)
+    _print_final(blog, store)
 
+def _print_final(blog: str, store: RunStore) -> None:
     print("\n============================")
     print("📝 FINAL BLOG\n")
     print(blog)
     print("\n")
 
+    failed = store.failed_stages()
+    if failed:
+        print(f"⚠️ Failed stages: {', '.join(sorted(failed))}")
+        print(f"Resume with: python main.py --resume {store.run_id}\n")
+
+def _print_metrics() -> None:
+    rows = agent_summary()
+    if not rows:
+        return
+    print("📈 Agent metrics (slowest p95 first)\n")
+    print(f"{'agent':<18}{'calls':>6}{'cached':>7}{'p50 s':>8}{'p95 s':>8}{'ttft95':>8}{'tok in':>9}{'tok out':>9}{'tools':>6}{'cost $':>9}")
+    for r in rows:
+        print(
+            f"{r['agent']:<18}{r['calls']:>6.0f}{r['cache_hits']:>7.0f}{r['p50_sec']:>8.2f}{r['p95_sec']:>8.2f}"
+            f"{r['ttft_p95_sec']:>8.2f}{r['input_tokens']:>9}{r['output_tokens']:>9}{r['tool_calls']:>6.0f}{r['cost_usd']:>9.4f}"
+        )
+    print(f"\nEstimated spend: ${sum(r['cost_usd'] for r in rows):.4f}\n")
+
 if __name__ == "__main__":
     main()
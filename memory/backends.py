@@ -0,0 +1,355 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_STATE_PATH = os.path.join("state", "memory.sqlite3")
+
+
+class ValueTooLarge(ValueError):
+    pass
+
+
+class Snapshot:
+    """
+    Point-in-time, read-only view of a backend's scopes, made of one or more
+    `{scope: {key: value}}` parts that must not be mutated afterwards.
+    """
+
+    def __init__(self, states: Tuple[Dict[str, Dict[str, Any]], ...]) -> None:
+        self._states = states
+
+    def scopes(self) -> List[str]:
+        return sorted({scope for state in self._states for scope in state})
+
+    def items(self, scope: str) -> Dict[str, Any]:
+        merged: Dict[str, Any] = {}
+        for state in self._states:
+            merged.update(state.get(scope, {}))
+        return merged
+
+    def __iter__(self) -> Iterator[Tuple[str, str, Any]]:
+        for state in self._states:
+            for scope, values in state.items():
+                for key, value in values.items():
+                    yield scope, key, value
+
+
+class StorageBackend:
+    """
+    Scoped key/value storage shared by MemoryBank and SimpleSessionService.
+
+    Values are JSON-serialisable. Every backend enforces the same limits:
+    `max_value_bytes` per value, `max_list_items` per list (appending evicts
+    the least recently appended items, and re-appending an existing item
+    refreshes it), an idle `ttl_sec` per key, and `max_keys` overall with the
+    least recently used keys evicted first.
+    """
+
+    def __init__(
+        self,
+        max_value_bytes: int = 64 * 1024,
+        max_list_items: int = 100,
+        ttl_sec: Optional[float] = None,
+        max_keys: int = 10_000,
+    ) -> None:
+        self.max_value_bytes = max_value_bytes
+        self.max_list_items = max_list_items
+        self.ttl_sec = ttl_sec
+        self.max_keys = max_keys
+
+    def _encode(self, value: Any) -> str:
+        raw = json.dumps(value, ensure_ascii=False)
+        if len(raw.encode("utf-8")) > self.max_value_bytes:
+            raise ValueTooLarge(f"Value exceeds {self.max_value_bytes} bytes")
+        return raw
+
+    def _appended(self, current: Any, value: Any) -> List[Any]:
+        if current is None:
+            items: List[Any] = []
+        elif isinstance(current, list):
+            items = [item for item in current if item != value]
+        else:
+            # convert non-lists into list
+            items = [current]
+        items.append(value)
+        return items[-self.max_list_items:]
+
+    def _expired(self, accessed_at: float, now: float) -> bool:
+        return self.ttl_sec is not None and now - accessed_at > self.ttl_sec
+
+    def get(self, scope: str, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, scope: str, key: str, value: Any) -> None:
+        raise NotImplementedError
+
+    def append(self, scope: str, key: str, value: Any) -> None:
+        raise NotImplementedError
+
+    def delete(self, scope: str, key: Optional[str] = None) -> None:
+        """Delete one key, or the whole scope when `key` is None."""
+        raise NotImplementedError
+
+    def items(self, scope: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def scopes(self) -> List[str]:
+        raise NotImplementedError
+
+    def snapshot(self) -> Snapshot:
+        """Consistent copy of every scope; later writes do not show up in it."""
+        return Snapshot(({scope: self.items(scope) for scope in self.scopes()},))
+
+
+class _Shard:
+    """
+    One stripe of an InMemoryBackend. `state` is never mutated: writers
+    build a new scope dict and swap it in under `lock`, so readers and
+    snapshots use whatever `state` they grabbed without locking.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.state: Dict[str, Dict[str, Any]] = {}
+        self.accessed: Dict[Tuple[str, str], float] = {}
+        self.count = 0
+
+    def put(self, scope: str, key: str, value: Any) -> None:
+        values = dict(self.state.get(scope, {}))
+        if key not in values:
+            self.count += 1
+        values[key] = value
+        self.state = {**self.state, scope: values}
+        self.accessed[(scope, key)] = time.time()
+
+    def remove(self, entries: List[Tuple[str, str]]) -> None:
+        state = dict(self.state)
+        for scope, key in entries:
+            values = state.get(scope)
+            if values is None or key not in values:
+                continue
+            values = dict(values)
+            del values[key]
+            if values:
+                state[scope] = values
+            else:
+                state.pop(scope)
+            self.accessed.pop((scope, key), None)
+            self.count -= 1
+        self.state = state
+
+
+class InMemoryBackend(StorageBackend):
+    """
+    Process-local backend striped over `shards` independently locked shards
+    (by hash of scope and key). Reads never lock and writes only lock their
+    own shard. Shards are copy-on-write, so without a TTL `snapshot()` costs
+    O(shards). `max_keys` is split evenly between the shards.
+    """
+
+    def __init__(self, shards: int = 16, **limits: Any) -> None:
+        super().__init__(**limits)
+        self._shards = [_Shard() for _ in range(max(1, shards))]
+        self._shard_cap = max(1, -(-self.max_keys // len(self._shards)))
+
+    def _shard(self, scope: str, key: str) -> _Shard:
+        return self._shards[hash((scope, key)) % len(self._shards)]
+
+    def get(self, scope: str, key: str) -> Optional[Any]:
+        shard = self._shard(scope, key)
+        value = shard.state.get(scope, {}).get(key)
+        if value is None:
+            return None
+        now = time.time()
+        if self._expired(shard.accessed.get((scope, key), now), now):
+            self.delete(scope, key)
+            return None
+        shard.accessed[(scope, key)] = now
+        return value
+
+    def _evict(self, shard: _Shard) -> None:
+        # drop the least recently used tenth of the shard in one go so eviction stays rare
+        if shard.count <= self._shard_cap:
+            return
+        excess = shard.count - self._shard_cap + max(1, self._shard_cap // 10)
+        entries = [(scope, key) for scope, values in shard.state.items() for key in values]
+        entries.sort(key=lambda e: shard.accessed.get(e, 0.0))
+        shard.remove(entries[:excess])
+
+    def set(self, scope: str, key: str, value: Any) -> None:
+        self._encode(value)
+        shard = self._shard(scope, key)
+        with shard.lock:
+            shard.put(scope, key, value)
+            self._evict(shard)
+
+    def append(self, scope: str, key: str, value: Any) -> None:
+        shard = self._shard(scope, key)
+        with shard.lock:
+            current = shard.state.get(scope, {}).get(key)
+            if current is not None and self._expired(shard.accessed.get((scope, key), 0.0), time.time()):
+                current = None
+            items = self._appended(current, value)
+            self._encode(items)
+            shard.put(scope, key, items)
+            self._evict(shard)
+
+    def delete(self, scope: str, key: Optional[str] = None) -> None:
+        shards = [self._shard(scope, key)] if key is not None else self._shards
+        for shard in shards:
+            with shard.lock:
+                keys = [key] if key is not None else list(shard.state.get(scope, {}))
+                shard.remove([(scope, k) for k in keys])
+
+    def snapshot(self) -> Snapshot:
+        if self.ttl_sec is not None:
+            return super().snapshot()
+        return Snapshot(tuple(shard.state for shard in self._shards))
+
+    def items(self, scope: str) -> Dict[str, Any]:
+        now = time.time()
+        merged: Dict[str, Any] = {}
+        for shard in self._shards:
+            for key, value in shard.state.get(scope, {}).items():
+                if not self._expired(shard.accessed.get((scope, key), now), now):
+                    merged[key] = value
+        return merged
+
+    def scopes(self) -> List[str]:
+        return self.snapshot().scopes()
+
+
+class SqliteBackend(StorageBackend):
+    """
+    Embedded SQLite backend in WAL mode, so state survives restarts.
+
+    Each thread reads through its own connection, so readers never wait on
+    each other or on a writer. Read access times are buffered and written
+    with the next write, keeping reads free of writes.
+    """
+
+    def __init__(self, path: str = DEFAULT_STATE_PATH, table: str = "kv", **limits: Any) -> None:
+        super().__init__(**limits)
+        self.path = path
+        self.table = table
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._touched: Dict[tuple, float] = {}
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            " scope TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " accessed_at REAL NOT NULL,"
+            " PRIMARY KEY (scope, key))"
+        )
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, scope: str, key: str) -> Optional[Any]:
+        row = self._conn().execute(
+            f"SELECT value, accessed_at FROM {self.table} WHERE scope = ? AND key = ?", (scope, key)
+        ).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        accessed_at = max(row[1], self._touched.get((scope, key), 0.0))
+        if self._expired(accessed_at, now):
+            self.delete(scope, key)
+            return None
+        self._touched[(scope, key)] = now
+        return json.loads(row[0])
+
+    def _write(self, apply: Callable[[sqlite3.Connection], None]) -> None:
+        """Run `apply` in one write transaction, flushing buffered read access times."""
+        with self._write_lock:
+            conn = self._conn()
+            touched, self._touched = self._touched, {}
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                apply(conn)
+                conn.executemany(
+                    f"UPDATE {self.table} SET accessed_at = MAX(accessed_at, ?) WHERE scope = ? AND key = ?",
+                    [(ts, scope, key) for (scope, key), ts in touched.items()],
+                )
+                self._evict(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        if self.ttl_sec is not None:
+            conn.execute(f"DELETE FROM {self.table} WHERE accessed_at < ?", (time.time() - self.ttl_sec,))
+        count = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        if count > self.max_keys:
+            excess = count - self.max_keys + max(1, self.max_keys // 10)
+            conn.execute(
+                f"DELETE FROM {self.table} WHERE rowid IN"
+                f" (SELECT rowid FROM {self.table} ORDER BY accessed_at ASC LIMIT ?)",
+                (excess,),
+            )
+
+    def _upsert(self, conn: sqlite3.Connection, scope: str, key: str, raw: str) -> None:
+        conn.execute(
+            f"INSERT OR REPLACE INTO {self.table} (scope, key, value, accessed_at) VALUES (?, ?, ?, ?)",
+            (scope, key, raw, time.time()),
+        )
+
+    def set(self, scope: str, key: str, value: Any) -> None:
+        raw = self._encode(value)
+        self._write(lambda conn: self._upsert(conn, scope, key, raw))
+
+    def append(self, scope: str, key: str, value: Any) -> None:
+        def apply(conn: sqlite3.Connection) -> None:
+            # read-modify-write inside the transaction so concurrent appends are not lost
+            row = conn.execute(
+                f"SELECT value, accessed_at FROM {self.table} WHERE scope = ? AND key = ?", (scope, key)
+            ).fetchone()
+            current = None
+            if row is not None and not self._expired(row[1], time.time()):
+                current = json.loads(row[0])
+            self._upsert(conn, scope, key, self._encode(self._appended(current, value)))
+
+        self._write(apply)
+
+    def delete(self, scope: str, key: Optional[str] = None) -> None:
+        if key is None:
+            self._write(lambda conn: conn.execute(f"DELETE FROM {self.table} WHERE scope = ?", (scope,)))
+        else:
+            self._write(
+                lambda conn: conn.execute(f"DELETE FROM {self.table} WHERE scope = ? AND key = ?", (scope, key))
+            )
+
+    def items(self, scope: str) -> Dict[str, Any]:
+        cutoff = time.time() - self.ttl_sec if self.ttl_sec is not None else float("-inf")
+        rows = self._conn().execute(
+            f"SELECT key, value FROM {self.table} WHERE scope = ? AND accessed_at >= ?", (scope, cutoff)
+        ).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def scopes(self) -> List[str]:
+        rows = self._conn().execute(f"SELECT DISTINCT scope FROM {self.table} ORDER BY scope").fetchall()
+        return [row[0] for row in rows]
+
+
+def default_backend(table: str, **limits: Any) -> StorageBackend:
+    """Backend picked by MEMORY_BACKEND ("sqlite", the default, or "memory")."""
+    if os.getenv("MEMORY_BACKEND", "sqlite").lower() == "memory":
+        return InMemoryBackend(**limits)
+    return SqliteBackend(os.getenv("MEMORY_DB_PATH", DEFAULT_STATE_PATH), table=table, **limits)
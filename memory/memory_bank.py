@@ -1,34 +1,53 @@
-from typing import Any, Dict, List
-import threading
+from typing import Any, Dict, Optional
+
+from memory.backends import InMemoryBackend, StorageBackend, default_backend
+
+_SCOPE = "memory"
 
 
 class MemoryBank:
-    def __init__(self) -> None:
-        self._lock = threading.Lock()
-        self._store: Dict[str, Any] = {}
+    """
+    Long-term key/value memory on a pluggable StorageBackend (process-local
+    by default). Lists built with `append_to_list` keep at most the backend's
+    `max_list_items` most recent items.
+    """
+
+    def __init__(self, backend: Optional[StorageBackend] = None) -> None:
+        self.backend = backend or InMemoryBackend()
 
     def get(self, key: str, default: Any = None) -> Any:
-        with self._lock:
-            return self._store.get(key, default)
+        value = self.backend.get(_SCOPE, key)
+        return default if value is None else value
 
     def set(self, key: str, value: Any) -> None:
-        with self._lock:
-            self._store[key] = value
+        self.backend.set(_SCOPE, key, value)
 
     def append_to_list(self, key: str, value: Any) -> None:
-        with self._lock:
-            current = self._store.get(key)
-            if current is None:
-                self._store[key] = [value]
-            elif isinstance(current, list):
-                current.append(value)
-            else:
-                # convert non-lists into list
-                self._store[key] = [current, value]
+        self.backend.append(_SCOPE, key, value)
+
+    def delete(self, key: str) -> None:
+        self.backend.delete(_SCOPE, key)
 
     def all(self) -> Dict[str, Any]:
-        with self._lock:
-            return dict(self._store)
+        return self.backend.items(_SCOPE)
+
+
+_default_bank: Optional[MemoryBank] = None
+
+
+def default_memory_bank() -> MemoryBank:
+    """
+    Shared instance, persisted to SQLite unless MEMORY_BACKEND=memory. It is
+    built on first use, so importing this module touches no files.
+    """
+    global _default_bank
+    if _default_bank is None:
+        _default_bank = MemoryBank(default_backend("memory_bank"))
+    return _default_bank
 
 
-memory_bank = MemoryBank()
+def __getattr__(name: str) -> Any:
+    # `from memory.memory_bank import memory_bank` still works, and only then builds it
+    if name == "memory_bank":
+        return default_memory_bank()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,258 @@
+import hashlib
+import heapq
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from utils.context_manager import split_sections
+
+DEFAULT_KNOWLEDGE_PATH = os.path.join("state", "knowledge.sqlite3")
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:['-][a-z0-9]+)*")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from has have how i if in into is it its "
+    "of on or our so than that the their them then there these they this to was we were "
+    "what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word tokens without stopwords or single characters."""
+    return [t for t in _TOKEN.findall(text.lower()) if len(t) > 1 and t not in _STOPWORDS]
+
+
+def chunk_markdown(text: str, min_words: int = 60, max_words: int = 400) -> List[str]:
+    """
+    Split markdown into retrieval chunks along its headings. Short sections
+    are merged with the next one until a chunk has `min_words`; a chunk is
+    closed once it would exceed `max_words`.
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    words = 0
+    for heading, body in split_sections(text):
+        part = "\n".join(p for p in (heading, body) if p.strip()).strip()
+        size = len(part.split())
+        if current and words + size > max_words:
+            chunks.append("\n\n".join(current))
+            current, words = [], 0
+        current.append(part)
+        words += size
+        if words >= min_words:
+            chunks.append("\n\n".join(current))
+            current, words = [], 0
+    if current:
+        if chunks and words < min_words:
+            chunks[-1] += "\n\n" + "\n\n".join(current)
+        else:
+            chunks.append("\n\n".join(current))
+    return chunks
+
+
+@dataclass
+class Hit:
+    score: float
+    kind: str
+    title: str
+    text: str
+    added_at: float
+
+
+class KnowledgeStore:
+    """
+    BM25 index over past research notes, outlines and articles.
+
+    Documents are chunked by section and persisted to SQLite at `path`
+    (":memory:" keeps them in process only) together with their term counts,
+    so the in-memory inverted index is rebuilt on first use without
+    re-tokenizing. Adding a source replaces its previous chunks, and updates
+    the index incrementally. Only ids and term statistics are held in
+    memory; chunk text is read back for the top hits alone.
+    """
+
+    def __init__(self, path: str = DEFAULT_KNOWLEDGE_PATH, k1: float = 1.2, b: float = 0.75) -> None:
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._by_impact: Dict[str, List[Tuple[int, int]]] = {}
+        self._lengths: Dict[int, int] = {}
+        self._total_length = 0
+
+    def _db(self) -> sqlite3.Connection:
+        # opened lazily so constructing a store (e.g. at import time) does no I/O
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory and self.path != ":memory:":
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " source TEXT NOT NULL,"
+                " kind TEXT NOT NULL,"
+                " title TEXT NOT NULL,"
+                " text TEXT NOT NULL,"
+                " terms TEXT NOT NULL,"
+                " added_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS chunks_source ON chunks (source)")
+            for doc_id, terms in conn.execute("SELECT id, terms FROM chunks"):
+                self._index(doc_id, json.loads(terms))
+            self._conn = conn
+        return self._conn
+
+    def _index(self, doc_id: int, counts: Dict[str, int]) -> None:
+        for term, tf in counts.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+            self._by_impact.pop(term, None)
+        length = sum(counts.values())
+        self._lengths[doc_id] = length
+        self._total_length += length
+
+    def _unindex(self, doc_id: int, counts: Dict[str, int]) -> None:
+        for term in counts:
+            self._by_impact.pop(term, None)
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._lengths.pop(doc_id, 0)
+
+    @staticmethod
+    def source_id(kind: str, title: str) -> str:
+        return hashlib.sha256(f"{kind}\n{' '.join(title.casefold().split())}".encode("utf-8")).hexdigest()[:32]
+
+    def add(self, kind: str, title: str, text: str) -> int:
+        """Index `text` under (kind, title), replacing what was indexed for it before."""
+        source = self.source_id(kind, title)
+        chunks = [c for c in chunk_markdown(text) if tokenize(c)]
+        now = time.time()
+        with self._lock:
+            conn = self._db()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                old = conn.execute("SELECT id, terms FROM chunks WHERE source = ?", (source,)).fetchall()
+                conn.execute("DELETE FROM chunks WHERE source = ?", (source,))
+                added: List[Tuple[int, Dict[str, int]]] = []
+                for chunk in chunks:
+                    counts = dict(Counter(tokenize(chunk)))
+                    cursor = conn.execute(
+                        "INSERT INTO chunks (source, kind, title, text, terms, added_at) VALUES (?, ?, ?, ?, ?, ?)",
+                        (source, kind, title, chunk, json.dumps(counts), now),
+                    )
+                    added.append((cursor.lastrowid, counts))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            for doc_id, terms in old:
+                self._unindex(doc_id, json.loads(terms))
+            for doc_id, counts in added:
+                self._index(doc_id, counts)
+        return len(chunks)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._db()
+            return len(self._lengths)
+
+    def _impact_ordered(self, term: str, avg_length: float) -> List[Tuple[int, int]]:
+        """A term's postings, highest BM25 term weight first; cached until the term changes."""
+        ordered = self._by_impact.get(term)
+        if ordered is None:
+            k1, b, lengths = self.k1, self.b, self._lengths
+            ordered = sorted(
+                self._postings[term].items(),
+                key=lambda p: -p[1] / (p[1] + k1 * (1 - b + b * lengths[p[0]] / avg_length)),
+            )
+            self._by_impact[term] = ordered
+        return ordered
+
+    def _scores(self, terms: Iterable[str], max_candidates: int = 1000) -> Dict[int, float]:
+        """
+        BM25 scores, term at a time from the rarest term up, with the number
+        of scored chunks bounded by `max_candidates`: a term with a longer
+        posting list than that only adds to chunks that already have a
+        score, or, if none do yet, contributes its `max_candidates`
+        highest-weighted chunks. Such common terms carry little weight, so
+        this keeps large indexes fast at little cost in ranking.
+        """
+        n = len(self._lengths)
+        avg_length = self._total_length / n
+        k1, b, lengths = self.k1, self.b, self._lengths
+        scores: Dict[int, float] = {}
+        terms_by_rarity = sorted((t for t in set(terms) if t in self._postings), key=lambda t: len(self._postings[t]))
+        for term in terms_by_rarity:
+            postings = self._postings[term]
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            if len(postings) <= max_candidates:
+                matches = postings.items()
+            elif scores:
+                matches = [(d, postings[d]) for d in scores if d in postings]
+            else:
+                matches = self._impact_ordered(term, avg_length)[:max_candidates]
+            for doc_id, tf in matches:
+                norm = k1 * (1 - b + b * lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+        return scores
+
+    def search(
+        self,
+        query: str,
+        k: int = 4,
+        kinds: Optional[Sequence[str]] = None,
+        exclude_title: Optional[str] = None,
+    ) -> List[Hit]:
+        """
+        Top-`k` chunks for `query` by BM25, optionally limited to `kinds` and
+        skipping chunks indexed under `exclude_title`.
+        """
+        terms = tokenize(query)
+        with self._lock:
+            conn = self._db()
+            if not terms or not self._lengths:
+                return []
+            scores = self._scores(terms)
+            excluded = set()
+            if exclude_title is not None:
+                excluded = {self.source_id(kind, exclude_title) for kind in (kinds or self._kinds(conn))}
+            hits: List[Hit] = []
+            # over-fetch so filtering by kind or source can still fill `k`
+            candidates = heapq.nlargest(max(k * 4, 16), scores.items(), key=lambda item: item[1])
+            for doc_id, score in candidates:
+                row = conn.execute(
+                    "SELECT source, kind, title, text, added_at FROM chunks WHERE id = ?", (doc_id,)
+                ).fetchone()
+                if row is None or row[0] in excluded or (kinds and row[1] not in kinds):
+                    continue
+                hits.append(Hit(score=score, kind=row[1], title=row[2], text=row[3], added_at=row[4]))
+                if len(hits) >= k:
+                    break
+            return hits
+
+    @staticmethod
+    def _kinds(conn: sqlite3.Connection) -> List[str]:
+        return [row[0] for row in conn.execute("SELECT DISTINCT kind FROM chunks")]
+
+
+_default_store: Optional[KnowledgeStore] = None
+
+
+def default_knowledge_store() -> KnowledgeStore:
+    """Shared store at KNOWLEDGE_DB_PATH (default state/knowledge.sqlite3)."""
+    global _default_store
+    if _default_store is None:
+        _default_store = KnowledgeStore(os.getenv("KNOWLEDGE_DB_PATH", DEFAULT_KNOWLEDGE_PATH))
+    return _default_store
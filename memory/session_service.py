@@ -1,30 +1,52 @@
-from typing import Any, Dict
-import threading
+import os
+from typing import Any, Dict, Optional
+
+from memory.backends import InMemoryBackend, StorageBackend, default_backend
 
 
 class SimpleSessionService:
-    def __init__(self) -> None:
-        self._lock = threading.Lock()
-        self._sessions: Dict[str, Dict[str, Any]] = {}
+    """
+    Per-session key/value overrides on a pluggable StorageBackend
+    (process-local by default). Each session is its own scope.
+    """
 
-    def _ensure(self, session_id: str) -> Dict[str, Any]:
-        if session_id not in self._sessions:
-            self._sessions[session_id] = {}
-        return self._sessions[session_id]
+    def __init__(self, backend: Optional[StorageBackend] = None) -> None:
+        self.backend = backend or InMemoryBackend()
 
     def get(self, session_id: str, key: str, default: Any = None) -> Any:
-        with self._lock:
-            session = self._sessions.get(session_id, {})
-            return session.get(key, default)
+        value = self.backend.get(session_id, key)
+        return default if value is None else value
 
     def set(self, session_id: str, key: str, value: Any) -> None:
-        with self._lock:
-            session = self._ensure(session_id)
-            session[key] = value
+        self.backend.set(session_id, key, value)
+
+    def delete_session(self, session_id: str) -> None:
+        self.backend.delete(session_id)
 
     def dump(self) -> Dict[str, Dict[str, Any]]:
-        with self._lock:
-            return {k: dict(v) for k, v in self._sessions.items()}
+        snapshot = self.backend.snapshot()
+        return {scope: snapshot.items(scope) for scope in snapshot.scopes()}
+
+
+_default_service: Optional[SimpleSessionService] = None
+
+
+def default_session_service() -> SimpleSessionService:
+    """
+    Shared instance, persisted to SQLite unless MEMORY_BACKEND=memory; values
+    expire after PROFILE_SESSION_TTL_SEC (a day) without use. It is built on
+    first use, so importing this module touches no files.
+    """
+    global _default_service
+    if _default_service is None:
+        _default_service = SimpleSessionService(
+            default_backend("sessions", ttl_sec=float(os.getenv("PROFILE_SESSION_TTL_SEC", str(24 * 3600))))
+        )
+    return _default_service
 
 
-session_service = SimpleSessionService()
+def __getattr__(name: str) -> Any:
+    # `from memory.session_service import session_service` still works, and only then builds it
+    if name == "session_service":
+        return default_session_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,74 @@
+import importlib
+from typing import TYPE_CHECKING, Any, List
+
+# Exported name -> submodule. Submodules load on first use: the agents and
+# google-adk take about a second to import, and neither `import pipeline`
+# nor light helpers such as RunStore should pay for that.
+_EXPORTS = {
+    "AgentRuntime": "runtime",
+    "BLOG_AGENTS": "graph",
+    "BLOG_PIPELINE": "graph",
+    "Cassette": "cassette",
+    "DEFAULT_JOB_CONCURRENCY": "jobs",
+    "DRAFT_MODES": "modes",
+    "Job": "jobs",
+    "JobExecutor": "jobs",
+    "JobQueueFull": "jobs",
+    "PRIORITIES": "jobs",
+    "PIPELINE_INPUTS": "graph",
+    "RESEARCH_MODES": "modes",
+    "REVIEW_MODES": "modes",
+    "RUNS_DIR": "checkpoint",
+    "ResponseCache": "cache",
+    "RunStore": "checkpoint",
+    "SectionMemo": "incremental",
+    "Stage": "graph",
+    "assign_tools": "runtime",
+    "build_blog_pipeline": "graph",
+    "default_tools": "runtime",
+    "is_agent_error": "errors",
+    "latest_run_id": "checkpoint",
+    "pipeline_inputs": "blog",
+    "record_traffic": "cassette",
+    "replay_traffic": "cassette",
+    "response_cache_key": "cache",
+    "run_blog_pipeline": "blog",
+    "run_graph": "scheduler",
+    "stop_recording": "cassette",
+    "validate_graph": "graph",
+}
+
+__all__ = sorted(_EXPORTS)
+
+if TYPE_CHECKING:
+    from .blog import pipeline_inputs, run_blog_pipeline
+    from .cache import ResponseCache, response_cache_key
+    from .cassette import Cassette, record_traffic, replay_traffic, stop_recording
+    from .checkpoint import RUNS_DIR, RunStore, latest_run_id
+    from .errors import is_agent_error
+    from .graph import (
+        BLOG_AGENTS,
+        BLOG_PIPELINE,
+        PIPELINE_INPUTS,
+        Stage,
+        build_blog_pipeline,
+        validate_graph,
+    )
+    from .incremental import SectionMemo
+    from .jobs import DEFAULT_JOB_CONCURRENCY, PRIORITIES, Job, JobExecutor, JobQueueFull
+    from .modes import DRAFT_MODES, RESEARCH_MODES, REVIEW_MODES
+    from .runtime import AgentRuntime, assign_tools, default_tools
+    from .scheduler import run_graph
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,132 @@
+import json
+import re
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Sequence
+
+from app_logging.logger import app_logger
+from app_logging.tracing import span
+
+from .cassette import record_run
+from .checkpoint import RunStore
+from .graph import BLOG_PIPELINE, Stage
+from .runtime import AgentRuntime
+from .scheduler import StageDoneHook, StageHook, run_graph
+
+StageChunkHook = Callable[[Stage, str], None]
+
+_JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+
+
+@asynccontextmanager
+async def _existing_session(session_id: str) -> AsyncIterator[str]:
+    yield session_id
+
+
+def evaluation_scores(text: str) -> Dict[str, Any]:
+    """The numeric scores of an EvaluationAgent reply, or {} if it is not the expected JSON."""
+    match = _JSON_OBJECT.search(text or "")
+    try:
+        data = json.loads(match.group()) if match else None
+    except ValueError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    return {k: v for k, v in data.items() if isinstance(v, (int, float)) and not isinstance(v, bool)}
+
+
+def pipeline_inputs(
+    topic: str,
+    tone: str,
+    audience: str,
+    word_count,
+    extra_instructions: str = "",
+) -> Dict[str, str]:
+    return {
+        "topic": topic,
+        "tone": tone,
+        "audience": audience,
+        "word_count": str(word_count),
+        "extra_instructions": extra_instructions or "",
+    }
+
+
+async def run_blog_pipeline(
+    runtime: AgentRuntime,
+    inputs: Dict[str, str],
+    session_id: Optional[str] = None,
+    stages: Sequence[Stage] = BLOG_PIPELINE,
+    on_stage_start: Optional[StageHook] = None,
+    on_stage_end: Optional[StageDoneHook] = None,
+    use_cache: bool = True,
+    run_store: Optional[RunStore] = None,
+    on_stage_chunk: Optional[StageChunkHook] = None,
+    session_prefix: str = "run",
+) -> Dict[str, str]:
+    """
+    Run the blog graph and return every stage output.
+
+    All stages share one session. Unless `session_id` names an existing one,
+    a fresh session is opened for this run and closed when it ends.
+
+    With a `run_store`, each stage output is checkpointed as it completes and
+    stages already checkpointed successfully in that run are not re-run.
+    With `on_stage_chunk`, agent output is streamed as (stage, text delta).
+    """
+
+    completed = None
+    stage_end = on_stage_end
+    if run_store is not None:
+        run_store.save_inputs(inputs)
+        completed = run_store.reusable_outputs(stages)
+        if completed:
+            app_logger.log_event(
+                event_type="resume",
+                step="checkpoint",
+                message=f"Resuming run {run_store.run_id}.",
+                extra={"run_id": run_store.run_id, "reused_stages": sorted(completed)},
+            )
+
+        def _checkpoint_end(stage: Stage, text: str) -> None:
+            if stage.name not in completed:
+                run_store.save_stage(stage.name, text)
+            if on_stage_end:
+                on_stage_end(stage, text)
+
+        stage_end = _checkpoint_end
+
+    record_run(inputs)
+    session = _existing_session(session_id) if session_id else runtime.run_session(session_prefix)
+    # one trace per run: run -> stage -> agent.call -> model.generate / tool spans
+    with span("pipeline.run", run_id=run_store.run_id if run_store is not None else None, topic=inputs.get("topic")) as run_span:
+        async with session as run_session_id:
+            run_span.set(session_id=run_session_id)
+
+            async def _call(stage: Stage, prompt: str) -> str:
+                return await runtime.call_agent(
+                    stage.agent,
+                    prompt,
+                    run_session_id,
+                    agent_name=stage.agent.name,
+                    use_cache=use_cache,
+                    on_chunk=(lambda text: on_stage_chunk(stage, text)) if on_stage_chunk else None,
+                    stage=stage.name,
+                )
+
+            outputs = await run_graph(
+                stages,
+                inputs,
+                _call,
+                on_stage_start=on_stage_start,
+                on_stage_end=stage_end,
+                completed=completed,
+            )
+
+    if "evaluation" in outputs:
+        app_logger.log_event(
+            event_type="evaluation",
+            agent="evaluation_agent",
+            step="eval",
+            message="Evaluation completed.",
+            extra={"scores": evaluation_scores(outputs["evaluation"]), "chars": len(outputs["evaluation"])},
+        )
+    return outputs
@@ -0,0 +1,77 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Optional
+
+from app_logging.logger import app_logger
+from utils.cache import MemoryLRUCache, SqliteCache, TieredCache
+from utils.genai_client import agent_model_id
+
+DEFAULT_CACHE_PATH = os.path.join(".cache", "agent_responses.sqlite3")
+
+
+def response_cache_key(agent, prompt: str) -> str:
+    """Content address of one agent call: agent, model, instruction, tools and prompt."""
+    instruction = getattr(agent, "instruction", "")
+    if not isinstance(instruction, str):
+        instruction = getattr(instruction, "__qualname__", repr(instruction))
+    payload = {
+        "agent": agent.name,
+        "model": agent_model_id(agent),
+        "instruction": instruction,
+        "tools": sorted(getattr(t, "name", type(t).__name__) for t in (agent.tools or [])),
+        "prompt": prompt,
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+
+class ResponseCache:
+    """
+    Memory LRU in front of an on-disk SQLite tier, with hit/miss/bytes-saved
+    counters reported through app_logger. Both tiers expire entries after
+    `ttl_sec`.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        max_entries: int = 256,
+        ttl_sec: float = 7 * 24 * 3600,
+        max_bytes: int = 256 * 1024 * 1024,
+    ) -> None:
+        self._cache = TieredCache(
+            [
+                MemoryLRUCache(max_entries=max_entries, ttl_sec=ttl_sec),
+                SqliteCache(path, ttl_sec=ttl_sec, max_bytes=max_bytes),
+            ]
+        )
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    def get(self, key: str, agent_name: str) -> Optional[str]:
+        value = self._cache.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.bytes_saved += len(value.encode("utf-8"))
+            stats = self.stats()
+        app_logger.log_event(
+            event_type="cache",
+            agent=agent_name,
+            step="lookup",
+            message="hit" if value is not None else "miss",
+            extra={"key": key[:16], **stats},
+        )
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        self._cache.set(key, value)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "bytes_saved": self.bytes_saved}
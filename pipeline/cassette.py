@@ -0,0 +1,328 @@
+import asyncio
+import atexit
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncGenerator, Callable, Deque, Dict, List, Optional, Tuple
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+
+from app_logging.logger import app_logger
+from tools.search_cache import normalize_query
+from utils.genai_client import agent_model_id, shared_model
+from utils.rate_limiter import status_code
+
+GroundedSearch = Callable[[str, Optional[str]], str]
+
+
+class CassetteMiss(LookupError):
+    """A replayed request has no recording to serve."""
+
+
+class ReplayedError(Exception):
+    """A recorded model failure, raised again on replay with the same status code."""
+
+    def __init__(self, message: str, code: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.code = code
+
+
+def request_key(llm_request: LlmRequest) -> str:
+    """
+    Content address of one model request: the system instruction and the
+    conversation. Concurrent stages add their outputs to the shared session
+    in whatever order they finish, so the history is compared as a set and
+    only the latest message keeps its place.
+    """
+    system = getattr(llm_request.config, "system_instruction", None)
+    contents = [json.dumps(c.model_dump(mode="json", exclude_none=True), sort_keys=True) for c in llm_request.contents]
+    payload = {
+        "system": system if isinstance(system, (str, type(None))) else system.model_dump(mode="json", exclude_none=True),
+        "history": sorted(contents[:-1]),
+        "latest": contents[-1:],
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+
+class Cassette:
+    """
+    Model and search traffic as gzipped JSONL, one interaction per line:
+    - `model`: request key, agent, the responses with the delay before each
+    - `search`: normalized query, result, duration
+    - `run`: the pipeline inputs
+
+    Every line carries `t`, seconds since recording started.
+
+    A cassette opened with `record()` appends as interactions finish. One
+    opened with `load()` serves them back. Exact request matches come first.
+    Otherwise a model request gets the agent's next unused recording, so
+    traffic still replays after a prompt changes slightly. Strict mode
+    treats that as a miss.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.stats = {"recorded": 0, "exact": 0, "fallback": 0, "miss": 0}
+        self._lock = threading.Lock()
+        self._file = None
+        self._start = time.time()
+        self._entries: List[Dict[str, Any]] = []
+        self._by_key: Dict[Tuple[str, str], List[int]] = {}
+        self._by_agent: Dict[str, Deque[int]] = {}
+        self._used: set = set()
+
+    @classmethod
+    def record(cls, path: str) -> "Cassette":
+        cassette = cls(path)
+        # gzip members can be appended, so one file may hold several sessions
+        cassette._file = gzip.open(path, "at", encoding="utf-8")
+        atexit.register(cassette.close)
+        return cassette
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        cassette = cls(path)
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    cassette._add(json.loads(line))
+        return cassette
+
+    def _add(self, entry: Dict[str, Any]) -> None:
+        index = len(self._entries)
+        self._entries.append(entry)
+        if entry["kind"] == "run":
+            return
+        self._by_key.setdefault((entry["kind"], entry["key"]), []).append(index)
+        if entry["kind"] == "model":
+            self._by_agent.setdefault(entry["agent"], deque()).append(index)
+
+    def write(self, kind: str, **fields: Any) -> None:
+        entry = {"kind": kind, "t": round(time.time() - self._start, 3), **fields}
+        line = json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line)
+            self.stats["recorded"] += 1
+
+    def take(self, kind: str, key: str, agent: Optional[str] = None, strict: bool = False) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            matches = self._by_key.get((kind, key), [])
+            for index in matches:
+                if index not in self._used:
+                    self._used.add(index)
+                    self.stats["exact"] += 1
+                    return self._entries[index]
+            if matches:
+                # the same request again (a retry or a duplicate job): serve it again
+                self.stats["exact"] += 1
+                return self._entries[matches[-1]]
+            queue = self._by_agent.get(agent) if agent and not strict else None
+            while queue:
+                index = queue.popleft()
+                if index not in self._used:
+                    self._used.add(index)
+                    self.stats["fallback"] += 1
+                    return self._entries[index]
+            self.stats["miss"] += 1
+            return None
+
+    def runs(self) -> List[Dict[str, Any]]:
+        """Recorded pipeline runs in arrival order."""
+        return sorted((e for e in self._entries if e["kind"] == "run"), key=lambda e: e["t"])
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+_recording: Optional[Cassette] = None
+
+
+def record_run(inputs: Dict[str, str]) -> None:
+    """Note a pipeline run's inputs on the cassette being recorded, if any."""
+    if _recording is not None:
+        _recording.write("run", inputs=dict(inputs))
+
+
+class RecordingLlm(BaseLlm):
+    """Passes requests to `inner` and writes each exchange, with its timing, to the cassette."""
+
+    inner: BaseLlm
+    cassette: Cassette
+    agent: str
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        key = request_key(llm_request)
+        responses = []
+        last = start = time.perf_counter()
+        try:
+            async for response in self.inner.generate_content_async(llm_request, stream):
+                responses.append([round(time.perf_counter() - last, 4), response.model_dump(mode="json", exclude_none=True)])
+                yield response
+                # the caller's handling of the previous response is not backend time
+                last = time.perf_counter()
+        except Exception as exc:
+            self.cassette.write(
+                "model",
+                key=key,
+                agent=self.agent,
+                stream=stream,
+                responses=responses,
+                duration=round(time.perf_counter() - start, 4),
+                error={"message": f"{type(exc).__name__}: {exc}", "code": status_code(exc)},
+            )
+            raise
+        self.cassette.write(
+            "model",
+            key=key,
+            agent=self.agent,
+            stream=stream,
+            responses=responses,
+            duration=round(time.perf_counter() - start, 4),
+        )
+
+
+class ReplayLlm(BaseLlm):
+    """
+    Serves recorded responses instead of calling a model, keeping the
+    recorded gaps between them divided by `speed` (0 = no waiting).
+    """
+
+    cassette: Cassette
+    agent: str
+    speed: float = 1.0
+    strict: bool = False
+
+    async def _wait(self, delay: float) -> None:
+        if self.speed > 0 and delay > 0:
+            await asyncio.sleep(delay / self.speed)
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        entry = self.cassette.take("model", request_key(llm_request), self.agent, self.strict)
+        if entry is None:
+            raise CassetteMiss(f"No recorded response for {self.agent}")
+        pending = 0.0
+        for delay, data in entry["responses"]:
+            pending += delay
+            response = LlmResponse.model_validate(data)
+            if response.partial and not stream:
+                # recorded with streaming: fold the deltas' time into the aggregate
+                continue
+            await self._wait(pending)
+            pending = 0.0
+            yield response
+        error = entry.get("error")
+        if error:
+            await self._wait(entry["duration"] - sum(d for d, _ in entry["responses"]))
+            raise ReplayedError(error["message"], error.get("code"))
+
+
+def _recording_search(inner: GroundedSearch, cassette: Cassette) -> GroundedSearch:
+    def search(query: str, fallback_summary: Optional[str] = None) -> str:
+        start = time.perf_counter()
+        result = inner(query, fallback_summary)
+        cassette.write(
+            "search",
+            key=normalize_query(query),
+            query=query,
+            result=result,
+            duration=round(time.perf_counter() - start, 4),
+        )
+        return result
+
+    search.inner = inner
+    return search
+
+
+def _replaying_search(cassette: Cassette, speed: float) -> GroundedSearch:
+    def search(query: str, fallback_summary: Optional[str] = None) -> str:
+        entry = cassette.take("search", normalize_query(query))
+        if entry is None:
+            # same shape as an empty live search, which the tool never caches
+            return f"No search results or empty response for query: {query}"
+        if speed > 0:
+            time.sleep(entry["duration"] / speed)
+        return entry["result"]
+
+    return search
+
+
+def _search_tools(agents) -> List[Any]:
+    tools = {}
+    for agent in agents:
+        for tool in getattr(agent, "tools", None) or []:
+            if getattr(tool, "name", None) == "google_search" and hasattr(tool, "_grounded_search"):
+                tools[id(tool)] = tool
+    return list(tools.values())
+
+
+def record_traffic(agents, path: str) -> Cassette:
+    """
+    Record every model call of `agents` and every grounded search of their
+    `google_search` tools to the cassette at `path`, until `stop_recording`.
+    """
+    global _recording
+    cassette = Cassette.record(path)
+    for agent in agents:
+        model = agent.model
+        if isinstance(model, (RecordingLlm, ReplayLlm)):
+            continue
+        if isinstance(model, str):
+            model = shared_model(model)
+        agent.model = RecordingLlm(model=agent_model_id(agent), inner=model, cassette=cassette, agent=agent.name)
+    for tool in _search_tools(agents):
+        tool._grounded_search = _recording_search(tool._grounded_search, cassette)
+    _recording = cassette
+    app_logger.log_event(event_type="cassette", step="record", message=f"Recording traffic to {path}")
+    return cassette
+
+
+def stop_recording(agents) -> None:
+    """Restore the wrapped models and search tools, and close the cassette."""
+    global _recording
+    for agent in agents:
+        if isinstance(agent.model, RecordingLlm):
+            agent.model = agent.model.inner
+    for tool in _search_tools(agents):
+        inner = getattr(tool._grounded_search, "inner", None)
+        if inner is not None:
+            tool._grounded_search = inner
+    if _recording is not None:
+        _recording.close()
+        _recording = None
+
+
+def replay_traffic(agents, path: str, speed: float = 1.0, strict: bool = False) -> Cassette:
+    """
+    Serve every model call of `agents`, and every grounded search of their
+    `google_search` tools, from the cassette at `path`; nothing reaches the
+    network. `speed` divides the recorded latencies (0 = as fast as possible).
+    """
+    cassette = Cassette.load(path)
+    for agent in agents:
+        agent.model = ReplayLlm(
+            model=agent_model_id(agent), cassette=cassette, agent=agent.name, speed=speed, strict=strict
+        )
+    for tool in _search_tools(agents):
+        tool._grounded_search = _replaying_search(cassette, speed)
+    app_logger.log_event(
+        event_type="cassette",
+        step="replay",
+        message=f"Replaying traffic from {path} at {speed or 'max'}x",
+        extra={"entries": len(cassette._entries), "runs": len(cassette.runs())},
+    )
+    return cassette
@@ -0,0 +1,114 @@
+import json
+import os
+import time
+import uuid
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
+
+from .errors import is_agent_error
+
+if TYPE_CHECKING:
+    from .graph import Stage
+
+RUNS_DIR = "runs"
+
+
+def new_run_id() -> str:
+    return time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:6]
+
+
+class RunStore:
+    """
+    Persists the inputs and every stage output of one pipeline run under
+    `<root>/<run_id>/` so a failed run can be resumed without paying for the
+    stages that already succeeded.
+    """
+
+    def __init__(self, run_id: Optional[str] = None, root: str = RUNS_DIR) -> None:
+        self.run_id = run_id or new_run_id()
+        self.path = os.path.join(root, self.run_id)
+
+    def exists(self) -> bool:
+        return os.path.exists(os.path.join(self.path, "inputs.json"))
+
+    def _write_json(self, name: str, data: Dict) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        target = os.path.join(self.path, name)
+        tmp = target + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, target)
+
+    def save_inputs(self, inputs: Dict[str, str]) -> None:
+        self._write_json("inputs.json", inputs)
+
+    def load_inputs(self) -> Dict[str, str]:
+        with open(os.path.join(self.path, "inputs.json"), encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_stage(self, name: str, output: str) -> None:
+        self._write_json(
+            f"stage_{name}.json",
+            {
+                "stage": name,
+                "status": "failed" if is_agent_error(output) else "ok",
+                "output": output,
+                "ts": time.time(),
+            },
+        )
+
+    def load_stages(self) -> Dict[str, Dict]:
+        stages = {}
+        if not os.path.isdir(self.path):
+            return stages
+        for filename in os.listdir(self.path):
+            if filename.startswith("stage_") and filename.endswith(".json"):
+                with open(os.path.join(self.path, filename), encoding="utf-8") as f:
+                    record = json.load(f)
+                stages[record["stage"]] = record
+        return stages
+
+    def reusable_outputs(self, stages: Sequence["Stage"]) -> Dict[str, str]:
+        """
+        Outputs of stages that succeeded and whose upstream stages all
+        succeeded too. Everything else (missing, failed, or fed by a failed
+        stage) is re-run on resume.
+        """
+        saved = self.load_stages()
+        names = {s.name for s in stages}
+        reusable: Dict[str, str] = {}
+        # `stages` is validated, so one pass per level settles everything.
+        for _ in range(len(stages)):
+            for stage in stages:
+                record = saved.get(stage.name)
+                if stage.name in reusable or not record or record["status"] != "ok":
+                    continue
+                if all(i in reusable for i in stage.inputs if i in names):
+                    reusable[stage.name] = record["output"]
+        return reusable
+
+    def replace_stage(self, name: str, output: str, stages: Sequence["Stage"]) -> List[str]:
+        """
+        Overwrite one stage's output (e.g. a hand-edited draft) and drop the
+        checkpoints of every stage downstream of it, so a resume re-runs them
+        from the new text. Returns the names of the dropped stages.
+        """
+        stale = {name}
+        for _ in range(len(stages)):
+            stale |= {s.name for s in stages if any(i in stale for i in s.inputs)}
+        stale.discard(name)
+        for stage in stale:
+            path = os.path.join(self.path, f"stage_{stage}.json")
+            if os.path.exists(path):
+                os.remove(path)
+        self.save_stage(name, output)
+        return sorted(stale)
+
+    def failed_stages(self) -> List[str]:
+        return [name for name, r in self.load_stages().items() if r["status"] != "ok"]
+
+
+def latest_run_id(root: str = RUNS_DIR) -> Optional[str]:
+    if not os.path.isdir(root):
+        return None
+    runs = sorted(d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d)))
+    return runs[-1] if runs else None
@@ -0,0 +1,150 @@
+import asyncio
+import dataclasses
+import re
+from typing import Dict, List, Tuple
+
+from .errors import is_agent_error
+
+DEFAULT_SECTION_CONCURRENCY = 4
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+
+
+@dataclasses.dataclass
+class OutlineSection:
+    heading: str
+    body: str
+    level: int
+
+
+def section_level(lines: List[str]) -> int:
+    """Shallowest markdown heading level used more than once, or 0 if none is."""
+    levels = [len(m.group(1)) for m in (_HEADING.match(l.strip()) for l in lines) if m]
+    repeated = sorted({lvl for lvl in levels if levels.count(lvl) > 1})
+    return repeated[0] if repeated else 0
+
+
+def split_outline(outline: str) -> Tuple[str, List[OutlineSection]]:
+    """
+    Split a markdown outline into (title, sections).
+
+    Sections are cut at the shallowest heading level that occurs more than
+    once (usually `##`); deeper headings stay in their section's body. A
+    single `#` heading above them is taken as the title.
+    """
+    lines = outline.strip().splitlines()
+    level = section_level(lines)
+    if not level:
+        return "", []
+
+    title = ""
+    sections: List[OutlineSection] = []
+    for line in lines:
+        match = _HEADING.match(line.strip())
+        if match and len(match.group(1)) == level:
+            sections.append(OutlineSection(heading=match.group(2), body="", level=level))
+        elif match and len(match.group(1)) < level and not sections and not title:
+            title = match.group(2)
+        elif sections:
+            sections[-1].body += line + "\n"
+    for section in sections:
+        section.body = section.body.strip()
+    return title, sections
+
+
+def split_article(markdown: str) -> List[str]:
+    """
+    Split an article into raw section chunks at its section heading level.
+    Anything before the first section (title, intro) is its own chunk.
+    """
+    lines = markdown.strip().splitlines()
+    level = section_level(lines)
+    if not level:
+        return [markdown.strip()] if markdown.strip() else []
+    chunks: List[List[str]] = [[]]
+    for line in lines:
+        match = _HEADING.match(line.strip())
+        if match and len(match.group(1)) == level:
+            chunks.append([])
+        chunks[-1].append(line)
+    return [c for c in ("\n".join(chunk).strip() for chunk in chunks) if c]
+
+
+def _word_target(word_count: str) -> int:
+    match = re.search(r"\d+", word_count or "")
+    return int(match.group()) if match else 1500
+
+
+def _section_words(sections: List[OutlineSection], total: int) -> List[int]:
+    """Share the article's word count by how much outline each section has."""
+    weights = [1 + len(s.body.split()) for s in sections]
+    return [max(80, int(round(total * w / sum(weights), -1))) for w in weights]
+
+
+def section_prompt(
+    ctx: Dict[str, str],
+    title: str,
+    sections: List[OutlineSection],
+    index: int,
+    words: int,
+    base: str,
+) -> str:
+    section = sections[index]
+    marks = "#" * section.level
+    toc = "\n".join(
+        f"{'→ ' if i == index else '  '}{s.heading}" for i, s in enumerate(sections)
+    )
+    neighbours = []
+    if index > 0:
+        neighbours.append(f"Previous section: {sections[index - 1].heading}")
+    if index + 1 < len(sections):
+        neighbours.append(f"Next section: {sections[index + 1].heading}")
+    intro = sections[0].body if index > 0 else ""
+    return (
+        base
+        + f"\nYou are writing ONE section of the blog post \"{title or ctx['topic']}\".\n"
+        + "Article sections (yours is marked →):\n" + toc + "\n\n"
+        + "\n".join(neighbours) + ("\n" if neighbours else "")
+        + (f"\nThe article opens with ({sections[0].heading}):\n{intro}\n" if intro else "")
+        + f"\nWrite only this section, about {words} words, starting with the heading "
+        + f"`{marks} {section.heading}`. Do not repeat material that belongs to other sections "
+        + "and do not add a title or conclusion of your own.\n\n"
+        + f"Section outline:\n{section.body or section.heading}"
+    )
+
+
+def draft_sections(base_context, fallback_prompt, concurrency: int = DEFAULT_SECTION_CONCURRENCY):
+    """
+    Build the `run` step of a section-parallel draft stage.
+
+    The outline is split into sections, each section is drafted by the
+    stage's agent concurrently (`concurrency` at a time) with the shared
+    context it needs, and the results are stitched back together in order.
+    Outlines with fewer than two sections are drafted in one call using
+    `fallback_prompt`.
+    """
+
+    async def _run(ctx: Dict[str, str], stage, call) -> str:
+        title, sections = split_outline(ctx["outline"])
+        if len(sections) < 2:
+            return await call(stage, fallback_prompt(ctx))
+
+        base = base_context(ctx)
+        words = _section_words(sections, _word_target(ctx["word_count"]))
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def _one(index: int) -> str:
+            async with semaphore:
+                # a per-section stage name keeps concurrent chunks out of the draft's stream
+                section_stage = dataclasses.replace(stage, name=f"{stage.name}[{index}]")
+                prompt = section_prompt(ctx, title, sections, index, words[index], base)
+                return await call(section_stage, prompt)
+
+        parts = await asyncio.gather(*(_one(i) for i in range(len(sections))))
+        failed = [sections[i].heading for i, part in enumerate(parts) if is_agent_error(part)]
+        if failed:
+            return f"Error running {stage.agent.name}: sections failed: {', '.join(failed)}"
+        body = "\n\n".join(part.strip() for part in parts)
+        return (f"# {title}\n\n" + body) if title else body
+
+    return _run
@@ -0,0 +1,8 @@
+# Agent failures are reported as text (see AgentRuntime.call_agent) so the
+# pipeline keeps going; these prefixes let callers tell them apart. Kept out
+# of runtime.py so that checkpoints can be read without importing google-adk.
+AGENT_ERROR_PREFIXES = ("Error running ", "Error: No final response")
+
+
+def is_agent_error(text: str) -> bool:
+    return text.startswith(AGENT_ERROR_PREFIXES)
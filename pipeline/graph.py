@@ -0,0 +1,318 @@
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from blog_agents.research_agent import research_agent
+from blog_agents.research_planner_agent import research_planner_agent
+from blog_agents.outline_agent import outline_agent
+from blog_agents.draft_agent import draft_agent
+from blog_agents.critic_agent import critic_agent
+from blog_agents.seo_agent import seo_agent
+from blog_agents.evaluation_agent import evaluation_agent
+from memory.retrieval import KnowledgeStore, default_knowledge_store
+
+from .drafting import DEFAULT_SECTION_CONCURRENCY, draft_sections
+from .incremental import SectionMemo, incremental_sections
+from .modes import DRAFT_MODES, RESEARCH_MODES, REVIEW_MODES
+from .recall import DEFAULT_RECALL_K, recall_notes, remember_outputs, with_recall
+from .research import DEFAULT_MAX_QUERIES, DEFAULT_SEARCH_CONCURRENCY, SearchFn, fan_out_research
+
+BLOG_AGENTS = [
+    research_planner_agent,
+    research_agent,
+    outline_agent,
+    draft_agent,
+    critic_agent,
+    seo_agent,
+    evaluation_agent,
+]
+
+# Keys every pipeline run is seeded with.
+PIPELINE_INPUTS = ("topic", "tone", "audience", "word_count", "extra_instructions")
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    One node of the pipeline graph.
+
+    A stage either calls `agent` with the prompt returned by `build_prompt`,
+    awaits `run(ctx, stage, call)` for custom async work such as several
+    concurrent agent calls (the prompt is then only reported to
+    on_stage_start), or, when both are None, `build_prompt` is evaluated
+    locally and its return value is the stage output.
+
+    `max_tokens` is the context budget the output is compacted to (by
+    section, see `compact_to_budget`) before it is handed to downstream
+    stages. A stage with `raw_inputs` is given its inputs uncompacted instead.
+    """
+
+    name: str
+    build_prompt: Callable[[Dict[str, str]], str]
+    inputs: Tuple[str, ...] = ()
+    agent: Any = None
+    max_tokens: Optional[int] = None
+    run: Optional[Callable[..., Awaitable[str]]] = None
+    raw_inputs: bool = False
+
+
+def validate_graph(stages: Sequence[Stage], seeds: Sequence[str] = PIPELINE_INPUTS) -> None:
+    """Raise ValueError on duplicate names, unknown inputs or cycles."""
+    names = [s.name for s in stages]
+    if len(names) != len(set(names)):
+        raise ValueError(f"Duplicate stage names in pipeline: {names}")
+
+    known = set(seeds) | set(names)
+    for stage in stages:
+        missing = [i for i in stage.inputs if i not in known]
+        if missing:
+            raise ValueError(f"Stage '{stage.name}' depends on unknown inputs: {missing}")
+
+    resolved = set(seeds)
+    remaining = list(stages)
+    while remaining:
+        ready = [s for s in remaining if all(i in resolved for i in s.inputs)]
+        if not ready:
+            raise ValueError(
+                "Pipeline graph has a cycle between: " + ", ".join(s.name for s in remaining)
+            )
+        resolved.update(s.name for s in ready)
+        remaining = [s for s in remaining if s not in ready]
+
+
+def base_context(ctx: Dict[str, str]) -> str:
+    base = (
+        f"Topic: {ctx['topic']}\n"
+        f"Tone: {ctx['tone']}\n"
+        f"Audience: {ctx['audience']}\n"
+        f"Word Count: {ctx['word_count']}\n"
+    )
+    if ctx.get("extra_instructions"):
+        base += f"Extra Instructions: {ctx['extra_instructions']}\n"
+    return base
+
+
+def _research_prompt(ctx: Dict[str, str]) -> str:
+    return with_recall(
+        base_context(ctx) + "\nYou are ResearchAgent. Provide structured notes using google_search tool when helpful.",
+        ctx,
+    )
+
+
+def _research_plan_prompt(ctx: Dict[str, str]) -> str:
+    return with_recall(
+        base_context(ctx) + f"\nList up to {DEFAULT_MAX_QUERIES} web search queries that together cover this topic.",
+        ctx,
+    )
+
+
+def _recall_prompt(ctx: Dict[str, str]) -> str:
+    return "Searching earlier research, outlines and articles for: " + ctx["topic"]
+
+
+def _remember_prompt(ctx: Dict[str, str]) -> str:
+    return "Indexing this run's research, outline and article for later runs."
+
+
+def _research_queries(ctx: Dict[str, str]) -> str:
+    return "Searching:\n" + ctx["research_plan"]
+
+
+def _outline_prompt(ctx: Dict[str, str]) -> str:
+    return base_context(ctx) + "\nCreate a detailed outline from this research:\n" + ctx["research"]
+
+
+def _draft_prompt(ctx: Dict[str, str]) -> str:
+    return base_context(ctx) + "\nWrite the full blog from this outline:\n" + ctx["outline"]
+
+
+def _draft_sections_prompt(ctx: Dict[str, str]) -> str:
+    return "Drafting each section of this outline in parallel:\n" + ctx["outline"]
+
+
+def _critic_prompt(ctx: Dict[str, str]) -> str:
+    return "Improve clarity & flow of this markdown blog:\n" + ctx["draft"]
+
+
+def _seo_prompt(ctx: Dict[str, str]) -> str:
+    return (
+        "Generate SEO metadata (title, meta description, slug, keywords, social caption) "
+        "for this markdown blog. Return only the metadata:\n" + ctx["draft"]
+    )
+
+
+def _critic_section_prompt(section: str) -> str:
+    return (
+        "Improve clarity & flow of this section of a markdown blog. "
+        "Keep its heading and return only the improved section:\n" + section
+    )
+
+
+def _seo_section_prompt(section: str) -> str:
+    return (
+        "List the search keywords and a one-sentence summary for this section "
+        "of a markdown blog. Return only the keywords and the summary:\n" + section
+    )
+
+
+def _seo_combine_prompt(notes: List[str]) -> str:
+    return (
+        "Generate SEO metadata (title, meta description, slug, keywords, social caption) "
+        "for a markdown blog with these per-section keywords and summaries. "
+        "Return only the metadata:\n\n" + "\n\n".join(notes)
+    )
+
+
+def _incremental_prompt(ctx: Dict[str, str]) -> str:
+    return "Reviewing only the sections of the draft that changed:\n" + ctx["draft"]
+
+
+def _assemble_final(ctx: Dict[str, str]) -> str:
+    return ctx["seo"].strip() + "\n\n---\n\n" + ctx["critic"].strip()
+
+
+def _evaluation_prompt(ctx: Dict[str, str]) -> str:
+    return (
+        "Evaluate this blog article and return JSON as specified in your instructions.\n\n"
+        f"Tone: {ctx['tone']}\nAudience: {ctx['audience']}\nTarget Word Count: {ctx['word_count']}\n\n"
+        + ctx["final"]
+    )
+
+
+def build_blog_pipeline(
+    research_mode: str = "agent",
+    draft_mode: str = "single",
+    search: Optional[SearchFn] = None,
+    search_concurrency: int = DEFAULT_SEARCH_CONCURRENCY,
+    section_concurrency: int = DEFAULT_SECTION_CONCURRENCY,
+    review_mode: str = "full",
+    section_memo: Optional[SectionMemo] = None,
+    recall: bool = True,
+    knowledge: Optional[KnowledgeStore] = None,
+    recall_k: int = DEFAULT_RECALL_K,
+) -> List[Stage]:
+    """
+    Build the blog graph.
+
+    research_mode "agent" lets the ResearchAgent call google_search itself,
+    one query at a time. "fanout" has a planner agent list subtopic queries,
+    searches them concurrently (`search_concurrency` at a time) and merges
+    the results into research notes.
+
+    draft_mode "single" writes the article in one DraftAgent call.
+    "sections" drafts each outline section concurrently and stitches them
+    in order; its larger budget lets the critic see long drafts whole.
+
+    review_mode "full" sends the whole draft to the critic and SEO agents.
+    "sections" fingerprints each draft section and only sends sections that
+    changed since they were last reviewed; outputs for the rest come from
+    `section_memo` (a SectionMemo at its default path unless given).
+
+    With `recall`, research starts from the `recall_k` most relevant chunks
+    of earlier research, outlines and articles in `knowledge` (the shared
+    KnowledgeStore unless given), and every run's outputs are indexed there
+    once it is final.
+    """
+    recalled: Tuple[str, ...] = ()
+    memory: List[Stage] = []
+    if recall:
+        store = knowledge if knowledge is not None else default_knowledge_store()
+        recalled = ("recall",)
+        memory = [
+            Stage(
+                "recall",
+                _recall_prompt,
+                ("topic", "extra_instructions"),
+                max_tokens=1000,
+                run=recall_notes(store, recall_k),
+            ),
+            Stage(
+                "remember",
+                _remember_prompt,
+                ("research", "outline", "final"),
+                run=remember_outputs(store),
+                raw_inputs=True,
+            ),
+        ]
+
+    if research_mode == "agent":
+        research = [Stage("research", _research_prompt, recalled, agent=research_agent, max_tokens=1500)]
+    elif research_mode == "fanout":
+        research = [
+            Stage("research_plan", _research_plan_prompt, recalled, agent=research_planner_agent),
+            Stage(
+                "research",
+                _research_queries,
+                ("research_plan",) + recalled,
+                max_tokens=1500,
+                run=fan_out_research(
+                    research_agent,
+                    search=search,
+                    concurrency=search_concurrency,
+                    recall_key="recall" if recall else None,
+                ),
+            ),
+        ]
+    else:
+        raise ValueError(f"Unknown research mode '{research_mode}', expected one of {RESEARCH_MODES}")
+
+    if draft_mode == "single":
+        draft = Stage("draft", _draft_prompt, ("outline",), agent=draft_agent, max_tokens=3000)
+    elif draft_mode == "sections":
+        draft = Stage(
+            "draft",
+            _draft_sections_prompt,
+            ("outline",),
+            agent=draft_agent,
+            max_tokens=8000,
+            run=draft_sections(base_context, _draft_prompt, concurrency=section_concurrency),
+        )
+    else:
+        raise ValueError(f"Unknown draft mode '{draft_mode}', expected one of {DRAFT_MODES}")
+
+    if review_mode == "full":
+        review = [
+            Stage("critic", _critic_prompt, ("draft",), agent=critic_agent),
+            Stage("seo", _seo_prompt, ("draft",), agent=seo_agent),
+        ]
+    elif review_mode == "sections":
+        memo = section_memo or SectionMemo()
+        review = [
+            Stage(
+                "critic",
+                _incremental_prompt,
+                ("draft",),
+                agent=critic_agent,
+                run=incremental_sections("draft", _critic_section_prompt, memo, concurrency=section_concurrency),
+            ),
+            Stage(
+                "seo",
+                _incremental_prompt,
+                ("draft",),
+                agent=seo_agent,
+                run=incremental_sections(
+                    "draft",
+                    _seo_section_prompt,
+                    memo,
+                    combine_prompt=_seo_combine_prompt,
+                    concurrency=section_concurrency,
+                ),
+            ),
+        ]
+    else:
+        raise ValueError(f"Unknown review mode '{review_mode}', expected one of {REVIEW_MODES}")
+
+    # SEO metadata only needs the draft, so it runs alongside the critic pass
+    # and is stitched onto the critic's body in the local "final" stage.
+    stages = memory[:1] + research + [
+        Stage("outline", _outline_prompt, ("research",), agent=outline_agent, max_tokens=1500),
+        draft,
+        *review,
+        Stage("final", _assemble_final, ("seo", "critic"), max_tokens=4000),
+        Stage("evaluation", _evaluation_prompt, ("tone", "audience", "word_count", "final"), agent=evaluation_agent),
+        *memory[1:],
+    ]
+    validate_graph(stages)
+    return stages
+
+
+BLOG_PIPELINE: List[Stage] = build_blog_pipeline()
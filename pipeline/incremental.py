@@ -0,0 +1,107 @@
+import asyncio
+import dataclasses
+import hashlib
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+from app_logging.logger import app_logger
+from utils.cache import MemoryLRUCache, SqliteCache, TieredCache
+
+from .cache import response_cache_key
+from .drafting import split_article
+from .errors import is_agent_error
+
+DEFAULT_SECTION_MEMO_PATH = os.path.join(".cache", "section_outputs.sqlite3")
+
+
+def fingerprint(text: str) -> str:
+    """Hash of a section with whitespace normalized, so reflowing alone is not an edit."""
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+class SectionMemo:
+    """
+    Per-section outputs of the incremental critic/SEO passes, keyed by the
+    stage, the agent's configuration and the section fingerprint. With
+    `path=None` nothing is written to disk.
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_SECTION_MEMO_PATH, max_entries: int = 512) -> None:
+        tiers = [MemoryLRUCache(max_entries=max_entries)]
+        if path is not None:
+            tiers.append(SqliteCache(path))
+        self._cache = TieredCache(tiers)
+
+    @staticmethod
+    def key(stage_name: str, agent, section: str) -> str:
+        # the agent part changes whenever its model, instruction or tools do
+        return f"{stage_name}:{response_cache_key(agent, '')[:16]}:{fingerprint(section)}"
+
+    def get(self, key: str) -> Optional[str]:
+        return self._cache.get(key)
+
+    def set(self, key: str, value: str) -> None:
+        self._cache.set(key, value)
+
+
+def incremental_sections(
+    source: str,
+    section_prompt: Callable[[str], str],
+    memo: SectionMemo,
+    combine: Optional[Callable[[List[str]], str]] = None,
+    combine_prompt: Optional[Callable[[List[str]], str]] = None,
+    concurrency: int = 4,
+):
+    """
+    Build the `run` step of a section-level stage over ctx[source].
+
+    Each section is fingerprinted; only sections whose fingerprint has no
+    memoized output are sent to the stage's agent (`concurrency` at a time).
+    The per-section outputs are then joined with `combine`, or, with
+    `combine_prompt`, summarised by one more agent call that is memoized on
+    the fingerprints of everything it was given.
+    """
+
+    async def _run(ctx: Dict[str, str], stage, call) -> str:
+        sections = split_article(ctx[source])
+        keys = [SectionMemo.key(stage.name, stage.agent, s) for s in sections]
+        outputs: List[Optional[str]] = [memo.get(k) for k in keys]
+        changed = [i for i, out in enumerate(outputs) if out is None]
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        start = time.perf_counter()
+
+        async def _one(index: int) -> None:
+            async with semaphore:
+                section_stage = dataclasses.replace(stage, name=f"{stage.name}[{index}]")
+                text = await call(section_stage, section_prompt(sections[index]))
+            outputs[index] = text
+            if not is_agent_error(text):
+                memo.set(keys[index], text)
+
+        await asyncio.gather(*(_one(i) for i in changed))
+        app_logger.log_event(
+            event_type="incremental",
+            agent=stage.agent.name,
+            step=stage.name,
+            duration_sec=time.perf_counter() - start,
+            message=f"{len(changed)}/{len(sections)} sections changed",
+            extra={"sections": len(sections), "changed": len(changed), "reused": len(sections) - len(changed)},
+        )
+
+        failed = [i for i, out in enumerate(outputs) if is_agent_error(out)]
+        if failed:
+            return f"Error running {stage.agent.name}: sections failed: {failed}"
+        if combine_prompt is None:
+            return (combine or "\n\n".join)(outputs)
+
+        summary_key = SectionMemo.key(stage.name, stage.agent, "\n".join(keys))
+        cached = memo.get(summary_key)
+        if cached is not None:
+            return cached
+        result = await call(stage, combine_prompt(outputs))
+        if not is_agent_error(result):
+            memo.set(summary_key, result)
+        return result
+
+    return _run
@@ -0,0 +1,394 @@
+import asyncio
+import itertools
+import os
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+from app_logging.logger import app_logger
+from utils.metrics import metrics
+
+from .blog import run_blog_pipeline
+from .checkpoint import RunStore
+from .errors import is_agent_error
+from .graph import BLOG_PIPELINE, Stage
+from .runtime import AgentRuntime
+
+JOB_STATES = ("queued", "running", "done", "failed", "cancelled")
+FINISHED_STATES = ("done", "failed", "cancelled")
+# priority name -> queue order; lower starts first
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+DEFAULT_JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "4"))
+
+metrics.describe("job_wait_seconds", "Time a pipeline job spent queued before it started")
+metrics.describe("job_duration_seconds", "Wall time of one pipeline job once started")
+metrics.describe("jobs_total", "Pipeline jobs by final status")
+metrics.describe("jobs_in_flight", "Pipeline jobs queued or running")
+metrics.describe("jobs_rejected_total", "Pipeline jobs refused because the queue was full")
+
+
+@dataclass
+class Job:
+    """
+    One pipeline run owned by a JobExecutor. Progress is written from the
+    executor's loop thread and read from any other thread: readers take a
+    `snapshot()`, or block in `wait()` until something changes.
+    """
+
+    job_id: str
+    inputs: Dict[str, str]
+    stage_names: List[str]
+    run_id: Optional[str] = None
+    priority: str = "normal"
+    seq: int = 0
+    status: str = "queued"
+    created: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    outputs: Dict[str, str] = field(default_factory=dict)
+    error: Optional[str] = None
+    # stage_start / stage_end / status, in order; streamed text is not an event
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    prompts: Dict[str, str] = field(default_factory=dict)
+    version: int = 0
+    _text: Dict[str, str] = field(default_factory=dict, repr=False)
+    _pending: Dict[str, List[str]] = field(default_factory=dict, repr=False)
+    _cond: threading.Condition = field(default_factory=threading.Condition, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    @property
+    def failed_stages(self) -> List[str]:
+        return [name for name, text in self.outputs.items() if is_agent_error(text)]
+
+    def _changed(self) -> None:
+        # caller holds _cond
+        self.version += 1
+        self._cond.notify_all()
+
+    def _event(self, kind: str, **fields: Any) -> None:
+        with self._cond:
+            self.events.append({"seq": len(self.events), "type": kind, "t": time.time(), **fields})
+            self._changed()
+
+    def _set_status(self, status: str, **fields: Any) -> None:
+        with self._cond:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self.status = status
+            self.events.append({"seq": len(self.events), "type": "status", "t": time.time(), "status": status})
+            self._changed()
+
+    def _chunk(self, stage: str, text: str) -> None:
+        with self._cond:
+            self._pending.setdefault(stage, []).append(text)
+            self._changed()
+
+    def _stage_end(self, stage: str, text: str, agent: Optional[str]) -> None:
+        with self._cond:
+            self._pending.pop(stage, None)
+            self._text[stage] = text
+            self.outputs[stage] = text
+            self.events.append(
+                {"seq": len(self.events), "type": "stage_end", "t": time.time(), "stage": stage, "agent": agent}
+            )
+            self._changed()
+
+    def snapshot(self, since: int = 0) -> Dict[str, Any]:
+        """
+        A consistent copy of the job's state: each stage's text so far
+        (streamed, or final once the stage ended) and the events from
+        sequence number `since` on.
+        """
+        with self._cond:
+            for stage, parts in self._pending.items():
+                if parts:
+                    self._text[stage] = self._text.get(stage, "") + "".join(parts)
+                    parts.clear()
+            done = {e["stage"] for e in self.events if e["type"] == "stage_end"}
+            return {
+                "job_id": self.job_id,
+                "run_id": self.run_id,
+                "priority": self.priority,
+                "status": self.status,
+                "inputs": dict(self.inputs),
+                "created": self.created,
+                "started": self.started,
+                "finished": self.finished,
+                "stages": list(self.stage_names),
+                "completed": [name for name in self.stage_names if name in done],
+                "progress": len(done) / len(self.stage_names) if self.stage_names else 0.0,
+                "text": dict(self._text),
+                "prompts": dict(self.prompts),
+                "events": self.events[since:],
+                "error": self.error,
+                "failed_stages": self.failed_stages if self.done else [],
+                "version": self.version,
+            }
+
+    def wait(self, version: int, timeout: Optional[float] = None) -> int:
+        """Block until the job has changed since `version` (or finished); returns the current version."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.version > version or self.done, timeout)
+            return self.version
+
+
+class JobQueueFull(RuntimeError):
+    """Raised by `JobExecutor.submit` when `max_queued` jobs are already waiting."""
+
+
+class JobExecutor:
+    """
+    Process-wide owner of pipeline runs. `concurrency` workers on one
+    background event loop take jobs from a priority queue (by priority, then
+    submission order), so jobs outlive whatever submitted them: a Streamlit
+    rerun or a closed browser tab does not stop a generation, and the UI
+    reattaches by job id.
+
+    With `max_queued`, `submit` raises JobQueueFull instead of queueing
+    more than that many waiting jobs. The last `keep_finished` finished jobs
+    stay available for their results.
+    """
+
+    def __init__(
+        self,
+        runtime: AgentRuntime,
+        concurrency: int = DEFAULT_JOB_CONCURRENCY,
+        keep_finished: int = 100,
+        max_queued: Optional[int] = None,
+    ) -> None:
+        self.runtime = runtime
+        self.concurrency = max(1, concurrency)
+        self.keep_finished = keep_finished
+        self.max_queued = max_queued
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        metrics.register_collector("jobs", self._gauges)
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        # caller holds _lock
+        if self._loop is None:
+            loop = asyncio.new_event_loop()
+            started = threading.Event()
+
+            def _serve() -> None:
+                asyncio.set_event_loop(loop)
+                self._queue = asyncio.PriorityQueue()
+                for n in range(self.concurrency):
+                    loop.create_task(self._worker(), name=f"job-worker-{n}")
+                started.set()
+                loop.run_forever()
+
+            threading.Thread(target=_serve, name="pipeline-jobs", daemon=True).start()
+            started.wait()
+            self._loop = loop
+        return self._loop
+
+    def submit(
+        self,
+        inputs: Dict[str, str],
+        stages: Optional[Sequence[Stage]] = None,
+        *,
+        run_store: Optional[RunStore] = None,
+        use_cache: bool = True,
+        stream: bool = True,
+        keep_prompts: bool = False,
+        session_prefix: str = "job",
+        priority: str = "normal",
+    ) -> Job:
+        """
+        Queue one pipeline run and return its Job at once. With `stream`,
+        each stage's text is visible while it is generated; with
+        `keep_prompts`, the prompt sent to each stage is kept on the job.
+        `priority` is one of PRIORITIES; higher-priority jobs start first.
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority {priority!r}; expected one of {', '.join(PRIORITIES)}")
+        stages = list(stages) if stages is not None else list(BLOG_PIPELINE)
+        job = Job(
+            job_id=uuid.uuid4().hex[:12],
+            inputs=dict(inputs),
+            stage_names=[s.name for s in stages],
+            run_id=run_store.run_id if run_store is not None else None,
+            priority=priority,
+        )
+        spec = (stages, run_store, use_cache, stream, keep_prompts, session_prefix)
+        with self._lock:
+            if self.max_queued is not None and self._queued_locked() >= self.max_queued:
+                metrics.inc("jobs_rejected_total", priority=priority)
+                raise JobQueueFull(f"{self.max_queued} jobs are already queued")
+            loop = self._ensure_loop()
+            job.seq = next(self._seq)
+            self._jobs[job.job_id] = job
+            loop.call_soon_threadsafe(self._queue.put_nowait, (PRIORITIES[priority], job.seq, job, spec))
+        app_logger.log_event(
+            event_type="job",
+            step="submit",
+            message=f"Job {job.job_id} queued.",
+            extra={"job_id": job.job_id, "run_id": job.run_id, "priority": priority, "topic": inputs.get("topic")},
+        )
+        return job
+
+    def _queued_locked(self) -> int:
+        return sum(1 for job in self._jobs.values() if job.status == "queued")
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, job, spec = await self._queue.get()
+            with job._cond:
+                if job.done:
+                    # cancelled while it was queued
+                    continue
+                job._set_status("running", started=time.time())
+            metrics.observe("job_wait_seconds", job.started - job.created)
+            task = self._tasks[job.job_id] = asyncio.ensure_future(self._run(job, *spec))
+            # a task cancelled before its first step never reaches _run's handler
+            task.add_done_callback(lambda t, job=job: t.cancelled() and self._finished(job, "cancelled"))
+            await asyncio.wait({task})
+            self._tasks.pop(job.job_id, None)
+
+    async def _run(
+        self,
+        job: Job,
+        stages: Sequence[Stage],
+        run_store: Optional[RunStore],
+        use_cache: bool,
+        stream: bool,
+        keep_prompts: bool,
+        session_prefix: str,
+    ) -> None:
+        def _on_start(stage: Stage, prompt: str) -> None:
+            with job._cond:
+                if keep_prompts:
+                    job.prompts[stage.name] = prompt
+                job._event("stage_start", stage=stage.name, agent=stage.agent.name if stage.agent else None)
+
+        def _on_end(stage: Stage, text: str) -> None:
+            job._stage_end(stage.name, text, stage.agent.name if stage.agent else None)
+
+        try:
+            outputs = await run_blog_pipeline(
+                self.runtime,
+                job.inputs,
+                stages=stages,
+                session_prefix=session_prefix,
+                on_stage_start=_on_start,
+                on_stage_end=_on_end,
+                use_cache=use_cache,
+                run_store=run_store,
+                on_stage_chunk=(lambda stage, text: job._chunk(stage.name, text)) if stream else None,
+            )
+        except asyncio.CancelledError:
+            self._finished(job, "cancelled")
+            raise
+        except Exception as exc:
+            app_logger.log_error(
+                "jobs",
+                "run",
+                f"Job {job.job_id} failed: {exc}",
+                extra={"job_id": job.job_id, "traceback": traceback.format_exc()},
+            )
+            self._finished(job, "failed", error=f"{type(exc).__name__}: {exc}")
+        else:
+            self._finished(job, "done", outputs=outputs)
+
+    def _finished(self, job: Job, status: str, **fields: Any) -> None:
+        with job._cond:
+            if job.done:
+                return
+            job._set_status(status, finished=time.time(), **fields)
+        if job.started is not None:
+            metrics.observe("job_duration_seconds", job.finished - job.started)
+        metrics.inc("jobs_total", status=status)
+        app_logger.log_event(
+            event_type="job",
+            step=status,
+            duration_sec=job.finished - job.created,
+            message=f"Job {job.job_id} {status}.",
+            extra={"job_id": job.job_id, "run_id": job.run_id, "failed_stages": job.failed_stages, "error": job.error},
+        )
+        with self._lock:
+            finished = [j for j in self._jobs.values() if j.done]
+            for old in finished[: max(0, len(finished) - self.keep_finished)]:
+                del self._jobs[old.job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> List[Job]:
+        """Known jobs, oldest first."""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def position(self, job: Job) -> Optional[int]:
+        """How many queued jobs start before `job` (0 = next), or None if it is not queued."""
+        with self._lock:
+            if job.status != "queued":
+                return None
+            key = (PRIORITIES[job.priority], job.seq)
+            return sum(
+                1 for other in self._jobs.values()
+                if other.status == "queued" and (PRIORITIES[other.priority], other.seq) < key
+            )
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job; False if it is unknown or already finished."""
+        job = self.get(job_id)
+        if job is None:
+            return False
+        with job._cond:
+            if job.done:
+                return False
+            if job.status == "queued":
+                # the worker that dequeues it skips it
+                self._finished(job, "cancelled")
+                return True
+        # running: its task exists on the loop by the time this callback runs
+        self._loop.call_soon_threadsafe(self._cancel_task, job_id)
+        return True
+
+    def _cancel_task(self, job_id: str) -> None:
+        task = self._tasks.get(job_id)
+        if task is not None:
+            task.cancel()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counts = {"queued": 0, "running": 0}
+            for job in self._jobs.values():
+                if job.status in counts:
+                    counts[job.status] += 1
+        return {**counts, "concurrency": self.concurrency, "max_queued": self.max_queued or 0}
+
+    def _gauges(self):
+        stats = self.stats()
+        return [("jobs_in_flight", {"status": status}, stats[status]) for status in ("queued", "running")]
+
+    def shutdown(self, cancel: bool = True, timeout: float = 10.0) -> None:
+        """
+        Stop the loop. Unfinished jobs are cancelled first (waiting at most
+        `timeout` seconds for them to unwind), or, with `cancel=False`,
+        waited for.
+        """
+        deadline = time.monotonic() + timeout if cancel else None
+        for job in self.jobs():
+            if cancel:
+                self.cancel(job.job_id)
+            while not job.done and (deadline is None or time.monotonic() < deadline):
+                job.wait(job.version, 1.0)
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
@@ -0,0 +1,5 @@
+# Options of build_blog_pipeline. They live apart from graph.py so argument
+# parsers can list them without loading the agents.
+RESEARCH_MODES = ("agent", "fanout")
+DRAFT_MODES = ("single", "sections")
+REVIEW_MODES = ("full", "sections")
@@ -0,0 +1,75 @@
+import asyncio
+import time
+from typing import Dict
+
+from app_logging.logger import app_logger
+from memory.retrieval import KnowledgeStore
+
+from .errors import is_agent_error
+
+DEFAULT_RECALL_K = 4
+
+# stage output -> kind it is indexed as
+REMEMBERED_STAGES = {"research": "research", "outline": "outline", "final": "article"}
+
+
+def _recall_query(ctx: Dict[str, str]) -> str:
+    return " ".join(filter(None, (ctx["topic"], ctx.get("extra_instructions"))))
+
+
+def recall_notes(store: KnowledgeStore, k: int = DEFAULT_RECALL_K):
+    """
+    Build the `run` step of a local `recall` stage: the top-`k` chunks of
+    past research, outlines and articles for the topic, or "" when nothing
+    relevant has been indexed yet. What an earlier run on the same topic
+    indexed is skipped: recalling it would change the prompt of a rerun and
+    miss the response cache.
+    """
+
+    async def _run(ctx: Dict[str, str], stage, call) -> str:
+        start = time.perf_counter()
+        # the first search loads the index from disk; keep the event loop free meanwhile
+        hits = await asyncio.to_thread(store.search, _recall_query(ctx), k, exclude_title=ctx["topic"])
+        app_logger.log_event(
+            event_type="recall",
+            agent="knowledge",
+            step="search",
+            duration_sec=time.perf_counter() - start,
+            message=f"{len(hits)} earlier notes recalled",
+            extra={"hits": [{"kind": h.kind, "title": h.title, "score": round(h.score, 2)} for h in hits]},
+        )
+        return "\n\n".join(f"### From an earlier {h.kind}: {h.title}\n{h.text}" for h in hits)
+
+    return _run
+
+
+def remember_outputs(store: KnowledgeStore):
+    """
+    Build the `run` step of a local `remember` stage that indexes this run's
+    research notes, outline and final article under its topic, replacing
+    whatever an earlier run on the same topic indexed. The stage needs
+    `raw_inputs`, so the full texts are indexed rather than their compacted
+    context.
+    """
+
+    async def _run(ctx: Dict[str, str], stage, call) -> str:
+        indexed = {}
+        for name, kind in REMEMBERED_STAGES.items():
+            text = ctx.get(name, "")
+            if text.strip() and not is_agent_error(text):
+                indexed[kind] = await asyncio.to_thread(store.add, kind, ctx["topic"], text)
+        return "Indexed " + (", ".join(f"{n} {kind} chunks" for kind, n in indexed.items()) or "nothing")
+
+    return _run
+
+
+def with_recall(prompt: str, ctx: Dict[str, str]) -> str:
+    """Append recalled notes, if any, to a research prompt."""
+    if not ctx.get("recall"):
+        return prompt
+    return (
+        prompt
+        + "\n\nNotes from earlier articles on related topics. Reuse what still holds, "
+        + "and focus new research on what they miss or what may have changed:\n"
+        + ctx["recall"]
+    )
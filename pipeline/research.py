@@ -0,0 +1,136 @@
+import asyncio
+import re
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from app_logging.logger import app_logger
+
+SearchFn = Callable[[str], str]
+
+DEFAULT_MAX_QUERIES = 6
+DEFAULT_SEARCH_CONCURRENCY = 4
+
+_LIST_MARKER = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9])")
+_FAILED_PREFIXES = ("Google Search error:", "No search results", "Error: missing 'query'")
+
+
+def parse_queries(text: str, limit: int = DEFAULT_MAX_QUERIES) -> List[str]:
+    """One query per line; list markers, quotes and duplicates are dropped."""
+    queries: List[str] = []
+    seen = set()
+    for line in text.splitlines():
+        query = _LIST_MARKER.sub("", line).strip().strip("\"'`").strip()
+        key = " ".join(query.casefold().split())
+        if not query or query.startswith("#") or key in seen:
+            continue
+        seen.add(key)
+        queries.append(query)
+        if len(queries) >= limit:
+            break
+    return queries
+
+
+def _snippets(result: str) -> List[str]:
+    """Break a search summary into bullet-sized snippets."""
+    snippets = []
+    for line in result.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("#"):
+            line = line.lstrip("#").strip()
+            if line:
+                snippets.append(f"**{line}**")
+            continue
+        if _LIST_MARKER.match(line):
+            snippets.append(_LIST_MARKER.sub("", line))
+        else:
+            snippets.extend(s.strip() for s in _SENTENCE_END.split(line) if s.strip())
+    return snippets
+
+
+def _snippet_key(snippet: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", "", snippet.casefold()).split())
+
+
+def merge_search_results(results: Sequence[Tuple[str, str]]) -> str:
+    """
+    Merge (query, result) pairs into research notes: one `##` section per
+    query, with snippets already seen under an earlier query dropped.
+    """
+    seen = set()
+    sections = []
+    for query, result in results:
+        bullets = []
+        for snippet in _snippets(result):
+            key = _snippet_key(snippet)
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            bullets.append(snippet if snippet.startswith("**") else f"- {snippet}")
+        if bullets:
+            sections.append(f"## {query}\n" + "\n".join(bullets))
+    return "# Research Notes\n\n" + "\n\n".join(sections)
+
+
+async def fan_out_search(
+    queries: Sequence[str],
+    search: SearchFn,
+    concurrency: int = DEFAULT_SEARCH_CONCURRENCY,
+) -> List[Tuple[str, str]]:
+    """Run `search` for every query, at most `concurrency` at a time, in query order."""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def _one(query: str) -> Tuple[str, str]:
+        async with semaphore:
+            # GoogleSearchTool is synchronous; keep the event loop free meanwhile
+            return query, await asyncio.to_thread(search, query)
+
+    return list(await asyncio.gather(*(_one(q) for q in queries)))
+
+
+def _agent_search(agent) -> SearchFn:
+    for tool in getattr(agent, "tools", None) or []:
+        if getattr(tool, "name", None) == "google_search" and hasattr(tool, "search"):
+            return tool.search
+    raise RuntimeError(f"No google_search tool assigned to {agent.name}")
+
+
+def fan_out_research(
+    agent,
+    plan_key: str = "research_plan",
+    search: Optional[SearchFn] = None,
+    max_queries: int = DEFAULT_MAX_QUERIES,
+    concurrency: int = DEFAULT_SEARCH_CONCURRENCY,
+    recall_key: Optional[str] = None,
+):
+    """
+    Build the `run` step of a fan-out research stage: search every query in
+    ctx[plan_key] concurrently and merge the results into notes. Unless
+    `search` is given, the google_search tool assigned to `agent` is used.
+    With `recall_key`, notes recalled from earlier runs in ctx[recall_key]
+    are kept at the end of the merged notes.
+    """
+
+    async def _run(ctx: Dict[str, str], stage, call) -> str:
+        queries = parse_queries(ctx[plan_key], limit=max_queries) or [ctx["topic"]]
+        start = time.perf_counter()
+        results = await fan_out_search(queries, search or _agent_search(agent), concurrency)
+        ok = [(q, r) for q, r in results if r and not r.startswith(_FAILED_PREFIXES)]
+        app_logger.log_event(
+            event_type="research_fanout",
+            agent="research",
+            step="search",
+            duration_sec=time.perf_counter() - start,
+            message=f"{len(ok)}/{len(queries)} searches succeeded",
+            extra={"queries": queries, "concurrency": concurrency},
+        )
+        if not ok:
+            return f"Error running research fan-out: all {len(queries)} searches failed"
+        notes = merge_search_results(ok)
+        if recall_key and ctx.get(recall_key):
+            notes += "\n\n## Earlier notes\n\n" + ctx[recall_key]
+        return notes
+
+    return _run
@@ -0,0 +1,395 @@
+import threading
+import time
+import traceback
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+
+from google.genai import types
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.runners import Runner
+from google.adk.artifacts.in_memory_artifact_service import InMemoryArtifactService
+from google.adk.sessions.in_memory_session_service import InMemorySessionService
+from google.adk.memory.in_memory_memory_service import InMemoryMemoryService
+
+from tools.google_search_tool import GoogleSearchTool
+from tools.code_execution_tool import CodeExecutionTool
+from tools.user_profile_tool import UserProfileTool
+from tools.search_cache import default_search_cache
+
+from app_logging.logger import app_logger
+from app_logging.tracing import current_span, record_span, span
+from utils.genai_client import agent_model_id
+from utils.metrics import metrics, token_cost
+from utils.rate_limiter import call_with_retry_async, estimate_tokens
+
+from .cache import ResponseCache, response_cache_key
+
+
+class StreamInterrupted(RuntimeError):
+    """
+    A streamed agent call failed after text had been forwarded to `on_chunk`.
+    It is not retried: a retry would send the same text to the consumer again.
+    """
+
+
+def default_tools() -> List:
+    return [
+        GoogleSearchTool(cache=default_search_cache()),
+        CodeExecutionTool(),
+        UserProfileTool(),
+    ]
+
+
+def assign_tools(agent_list, tool_instances) -> None:
+    for _agent in agent_list:
+        _agent.tools = list(tool_instances)
+
+
+ChunkCallback = Callable[[str], None]
+
+
+def _partial_text(event) -> str:
+    if not getattr(event, "partial", False) or not (event.content and event.content.parts):
+        return ""
+    return "".join(part.text for part in event.content.parts if getattr(part, "text", None))
+
+
+def _usage(event) -> Tuple[int, int]:
+    """(prompt, output) tokens reported with a complete model response."""
+    usage = getattr(event, "usage_metadata", None)
+    if usage is None or getattr(event, "partial", False):
+        return 0, 0
+    return usage.prompt_token_count or 0, usage.candidates_token_count or 0
+
+
+def _final_text(event) -> str:
+    if not (hasattr(event, "is_final_response") and event.is_final_response()):
+        return ""
+    if not (event.content and event.content.parts):
+        return ""
+    return "".join(part.text for part in event.content.parts if getattr(part, "text", None))
+
+
+class AgentRuntime:
+    """
+    ADK services shared by every Runner of one entry point (CLI or Streamlit),
+    plus the single place where an agent is actually called.
+    """
+
+    def __init__(
+        self,
+        app_name: str,
+        user_id: str,
+        cache: Optional[ResponseCache] = None,
+        keep_sessions: bool = False,
+        session_ttl_sec: float = 3600,
+    ) -> None:
+        self.app_name = app_name
+        self.user_id = user_id
+        self.cache = cache
+        # Lifecycle of per-run sessions: deleted as soon as the run ends,
+        # or kept for inspection and expired once idle for session_ttl_sec.
+        self.keep_sessions = keep_sessions
+        self.session_ttl_sec = session_ttl_sec
+        self.session_service = InMemorySessionService()
+        self.memory_service = InMemoryMemoryService()
+        self.artifact_service = InMemoryArtifactService()
+        self._runners: Dict[str, Runner] = {}
+        self._runners_lock = threading.Lock()
+
+    def runner_for(self, agent) -> Runner:
+        """
+        Runner for `agent`, built once and reused by every call and run.
+        Runners hold no per-call state (the session id is passed per run),
+        so concurrent pipelines can share them.
+        """
+        runner = self._runners.get(agent.name)
+        if runner is None:
+            with self._runners_lock:
+                runner = self._runners.get(agent.name)
+                if runner is None:
+                    runner = self._runners[agent.name] = self.build_runner(agent)
+        return runner
+
+    def build_runner(self, agent) -> Runner:
+        return Runner(
+            app_name=self.app_name,
+            agent=agent,
+            session_service=self.session_service,
+            artifact_service=self.artifact_service,
+            memory_service=self.memory_service,
+        )
+
+    async def create_session(self, session_id: str) -> None:
+        try:
+            await self.session_service.create_session(
+                app_name=self.app_name,
+                user_id=self.user_id,
+                session_id=session_id,
+            )
+        except Exception:
+            # already exists
+            pass
+
+    async def delete_session(self, session_id: str) -> None:
+        try:
+            await self.session_service.delete_session(
+                app_name=self.app_name,
+                user_id=self.user_id,
+                session_id=session_id,
+            )
+        except Exception:
+            pass
+
+    async def session_stats(self, session_id: str) -> Dict[str, int]:
+        session = await self.session_service.get_session(
+            app_name=self.app_name,
+            user_id=self.user_id,
+            session_id=session_id,
+        )
+        if session is None:
+            return {"events": 0, "bytes": 0}
+        return {
+            "events": len(session.events),
+            "bytes": sum(len(e.model_dump_json(exclude_none=True)) for e in session.events),
+        }
+
+    def drop_turn(self, session_id: str, content: types.Content, since: float, invocation_ids: Set[str]) -> int:
+        """
+        Remove the events of a failed agent turn from a session, so that a
+        retry, or a later stage, does not see the prompt twice. The turn is
+        found by its invocation ids, plus those of user messages with this
+        `content` appended since `since`. Other stages sharing the session
+        keep their events. Returns how many events were removed.
+        """
+        # ADK has no public API for deleting events; this reads the in-memory
+        # store directly, and is a no-op for other session services.
+        stored = getattr(self.session_service, "sessions", {}).get(self.app_name, {}).get(self.user_id, {})
+        session = stored.get(session_id)
+        if session is None:
+            return 0
+        ids = set(invocation_ids)
+        ids.update(
+            e.invocation_id
+            for e in session.events
+            if e.author == "user" and e.timestamp >= since and e.content == content
+        )
+        before = len(session.events)
+        session.events[:] = [e for e in session.events if e.invocation_id not in ids]
+        return before - len(session.events)
+
+    async def expire_sessions(self) -> int:
+        """Delete sessions idle for longer than session_ttl_sec. Returns how many."""
+        response = await self.session_service.list_sessions(app_name=self.app_name, user_id=self.user_id)
+        cutoff = time.time() - self.session_ttl_sec
+        expired = [s.id for s in response.sessions if s.last_update_time < cutoff]
+        for session_id in expired:
+            await self.delete_session(session_id)
+        return len(expired)
+
+    @asynccontextmanager
+    async def run_session(self, prefix: str = "run", session_id: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Session for one pipeline run: created on entry, shared by every stage,
+        and deleted (or left to expire, with keep_sessions) on exit. Its final
+        size is logged so per-run context growth can be tracked.
+        """
+        session_id = session_id or f"{prefix}_{uuid.uuid4().hex}"
+        await self.create_session(session_id)
+        start = time.perf_counter()
+        try:
+            yield session_id
+        finally:
+            stats = await self.session_stats(session_id)
+            app_logger.log_event(
+                event_type="session",
+                step="close",
+                duration_sec=time.perf_counter() - start,
+                message="Run session closed.",
+                extra={"session_id": session_id, "kept": self.keep_sessions, **stats},
+            )
+            if not self.keep_sessions:
+                await self.delete_session(session_id)
+            await self.expire_sessions()
+
+    async def call_agent(
+        self,
+        agent,
+        prompt: str,
+        session_id: str,
+        agent_name: Optional[str] = None,
+        use_cache: bool = True,
+        on_chunk: Optional[ChunkCallback] = None,
+        stage: Optional[str] = None,
+    ) -> str:
+        """
+        Run one agent turn and return its final text (or an error string).
+
+        With `on_chunk`, the model is called in SSE streaming mode and every
+        partial text delta is forwarded as it arrives. Latency, TTFT, token
+        usage, cost and tool calls are recorded in `utils.metrics` under the
+        agent and `stage` (per-section stages like `draft[2]` count as `draft`).
+
+        The call is traced as an `agent.call` span holding one `model.generate`
+        span per model response and the spans of the tools it called.
+        """
+        agent_name = agent_name or agent.name
+        with span("agent.call", agent=agent_name, stage=stage):
+            return await self._call_agent(agent, prompt, session_id, agent_name, use_cache, on_chunk, stage)
+
+    async def _call_agent(
+        self,
+        agent,
+        prompt: str,
+        session_id: str,
+        agent_name: str,
+        use_cache: bool,
+        on_chunk: Optional[ChunkCallback],
+        stage: Optional[str],
+    ) -> str:
+        labels = {"agent": agent_name, "stage": (stage or agent_name).split("[")[0]}
+        cache_key = None
+        if self.cache is not None and use_cache:
+            cache_key = response_cache_key(agent, prompt)
+            cached = self.cache.get(cache_key, agent_name)
+            if cached is not None:
+                metrics.inc("agent_calls_total", outcome="cached", **labels)
+                current_span().set(cached=True)
+                if on_chunk:
+                    on_chunk(cached)
+                return cached
+
+        runner = self.runner_for(agent)
+        content = types.Content(role="user", parts=[types.Part(text=prompt)])
+        run_config = RunConfig(streaming_mode=StreamingMode.SSE) if on_chunk else None
+        start = time.perf_counter()
+        first_chunk_at = None
+        first_attempt_at = None
+        tokens_in = tokens_out = 0
+
+        async def _attempt() -> str:
+            nonlocal first_chunk_at, first_attempt_at, tokens_in, tokens_out
+            if first_attempt_at is None:
+                first_attempt_at = time.perf_counter()
+            text = ""
+            attempt_start = turn_start = time.time()
+            invocations: Set[str] = set()
+            emitted = False
+            try:
+                async for event in runner.run_async(
+                    user_id=self.user_id,
+                    session_id=session_id,
+                    new_message=content,
+                    run_config=run_config,
+                ):
+                    invocations.add(event.invocation_id)
+                    if on_chunk:
+                        chunk = _partial_text(event)
+                        if chunk:
+                            if first_chunk_at is None:
+                                first_chunk_at = time.perf_counter()
+                            emitted = True
+                            on_chunk(chunk)
+                    calls = event.get_function_calls()
+                    for call in calls:
+                        metrics.inc("agent_tool_calls_total", tool=call.name, **labels)
+                    used_in, used_out = _usage(event)
+                    tokens_in += used_in
+                    tokens_out += used_out
+                    if event.get_function_responses():
+                        # the tools have run; the next model request starts now
+                        turn_start = time.time()
+                    elif not getattr(event, "partial", False) and event.content:
+                        record_span(
+                            "model.generate",
+                            turn_start,
+                            time.time(),
+                            agent=agent_name,
+                            tokens_in=used_in,
+                            tokens_out=used_out,
+                            tool_calls=",".join(c.name for c in calls) or None,
+                        )
+                    text += _final_text(event)
+            except Exception as exc:
+                # the failed turn must not stay in the session for the retry to see
+                self.drop_turn(session_id, content, attempt_start, invocations)
+                if emitted:
+                    # a retry would stream the same text to on_chunk a second time
+                    raise StreamInterrupted(f"stream interrupted after output was sent: {exc}") from exc
+                raise
+            return text
+
+        try:
+            # 429s and transient 5xx back off and retry instead of failing the stage
+            final_text = await call_with_retry_async(_attempt, agent_name, est_tokens=estimate_tokens(prompt))
+        except Exception as exc:
+            metrics.inc("agent_calls_total", outcome="error", **labels)
+            current_span().status = "error"
+            error_msg = f"Error running {agent_name}: {exc}"
+            app_logger.log_error(
+                agent_name,
+                "run_exception",
+                error_msg,
+                extra={"traceback": traceback.format_exc()},
+            )
+            return error_msg
+
+        duration = time.perf_counter() - start
+        self._record_call(
+            agent,
+            labels,
+            duration,
+            queue_wait=first_attempt_at - start if first_attempt_at is not None else None,
+            ttft=first_chunk_at - start if first_chunk_at is not None else None,
+            tokens_in=tokens_in,
+            tokens_out=tokens_out,
+        )
+
+        current_span().set(tokens_in=tokens_in, tokens_out=tokens_out)
+        if not final_text.strip():
+            metrics.inc("agent_calls_total", outcome="error", **labels)
+            current_span().status = "error"
+            msg = "Error: No final response from agent."
+            app_logger.log_error(agent_name, "run", msg)
+            return msg
+        metrics.inc("agent_calls_total", outcome="ok", **labels)
+
+        app_logger.log_event(
+            event_type="agent_run",
+            agent=agent_name,
+            step="run",
+            duration_sec=duration,
+            message="Agent completed successfully.",
+            extra={
+                "chars_out": len(final_text),
+                "session_id": session_id,
+                "ttft_sec": first_chunk_at - start if first_chunk_at is not None else None,
+                "tokens_in": tokens_in,
+                "tokens_out": tokens_out,
+            },
+        )
+        final_text = final_text.strip()
+        if cache_key is not None:
+            self.cache.set(cache_key, final_text)
+        return final_text
+
+    @staticmethod
+    def _record_call(
+        agent,
+        labels: Dict[str, str],
+        duration: float,
+        queue_wait: Optional[float],
+        ttft: Optional[float],
+        tokens_in: int,
+        tokens_out: int,
+    ) -> None:
+        metrics.observe("agent_latency_seconds", duration, **labels)
+        if queue_wait is not None:
+            metrics.observe("agent_queue_wait_seconds", queue_wait, **labels)
+        if ttft is not None:
+            metrics.observe("agent_ttft_seconds", ttft, **labels)
+        if tokens_in or tokens_out:
+            metrics.observe("agent_input_tokens", tokens_in, **labels)
+            metrics.observe("agent_output_tokens", tokens_out, **labels)
+            metrics.inc("agent_cost_usd_total", token_cost(agent_model_id(agent), tokens_in, tokens_out), **labels)
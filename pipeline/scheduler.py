@@ -0,0 +1,106 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Optional, Sequence
+
+from app_logging.logger import app_logger
+from app_logging.tracing import span
+from utils.context_manager import compact_to_budget, count_tokens
+from utils.genai_client import agent_model_id
+from utils.metrics import metrics
+
+from .graph import Stage, validate_graph
+
+AgentCall = Callable[[Stage, str], Awaitable[str]]
+StageHook = Callable[[Stage, str], None]
+StageDoneHook = Callable[[Stage, str], None]
+
+
+def _fit(stage: Stage, text: str) -> str:
+    """Compact a stage's output to its token budget before downstream stages see it."""
+    if not stage.max_tokens:
+        return text
+    model_id = agent_model_id(stage.agent) if stage.agent is not None else None
+    tokens_in = count_tokens(text, model_id)
+    if tokens_in <= stage.max_tokens:
+        return text
+    compacted = compact_to_budget(text, stage.max_tokens, model_id)
+    app_logger.log_event(
+        event_type="context",
+        agent=stage.name,
+        step="compact",
+        message=f"Compacted {stage.name} output for downstream stages",
+        extra={"tokens_in": tokens_in, "tokens_out": count_tokens(compacted, model_id), "budget": stage.max_tokens},
+    )
+    return compacted
+
+
+async def run_graph(
+    stages: Sequence[Stage],
+    inputs: Dict[str, str],
+    call: AgentCall,
+    on_stage_start: Optional[StageHook] = None,
+    on_stage_end: Optional[StageDoneHook] = None,
+    completed: Optional[Dict[str, str]] = None,
+) -> Dict[str, str]:
+    """
+    Run every stage as soon as all of its inputs are available.
+
+    Independent stages run concurrently. Stages found in `completed` are not
+    run again; their saved output is reused (and reported via on_stage_end).
+    Returns the raw (uncompacted) output of each stage keyed by stage name.
+    """
+    validate_graph(stages, seeds=list(inputs))
+
+    ctx: Dict[str, str] = dict(inputs)
+    outputs: Dict[str, str] = {}
+    pending = list(stages)
+    running: Dict[asyncio.Task, Stage] = {}
+
+    def _finish(stage: Stage, text: str) -> None:
+        outputs[stage.name] = text
+        ctx[stage.name] = _fit(stage, text)
+        if on_stage_end:
+            on_stage_end(stage, text)
+
+    async def _execute(stage: Stage) -> str:
+        start = time.perf_counter()
+        try:
+            with span("stage", stage=stage.name, agent=stage.agent.name if stage.agent else None):
+                return await _dispatch(stage)
+        finally:
+            metrics.observe("stage_latency_seconds", time.perf_counter() - start, stage=stage.name)
+
+    async def _dispatch(stage: Stage) -> str:
+        view = {**ctx, **{i: outputs[i] for i in stage.inputs if i in outputs}} if stage.raw_inputs else ctx
+        prompt = stage.build_prompt(view)
+        if on_stage_start:
+            on_stage_start(stage, prompt)
+        if stage.run is not None:
+            return await stage.run(view, stage, call)
+        if stage.agent is None:
+            return prompt
+        return await call(stage, prompt)
+
+    for stage in stages:
+        if completed and stage.name in completed:
+            pending.remove(stage)
+            _finish(stage, completed[stage.name])
+
+    try:
+        while pending or running:
+            ready = [s for s in pending if all(i in ctx for i in s.inputs)]
+            for stage in ready:
+                pending.remove(stage)
+                running[asyncio.ensure_future(_execute(stage))] = stage
+            if not running:
+                break
+
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                stage = running.pop(task)
+                _finish(stage, task.result())
+    finally:
+        for task in running:
+            task.cancel()
+
+    return outputs
@@ -1,168 +1,68 @@
-import asyncio
-import time
-import traceback
+from __future__ import annotations
+
+import importlib
+import threading
+import uuid
 from datetime import datetime
+from typing import List
 
 import streamlit as st
 from dotenv import load_dotenv
 
-from google.genai import types
-from google.adk.runners import Runner
-from google.adk.artifacts.in_memory_artifact_service import InMemoryArtifactService
-from google.adk.sessions.in_memory_session_service import InMemorySessionService
-from google.adk.memory.in_memory_memory_service import InMemoryMemoryService
-
-from config import config
-from blog_agents.research_agent import research_agent
-from blog_agents.outline_agent import outline_agent
-from blog_agents.draft_agent import draft_agent
-from blog_agents.critic_agent import critic_agent
-from blog_agents.seo_agent import seo_agent
-from blog_agents.evaluation_agent import evaluation_agent
-
-from tools.google_search_tool import GoogleSearchTool
-from tools.code_execution_tool import CodeExecutionTool
-from tools.user_profile_tool import UserProfileTool
-
-from app_logging.logger import app_logger
-from utils.context_manager import truncate_text
-
-# Load env
-load_dotenv()
+import pipeline
+from utils.metrics import agent_summary, serve_metrics
+from utils.rendering import cut_frame
 
-APP_NAME = config.APP_NAME
 USER_ID = "streamlit_user"
-SESSION_ID = "streamlit_session"
-
-session_service = InMemorySessionService()
-memory_service = InMemoryMemoryService()
-artifact_service = InMemoryArtifactService()
-
-tools = [
-    GoogleSearchTool(),
-    CodeExecutionTool(),
-    UserProfileTool(),
-]
-
-
-def _assign_tools_to_agents(agent_list, tool_instances):
-    for _agent in agent_list:
-        _agent.tools = list(tool_instances)
-
-
-_assign_tools_to_agents(
-    [
-        research_agent,
-        outline_agent,
-        draft_agent,
-        critic_agent,
-        seo_agent,
-        evaluation_agent,
-    ],
-    tools,
-)
-
-
-async def _ensure_session():
-    try:
-        await session_service.create_session(
-            app_name=APP_NAME,
-            user_id=USER_ID,
-            session_id=SESSION_ID,
-        )
-    except Exception:
-        pass
-
-
-asyncio.run(_ensure_session())
-
-def _run_agent(agent, prompt: str, agent_name: str) -> str:
-    runner = Runner(
-        app_name=APP_NAME,
-        agent=agent,
-        session_service=session_service,
-        artifact_service=artifact_service,
-        memory_service=memory_service,
+# How often a running generation's progress is redrawn
+POLL_SEC = 0.5
+
+# Streamlit re-executes this script on every widget interaction. The module
+# body therefore only draws widgets: no file or network I/O, and nothing
+# heavy is constructed. google-adk, the agents and the tools are loaded once
+# per process, in the cached resources below. Generations run in a
+# process-wide JobExecutor and the page polls them, so a rerun or a browser
+# refresh reattaches to a running job instead of restarting it.
+
+
+@st.cache_resource(show_spinner=False)
+def _preload() -> threading.Thread:
+    """Import google-adk and the agents in the background while the first page is on screen."""
+    thread = threading.Thread(
+        target=importlib.import_module, args=("pipeline.blog",), name="preload-pipeline", daemon=True
     )
-
-    content = types.Content(role="user", parts=[types.Part(text=prompt)])
-
-    start = time.perf_counter()
-    try:
-        events = runner.run(
-            user_id=USER_ID,
-            session_id=SESSION_ID,
-            new_message=content,
-        )
-    except Exception as exc:
-        error_msg = f"Error running {agent_name}: {exc}"
-        app_logger.log_error(
-            agent_name,
-            "run_exception",
-            error_msg,
-            extra={"traceback": traceback.format_exc()},
-        )
-        return error_msg
-
-    # REMOVED: duration = time.perf_counter() - start  <-- deleted from here
-
-    final_text = ""
-    # The agent actually "thinks" and generates text inside this loop
-    for event in events:
-        if hasattr(event, "is_final_response") and event.is_final_response():
-            if event.content and event.content.parts:
-                for part in event.content.parts:
-                    if getattr(part, "text", None):
-                        final_text += part.text
-
-    # MOVED HERE: Stop the timer after the work is done
-    duration = time.perf_counter() - start 
-
-    if not final_text.strip():
-        msg = "Error: No final response from agent."
-        app_logger.log_error(agent_name, "run", msg)
-        return msg
-
-    app_logger.log_event(
-        event_type="agent_run",
-        agent=agent_name,
-        step="run",
-        duration_sec=duration,
-        message="Agent completed successfully.",
-        extra={"chars_out": len(final_text)},
+    thread.start()
+    return thread
+
+
+@st.cache_resource(show_spinner="Loading agents…")
+def _runtime() -> pipeline.AgentRuntime:
+    """ADK services with the tools assigned to every agent, shared by all reruns and browser sessions."""
+    load_dotenv()
+    from config import config
+    from utils.genai_client import share_agent_models
+
+    runtime = pipeline.AgentRuntime(
+        app_name=config.APP_NAME,
+        user_id=USER_ID,
+        cache=pipeline.ResponseCache(),
+        keep_sessions=config.KEEP_SESSIONS,
+        session_ttl_sec=config.SESSION_TTL_SEC,
     )
-    return final_text.strip()
-
-
-# ------------------------------------------------------------
-# TYPEWRITER ANIMATION EFFECT
-# ------------------------------------------------------------
-import time as _time
+    pipeline.assign_tools(pipeline.BLOG_AGENTS, pipeline.default_tools())
+    share_agent_models(pipeline.BLOG_AGENTS)
+    return runtime
 
 
-def typewriter(text: str, container, delay: float = 0.005):
-    output = ""
-    for char in text:
-        output += char
-        container.markdown(output)
-        _time.sleep(delay)
+@st.cache_resource(show_spinner="Loading agents…")
+def _executor() -> pipeline.JobExecutor:
+    """Runs the generations of every browser session in the background."""
+    return pipeline.JobExecutor(_runtime())
 
-# ------------------------------------------------------------
-# REAL-TIME CONSOLE LOGGER
-# ------------------------------------------------------------
-class ConsoleLogger:
-    def __init__(self, st_container):
-        self.box = st_container.empty()
-        self.logs = []
-
-    def log(self, text: str):
-        self.logs.append(f"> {text}")
-        console_output = "```text\n" + "\n".join(self.logs[-80:]) + "\n```"
-        self.box.markdown(console_output)
-        _time.sleep(0.08)
 
-    def separator(self):
-        self.log("--------------------------------------------------")
+_preload()
+# Prometheus endpoint when METRICS_PORT is set; started once per process
+metrics_port = serve_metrics()
 
 
 # ------------------------------------------------------------
@@ -288,9 +188,40 @@ with st.sidebar:
     st.markdown("---")
 
     with st.expander("✨ Interactive Options", expanded=False):
-        enable_typewriter = st.toggle("⌨️ Typewriter animation", value=True)
+        enable_streaming = st.toggle("⚡ Live token streaming", value=True)
         show_prompts = st.toggle("🔍 Show agent prompts", value=False)
         auto_expand_steps = st.toggle("📖 Auto-expand all steps", value=False)
+        use_cache = st.toggle("♻️ Reuse cached agent responses", value=True)
+        fanout_research = st.toggle(
+            "🔀 Parallel research searches",
+            value=False,
+            help="Plan subtopic queries first and run the searches concurrently.",
+        )
+        section_drafting = st.toggle(
+            "🧩 Draft sections in parallel",
+            value=False,
+            help="Draft each outline section concurrently; best for long articles.",
+        )
+        incremental_review = st.toggle(
+            "🧮 Review changed sections only",
+            value=False,
+            help="Critic and SEO passes reuse earlier results for draft sections that did not change.",
+        )
+        recall_research = st.toggle(
+            "🗂️ Start from earlier research",
+            value=True,
+            help="Give the researcher the most relevant notes from earlier articles, and index this one.",
+        )
+
+    with st.expander("📈 Agent Metrics", expanded=False):
+        summary = agent_summary()
+        if summary:
+            st.caption(f"Estimated spend: ${sum(row['cost_usd'] for row in summary):.4f} · slowest p95 first")
+            st.dataframe(summary, hide_index=True, use_container_width=True)
+        else:
+            st.caption("No agent calls yet in this process.")
+        if metrics_port:
+            st.caption(f"Prometheus: http://127.0.0.1:{metrics_port}/metrics")
 
     st.markdown("---")
     st.caption("Built with Google ADK + Gemini")
@@ -298,6 +229,19 @@ with st.sidebar:
 # Main input section with enhanced styling
 st.markdown("<br>", unsafe_allow_html=True)
 
+st.session_state.setdefault("run_history", [])
+# Every browser session runs its pipelines in its own ADK sessions.
+browser_session_id = st.session_state.setdefault("browser_session_id", uuid.uuid4().hex[:12])
+st.session_state.setdefault("latest_outputs", None)
+# A refresh starts a new browser session; the running job's id survives in the URL.
+if "job_id" not in st.session_state and st.query_params.get("job"):
+    st.session_state["job_id"] = st.query_params["job"]
+active_job_id = st.session_state.get("job_id")
+
+notice = st.session_state.pop("job_notice", None)
+if notice:
+    st.toast(notice[0], icon=notice[1])
+
 col1, col2 = st.columns([4, 1])
 with col1:
     topic = st.text_input(
@@ -308,9 +252,23 @@ with col1:
     )
 with col2:
     st.markdown("<br>", unsafe_allow_html=True)
-    generate_clicked = st.button("🚀 Generate", type="primary", use_container_width=True)
+    generate_clicked = st.button(
+        "🚀 Generate", type="primary", disabled=bool(active_job_id), use_container_width=True
+    )
+    if active_job_id:
+        cancel_clicked = st.button("⏹ Cancel", use_container_width=True)
+        resume_clicked = False
+    else:
+        cancel_clicked = False
+        resume_clicked = st.button(
+            "🔁 Resume last run",
+            disabled=not st.session_state.get("last_run_failed"),
+            help="Reload the stages that already succeeded and retry from the first failed one.",
+            use_container_width=True,
+        )
 
 st.markdown("<br>", unsafe_allow_html=True)
+status_box = st.container()
 
 # Tabs with icons
 tab_final, tab_downloads, tab_steps, tab_console, tab_history = st.tabs(
@@ -326,19 +284,12 @@ with tab_downloads:
         st.info("💡 Generate a blog first to enable downloads.")
 
 with tab_steps:
-    if not st.session_state.get("latest_outputs"):
+    if not st.session_state.get("latest_outputs") and not active_job_id:
         st.info("💡 Agent step outputs will appear here after generation.")
 
-with tab_console:
-    console_placeholder = st.empty()
-    console = ConsoleLogger(console_placeholder)
-
 with tab_history:
     st.caption("📚 Previous runs are stored locally in this session.")
 
-st.session_state.setdefault("run_history", [])
-st.session_state.setdefault("latest_outputs", None)
-
 
 def _record_history(entry: dict):
     history = st.session_state["run_history"]
@@ -363,221 +314,227 @@ with tab_history:
                 )
 
 
-def build_base_context() -> str:
-    return (
-        f"Topic: {topic}\n"
-        f"Tone: {tone}\n"
-        f"Target Audience: {target_audience}\n"
-        f"Target Word Count (approx): {word_count}\n"
-        f"Extra Instructions: {extra_instructions}\n"
+# Expander label and console message for each pipeline stage.
+STAGE_UI = {
+    "research": ("1️⃣ 🔬 ResearchAgent Output", "🔍 ResearchAgent: collecting research..."),
+    "outline": ("2️⃣ 📋 OutlineAgent Output", "🧩 OutlineAgent: generating outline..."),
+    "draft": ("3️⃣ ✍️ DraftAgent Output", "✏️ DraftAgent: writing full draft..."),
+    "critic": ("4️⃣ 🧐 CriticAgent Output", "🧐 CriticAgent: improving draft..."),
+    "seo": ("5️⃣ 🚀 SEOAgent Metadata", "🚀 SEOAgent: generating SEO metadata..."),
+    "evaluation": ("6️⃣ 📊 EvaluationAgent Output", "📊 EvaluationAgent: scoring final blog..."),
+}
+STAGE_EXPANDED = {"research", "seo", "evaluation"}
+CONSOLE_SEPARATOR = "--------------------------------------------------"
+CONSOLE_LINES = 80
+
+
+def _console_text(snap: dict) -> str:
+    """The console for a job, rebuilt from its events on every poll."""
+    lines: List[str] = [
+        "🚀 Starting multi-agent blog pipeline...",
+        f"Topic: {snap['inputs']['topic']}",
+        f"Run id: {snap['run_id']}",
+        CONSOLE_SEPARATOR,
+    ]
+    if snap["status"] == "queued":
+        lines.append("⏳ Waiting for a free slot; other generations are running...")
+    for event in snap["events"]:
+        stage = event.get("stage")
+        if event["type"] == "stage_start" and stage in STAGE_UI:
+            lines.append(STAGE_UI[stage][1])
+        elif event["type"] == "stage_end" and stage in STAGE_UI:
+            lines += [f"✅ {event.get('agent') or stage} completed.", CONSOLE_SEPARATOR]
+    if snap["status"] == "done" and snap["failed_stages"]:
+        failed = ", ".join(sorted(snap["failed_stages"]))
+        lines += [f"⚠️ Failed stages: {failed}. Use 'Resume last run' to retry them.", CONSOLE_SEPARATOR]
+    elif snap["status"] == "done":
+        lines += ["🎉 Pipeline finished successfully.", CONSOLE_SEPARATOR]
+    elif snap["status"] == "failed":
+        lines += [f"❌ Pipeline failed: {snap['error']}", CONSOLE_SEPARATOR]
+    elif snap["status"] == "cancelled":
+        lines += ["⏹ Generation cancelled.", CONSOLE_SEPARATOR]
+    text = "\n".join(f"> {line}" for line in lines[-CONSOLE_LINES:])
+    return "```text\n" + text + "\n```"
+
+
+def _detach() -> None:
+    st.session_state.pop("job_id", None)
+    if "job" in st.query_params:
+        del st.query_params["job"]
+
+
+def _snapshot(job_id: str):
+    job = _executor().get(job_id)
+    return job.snapshot() if job is not None else None
+
+
+def _collect(job: pipeline.Job) -> None:
+    """Move a finished job's results into this browser session."""
+    snap = job.snapshot()
+    _detach()
+    st.session_state["last_console"] = _console_text(snap)
+    if job.run_id:
+        st.session_state["last_run_id"] = job.run_id
+    # read by the Resume button on later reruns, which must not touch the disk
+    st.session_state["last_run_failed"] = bool(job.run_id) and (job.status != "done" or bool(snap["failed_stages"]))
+    if job.status == "cancelled":
+        st.session_state["job_notice"] = ("⏹ Generation cancelled — resume to finish it.", "⏹")
+        return
+    if job.status == "failed":
+        st.session_state["job_notice"] = (f"❌ Generation failed: {job.error}", "❌")
+        return
+    if snap["failed_stages"]:
+        st.session_state["job_notice"] = ("⚠️ Some stages failed — resume to retry them.", "⚠️")
+    else:
+        st.session_state["job_notice"] = ("🎉 Blog generation complete!", "✅")
+
+    inputs, outputs = job.inputs, job.outputs
+    final_output_text = outputs["final"]
+    _record_history(
+        {
+            "topic": inputs["topic"].strip(),
+            "tone": inputs["tone"],
+            "audience": inputs["audience"],
+            "word_count": inputs["word_count"],
+            "final_text": final_output_text,
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M"),
+        }
     )
 
+    st.session_state["latest_outputs"] = {
+        "topic": inputs["topic"].strip(),
+        "tone": inputs["tone"],
+        "audience": inputs["audience"],
+        "word_count": inputs["word_count"],
+        "final_text": final_output_text,
+        "research_text": outputs["research"],
+        "outline_text": outputs["outline"],
+        "draft_text": outputs["draft"],
+        "critic_text": outputs["critic"],
+        "seo_text": outputs["seo"],
+        "eval_text": outputs["evaluation"],
+    }
+
+
+# Each view of a running job is a fragment that redraws on its own every
+# POLL_SEC; the rest of the page is not re-executed while a job runs.
+@st.fragment(run_every=POLL_SEC)
+def _job_status(job_id: str):
+    job = _executor().get(job_id)
+    if job is None:
+        # finished long ago and evicted, or started by an earlier server process
+        _detach()
+        st.session_state["job_notice"] = ("⚠️ That generation is no longer available.", "⚠️")
+        st.rerun()
+    if job.done:
+        _collect(job)
+        st.rerun()
+    snap = job.snapshot()
+    if snap["status"] == "queued":
+        st.progress(0, text="⏳ Queued — waiting for a free slot...")
+    else:
+        done = len(snap["completed"])
+        st.progress(int(100 * snap["progress"]), text=f"Running — {done}/{len(snap['stages'])} stages done")
+
+
+@st.fragment(run_every=POLL_SEC)
+def _job_final(job_id: str):
+    snap = _snapshot(job_id)
+    if snap is None:
+        return
+    # The critic's output is the body of the final blog, so it is shown here
+    # as it streams while the SEO metadata is generated alongside.
+    text = snap["text"].get("final") or cut_frame(snap["text"].get("critic", ""))
+    if text:
+        st.markdown(text)
+    else:
+        st.info("✍️ The article appears here once the critic pass starts writing.")
+
+
+@st.fragment(run_every=POLL_SEC)
+def _job_steps(job_id: str):
+    snap = _snapshot(job_id)
+    if snap is None:
+        return
+    st.markdown("### 🧩 Agent Step-by-Step Outputs")
+    for name, (label, _) in STAGE_UI.items():
+        with st.expander(label, expanded=(name in STAGE_EXPANDED or auto_expand_steps)):
+            prompt = snap["prompts"].get(name)
+            if prompt:
+                st.markdown("**📝 Prompt Sent**")
+                st.code(prompt, language="markdown")
+            text = snap["text"].get(name, "")
+            if name in snap["completed"]:
+                if name == "evaluation":
+                    st.code(text, language="json")
+                else:
+                    st.markdown(text)
+            elif text and name != "evaluation":
+                st.markdown(cut_frame(text))
+
+
+@st.fragment(run_every=POLL_SEC)
+def _job_console(job_id: str):
+    snap = _snapshot(job_id)
+    if snap is not None:
+        st.markdown(_console_text(snap))
+
+
+def _submit(inputs: dict, store: pipeline.RunStore):
+    stages = pipeline.build_blog_pipeline(
+        research_mode="fanout" if fanout_research else "agent",
+        draft_mode="sections" if section_drafting else "single",
+        review_mode="sections" if incremental_review else "full",
+        recall=recall_research,
+    )
+    job = _executor().submit(
+        inputs,
+        stages,
+        run_store=store,
+        use_cache=use_cache,
+        stream=enable_streaming,
+        keep_prompts=show_prompts,
+        session_prefix=f"streamlit_{browser_session_id}",
+    )
+    st.session_state["job_id"] = job.job_id
+    st.query_params["job"] = job.job_id
+    # redraw the buttons for a running job
+    st.rerun()
 
-st.session_state.setdefault("animated_done", False)
 
 if generate_clicked:
     if not topic.strip():
         st.warning("⚠️ Please enter a topic first.")
     else:
-        st.session_state["animated_done"] = False
-
-        progress = st.progress(0)
-        console.log("🚀 Starting multi-agent blog pipeline...")
-        console.log(f"Topic: {topic}")
-        console.separator()
-
-        base_context = build_base_context()
-
-        with tab_steps:
-            st.markdown("### 🧩 Agent Step-by-Step Outputs")
-            step1 = st.expander("1️⃣ 🔬 ResearchAgent Output", expanded=True)
-            step2 = st.expander("2️⃣ 📋 OutlineAgent Output", expanded=auto_expand_steps)
-            step3 = st.expander("3️⃣ ✍️ DraftAgent Output", expanded=auto_expand_steps)
-            step4 = st.expander("4️⃣ 🧐 CriticAgent Output", expanded=auto_expand_steps)
-            step5 = st.expander("5️⃣ 🚀 SEOAgent Output (Final)", expanded=True)
-            step6 = st.expander("6️⃣ 📊 EvaluationAgent Output", expanded=True)
-
-        # STEP 1: ResearchAgent
-        progress.progress(10)
-        console.log("🔍 [Step 1] ResearchAgent: collecting research...")
-        research_prompt = base_context + "\nProvide structured research notes for this topic.\n"
-
-        research_text = _run_agent(research_agent, research_prompt, "research_agent")
-        research_text = truncate_text(research_text, max_chars=6000)
-        with step1:
-            if show_prompts:
-                st.markdown("**📝 Prompt Sent**")
-                st.code(research_prompt, language="markdown")
-            st.markdown(research_text)
-
-        console.log("✅ ResearchAgent completed.")
-        console.separator()
-        progress.progress(25)
-
-        # STEP 2: OutlineAgent
-        console.log("🧩 [Step 2] OutlineAgent: generating outline...")
-        outline_prompt = (
-            base_context
-            + "\n\nUsing the following research, produce a detailed markdown outline:\n\n"
-            + research_text
-        )
-
-        outline_text = _run_agent(outline_agent, outline_prompt, "outline_agent")
-        outline_text = truncate_text(outline_text, max_chars=6000)
-        with step2:
-            if show_prompts:
-                st.markdown("**📝 Prompt Sent**")
-                st.code(outline_prompt, language="markdown")
-            st.markdown(outline_text)
-
-        console.log("✅ OutlineAgent completed.")
-        console.separator()
-        progress.progress(45)
-
-        # STEP 3: DraftAgent
-        console.log("✏️ [Step 3] DraftAgent: writing full draft...")
-        draft_prompt = (
-            base_context
-            + "\n\nUsing this outline, write the full markdown blog draft:\n\n"
-            + outline_text
-        )
-
-        draft_text = _run_agent(draft_agent, draft_prompt, "draft_agent")
-        draft_text = truncate_text(draft_text, max_chars=9000)
-        with step3:
-            if show_prompts:
-                st.markdown("**📝 Prompt Sent**")
-                st.code(draft_prompt, language="markdown")
-            st.markdown(draft_text)
-
-        console.log("✅ DraftAgent completed.")
-        console.separator()
-        progress.progress(65)
-
-        # STEP 4: CriticAgent
-        console.log("🧐 [Step 4] CriticAgent: improving draft...")
-        critic_prompt = (
-            "Improve this draft for clarity, flow, correctness, and conciseness.\n\n"
-            + draft_text
-        )
-
-        critic_text = _run_agent(critic_agent, critic_prompt, "critic_agent")
-        critic_text = truncate_text(critic_text, max_chars=9000)
-        with step4:
-            if show_prompts:
-                st.markdown("**📝 Prompt Sent**")
-                st.code(critic_prompt, language="markdown")
-            st.markdown(critic_text)
-
-        console.log("✅ CriticAgent completed.")
-        console.separator()
-        progress.progress(80)
-
-        # STEP 5: SEOAgent
-        console.log("🚀 [Step 5] SEOAgent: generating SEO metadata + final blog...")
-        seo_prompt = (
-            "Using the improved blog below, generate:\n"
-            "- SEO title\n"
-            "- Meta description\n"
-            "- URL slug\n"
-            "- Keywords\n"
-            "- Social caption\n"
-            "and return the final improved blog markdown.\n\n"
-            + critic_text
-        )
-
-        final_output_text = _run_agent(seo_agent, seo_prompt, "seo_agent")
-        with step5:
-            if show_prompts:
-                st.markdown("**📝 Prompt Sent**")
-                st.code(seo_prompt, language="markdown")
-            st.markdown(final_output_text)
-
-        console.log("✅ SEOAgent completed.")
-        console.log("📊 [Step 6] EvaluationAgent: scoring final blog...")
-
-        # STEP 6: EvaluationAgent
-        eval_prompt = (
-            "Evaluate this blog article and return JSON as specified in your instructions.\n\n"
-            f"Tone: {tone}\nAudience: {target_audience}\nTarget Word Count: {word_count}\n\n"
-            + final_output_text
-        )
-        eval_text = _run_agent(evaluation_agent, eval_prompt, "evaluation_agent")
-        with step6:
-            if show_prompts:
-                st.markdown("**📝 Prompt Sent**")
-                st.code(eval_prompt, language="markdown")
-            st.code(eval_text, language="json")
-
-        console.log("✅ EvaluationAgent completed.")
-        console.log("🎉 Pipeline finished successfully.")
-        console.separator()
-        progress.progress(100)
-        st.toast("🎉 Blog generation complete!", icon="✅")
-
-        _record_history(
-            {
-                "topic": topic.strip(),
-                "tone": tone,
-                "audience": target_audience,
-                "word_count": word_count,
-                "final_text": final_output_text,
-                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M"),
-            }
+        _submit(
+            pipeline.pipeline_inputs(topic, tone, target_audience, word_count, extra_instructions),
+            pipeline.RunStore(),
         )
-
-        st.session_state["latest_outputs"] = {
-            "topic": topic.strip(),
-            "tone": tone,
-            "audience": target_audience,
-            "word_count": word_count,
-            "final_text": final_output_text,
-            "research_text": research_text,
-            "outline_text": outline_text,
-            "draft_text": draft_text,
-            "critic_text": critic_text,
-            "eval_text": eval_text,
-        }
-
-        # Final Blog Tab — with typewriter animation
-        with tab_final:
-            st.markdown("### 📄 Final SEO-Optimized Blog")
-            animated_box = st.empty()
-
-            if enable_typewriter and not st.session_state.get("animated_done", False):
-                typewriter(final_output_text, animated_box, delay=0.003)
-                st.session_state["animated_done"] = True
-            else:
-                animated_box.markdown(final_output_text)
-                st.session_state["animated_done"] = True
-
-        # Downloads Tab
-        with tab_downloads:
-            st.markdown("### 📦 Download Your Blog")
-            col1, col2 = st.columns(2)
-            with col1:
-                st.download_button(
-                    label="⬇️ Download as Markdown (.md)",
-                    data=final_output_text,
-                    file_name="blog_article.md",
-                    mime="text/markdown",
-                    use_container_width=True
-                )
-            with col2:
-                st.download_button(
-                    label="⬇️ Download as Text (.txt)",
-                    data=final_output_text,
-                    file_name="blog_article.txt",
-                    mime="text/plain",
-                    use_container_width=True
-                )
-
-        with tab_console:
-            st.caption("📡 Live logs from the 6-step agent pipeline.")
-
+elif resume_clicked:
+    resume_store = pipeline.RunStore(st.session_state["last_run_id"])
+    _submit(resume_store.load_inputs(), resume_store)
+elif cancel_clicked:
+    _executor().cancel(active_job_id)
+
+if active_job_id:
+    with status_box:
+        _job_status(active_job_id)
+    with tab_final:
+        _job_final(active_job_id)
+    with tab_steps:
+        _job_steps(active_job_id)
+    with tab_console:
+        _job_console(active_job_id)
+else:
+    with tab_console:
+        if st.session_state.get("last_console"):
+            st.markdown(st.session_state["last_console"])
+            st.caption("📡 Logs of the last run of the 6-step agent pipeline.")
+        else:
+            st.info("💡 Live logs appear here while a blog is generated.")
 
 latest_outputs = st.session_state.get("latest_outputs")
-if not generate_clicked and latest_outputs:
+if not active_job_id and latest_outputs:
     final_text = latest_outputs.get("final_text", "")
 
     with tab_final:
@@ -622,8 +579,8 @@ if not generate_clicked and latest_outputs:
         step4 = st.expander("4️⃣ 🧐 CriticAgent Output", expanded=auto_expand_steps)
         step4.markdown(latest_outputs.get("critic_text", "_No critic output._"))
 
-        step5 = st.expander("5️⃣ 🚀 SEOAgent Output (Final)", expanded=True)
-        step5.markdown(final_text or "_No SEO output._")
+        step5 = st.expander("5️⃣ 🚀 SEOAgent Metadata", expanded=True)
+        step5.markdown(latest_outputs.get("seo_text", "_No SEO output._"))
 
         step6 = st.expander("6️⃣ 📊 EvaluationAgent Output", expanded=True)
         with step6:
@@ -3,11 +3,14 @@ from typing import Any, Dict
 
 from google.adk.tools.function_tool import FunctionTool
 
+from app_logging.tracing import span
+
 
 class CodeExecutionTool(FunctionTool):
     def __init__(self):
         def code_execution_tool(code: str) -> str:
-            return self._execute(code=code)
+            with span("tool.code_execution", tool="code_execution_tool"):
+                return self._execute(code=code)
 
         code_execution_tool.__name__ = "code_execution_tool"
         super().__init__(code_execution_tool)
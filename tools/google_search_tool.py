@@ -4,17 +4,26 @@ from google.adk.tools.function_tool import FunctionTool
 from google.genai import Client, types
 from google.genai.types import GenerateContentConfig, Tool
 
+from app_logging.tracing import span
+from utils.genai_client import get_client
+from utils.rate_limiter import call_with_retry, estimate_tokens
+
+from tools.search_cache import SearchCache
+
 MODEL_ID = "gemini-2.5-flash"
 
+_UNCACHEABLE_PREFIXES = ("Google Search error:", "No search results")
+
 
 class GoogleSearchTool(FunctionTool):
 
-    def __init__(self, model_id: str = MODEL_ID):
+    def __init__(self, model_id: str = MODEL_ID, cache: Optional[SearchCache] = None):
         self.model_id = model_id
-        self._client_instance: Optional[Client] = None
+        self.cache = cache
 
         def google_search(query: str, *, fallback_summary: Optional[str] = None) -> str:
-            return self._search(query=query, fallback_summary=fallback_summary)
+            with span("tool.google_search", tool="google_search", query=(query or "")[:80]):
+                return self._search(query=query, fallback_summary=fallback_summary)
 
         google_search.__name__ = "google_search"
         super().__init__(google_search)
@@ -26,9 +35,11 @@ class GoogleSearchTool(FunctionTool):
         )
 
     def _ensure_client(self) -> Client:
-        if self._client_instance is None:
-            self._client_instance = Client()
-        return self._client_instance
+        return get_client()
+
+    def search(self, query: str) -> str:
+        """Run one search directly, outside an agent turn (e.g. fan-out research)."""
+        return self._search(query=query)
 
     def _search(self, query: str, *, fallback_summary: Optional[str] = None) -> str:
         """
@@ -42,11 +53,25 @@ class GoogleSearchTool(FunctionTool):
         if not query:
             return "Error: missing 'query' for google_search."
 
+        if self.cache is None:
+            return self._grounded_search(query, fallback_summary)
+        # Errors and fallbacks are returned to the agent but never cached.
+        return self.cache.get_or_search(
+            query,
+            lambda: self._grounded_search(query, fallback_summary),
+            cacheable=lambda result: not result.startswith(_UNCACHEABLE_PREFIXES) and result != fallback_summary,
+        )
+
+    def _grounded_search(self, query: str, fallback_summary: Optional[str]) -> str:
         try:
-            response = self._ensure_client().models.generate_content(
-                model=self.model_id,
-                contents=query,
-                config=self._tool_config,
+            response = call_with_retry(
+                lambda: self._ensure_client().models.generate_content(
+                    model=self.model_id,
+                    contents=query,
+                    config=self._tool_config,
+                ),
+                "google_search",
+                est_tokens=estimate_tokens(query),
             )
         except Exception as exc:
             return f"Google Search error: {exc}"
@@ -0,0 +1,150 @@
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from app_logging.logger import app_logger
+from utils.cache import MemoryLRUCache, SingleFlight, SqliteCache, TieredCache
+from utils.metrics import metrics
+
+DEFAULT_SEARCH_CACHE_PATH = os.path.join(".cache", "search_results.sqlite3")
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize_query(query: str) -> str:
+    """Casefold, NFKC-normalize, collapse whitespace and drop trailing punctuation."""
+    text = unicodedata.normalize("NFKC", query or "").casefold()
+    return " ".join(text.split()).rstrip(" ?!.")
+
+
+def _similarity(a: str, b: str) -> float:
+    """Jaccard overlap of the two queries' word sets."""
+    words_a, words_b = set(_WORD.findall(a)), set(_WORD.findall(b))
+    if not words_a or not words_b:
+        return 0.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
+
+class SearchCache:
+    """
+    Cache of grounded search results keyed on the normalized query.
+
+    A memory LRU sits in front of an on-disk SQLite tier, both honoring
+    `ttl_sec`. With `similarity` set (0-1), a query whose word overlap with a
+    cached one reaches the threshold reuses that result. Concurrent lookups
+    for the same query share one request in flight.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_SEARCH_CACHE_PATH,
+        max_entries: int = 512,
+        ttl_sec: float = 24 * 3600,
+        max_bytes: int = 64 * 1024 * 1024,
+        similarity: Optional[float] = None,
+    ) -> None:
+        self._disk = SqliteCache(path, ttl_sec=ttl_sec, max_bytes=max_bytes)
+        self._cache = TieredCache([MemoryLRUCache(max_entries=max_entries, ttl_sec=ttl_sec), self._disk])
+        self._flight = SingleFlight()
+        self.similarity = similarity
+        self._lock = threading.Lock()
+        # Normalized queries known to be cached, for similarity matching.
+        self._known: "OrderedDict[str, None]" = OrderedDict()
+        self._max_known = max_entries
+        if similarity:
+            for key in reversed(self._disk.recent_keys(max_entries)):
+                self._known[key] = None
+        self._counters = {"hits": 0, "similar_hits": 0, "misses": 0, "coalesced": 0}
+
+    def _remember(self, key: str) -> None:
+        with self._lock:
+            self._known[key] = None
+            self._known.move_to_end(key)
+            while len(self._known) > self._max_known:
+                self._known.popitem(last=False)
+
+    def _closest(self, key: str) -> Optional[str]:
+        with self._lock:
+            known = list(self._known)
+        best, best_score = None, self.similarity or 0.0
+        for candidate in known:
+            score = _similarity(key, candidate)
+            if score >= best_score and candidate != key:
+                best, best_score = candidate, score
+        return best
+
+    def lookup(self, query: str) -> Tuple[str, Optional[str], str]:
+        """Return (key, cached value or None, "hit" | "similar" | "miss")."""
+        key = normalize_query(query)
+        value = self._cache.get(key)
+        if value is not None:
+            return key, value, "hit"
+        if self.similarity:
+            match = self._closest(key)
+            if match is not None:
+                value = self._cache.get(match)
+                if value is not None:
+                    return key, value, "similar"
+        return key, None, "miss"
+
+    def get_or_search(
+        self,
+        query: str,
+        search: Callable[[], str],
+        cacheable: Callable[[str], bool] = lambda _: True,
+    ) -> str:
+        """Serve `query` from cache, or run `search` once (however many callers ask) and store it."""
+        key, value, outcome = self.lookup(query)
+        coalesced = False
+        if value is None:
+
+            def _fetch() -> str:
+                result = search()
+                if cacheable(result):
+                    self._cache.set(key, result)
+                    self._remember(key)
+                return result
+
+            value, coalesced = self._flight.do(key, _fetch)
+        self._record(key, outcome, coalesced)
+        return value
+
+    def _record(self, key: str, outcome: str, coalesced: bool) -> None:
+        with self._lock:
+            if coalesced:
+                self._counters["coalesced"] += 1
+            else:
+                self._counters[{"hit": "hits", "similar": "similar_hits", "miss": "misses"}[outcome]] += 1
+            stats = self._stats_locked()
+        app_logger.log_event(
+            event_type="search_cache",
+            agent="google_search",
+            step="lookup",
+            message="coalesced" if coalesced else outcome,
+            extra={"query": key[:80], **stats},
+        )
+
+    def _stats_locked(self) -> Dict[str, float]:
+        served = self._counters["hits"] + self._counters["similar_hits"] + self._counters["coalesced"]
+        total = served + self._counters["misses"]
+        return {**self._counters, "hit_rate": round(served / total, 3) if total else 0.0}
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return self._stats_locked()
+
+
+def default_search_cache() -> SearchCache:
+    similarity = float(os.getenv("SEARCH_SIMILARITY", "0"))
+    cache = SearchCache(
+        ttl_sec=float(os.getenv("SEARCH_CACHE_TTL_SEC", str(24 * 3600))),
+        similarity=similarity or None,
+    )
+    metrics.register_collector(
+        "search_cache",
+        lambda: [(f"search_cache_{name}", {}, value) for name, value in cache.stats().items()],
+    )
+    return cache
@@ -2,8 +2,10 @@ from typing import Literal, Optional
 
 from google.adk.tools.function_tool import FunctionTool
 
-from memory.memory_bank import memory_bank
-from memory.session_service import session_service
+from app_logging.tracing import span
+from memory.backends import ValueTooLarge
+from memory.memory_bank import default_memory_bank
+from memory.session_service import default_session_service
 
 
 class UserProfileTool(FunctionTool):
@@ -30,12 +32,17 @@ class UserProfileTool(FunctionTool):
             value: Optional value used by set/append.
             session_id: Session identifier for overrides.
         """
+        with span("tool.user_profile", tool="user_profile_tool", action=action, key=key):
+            return self._apply(action, key, value, session_id)
+
+    def _apply(self, action: str, key: str, value: Optional[str], session_id: str) -> str:
         key = (key or "").strip()
         if not action or not key:
             return "Error: 'action' and 'key' fields are required."
 
         action = action.lower()
         session_id = session_id or "default_session"
+        memory_bank, session_service = default_memory_bank(), default_session_service()
 
         if action == "get":
             ses_val = session_service.get(session_id, key)
@@ -44,13 +51,16 @@ class UserProfileTool(FunctionTool):
             val = memory_bank.get(key)
             return str(val) if val is not None else "None"
 
-        if action == "set":
-            memory_bank.set(key, value)
-            session_service.set(session_id, key, value)
-            return f"Stored {key} = {value}"
+        try:
+            if action == "set":
+                memory_bank.set(key, value)
+                session_service.set(session_id, key, value)
+                return f"Stored {key} = {value}"
 
-        if action == "append":
-            memory_bank.append_to_list(key, value)
-            return f"Appended to {key}: {value}"
+            if action == "append":
+                memory_bank.append_to_list(key, value)
+                return f"Appended to {key}: {value}"
+        except ValueTooLarge as exc:
+            return f"Error: {exc}"
 
         return "Error: Invalid action. Must be 'get', 'set', or 'append'."
@@ -0,0 +1,213 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class MemoryLRUCache:
+    """
+    Small in-process LRU of string values, bounded by entry count. With
+    `ttl_sec`, entries older than that are treated as misses.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_sec: Optional[float] = None) -> None:
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self._lock = threading.Lock()
+        self._store: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key: str) -> Optional[Tuple[str, float]]:
+        """The value and the time it was first written, or None."""
+        with self._lock:
+            entry = self._store.get(key)
+            if entry is None:
+                return None
+            if self.ttl_sec is not None and time.time() - entry[1] > self.ttl_sec:
+                del self._store[key]
+                return None
+            self._store.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value: str, created_at: Optional[float] = None) -> None:
+        with self._lock:
+            self._store[key] = (value, created_at if created_at is not None else time.time())
+            self._store.move_to_end(key)
+            while len(self._store) > self.max_entries:
+                self._store.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._store.pop(key, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._store)
+
+
+class SqliteCache:
+    """
+    On-disk cache in a single SQLite file.
+
+    Entries older than `ttl_sec` are treated as misses and removed; once the
+    stored values exceed `max_bytes` the least recently used ones are evicted.
+    """
+
+    def __init__(self, path: str, ttl_sec: float = 7 * 24 * 3600, max_bytes: int = 256 * 1024 * 1024) -> None:
+        self.path = path
+        self.ttl_sec = ttl_sec
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed_at)")
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key: str) -> Optional[Tuple[str, float]]:
+        """The value and the time it was first written, or None."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl_sec:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            return row
+
+    def set(self, key: str, value: str, created_at: Optional[float] = None) -> None:
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, size, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, created_at if created_at is not None else now, now),
+            )
+            self._evict(now)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def recent_keys(self, limit: int = 512) -> List[str]:
+        """Most recently used live keys, newest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key FROM cache WHERE created_at >= ? ORDER BY accessed_at DESC LIMIT ?",
+                (time.time() - self.ttl_sec, limit),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM cache WHERE created_at < ?", (now - self.ttl_sec,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM cache ORDER BY accessed_at ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            total -= size
+
+
+class TieredCache:
+    """
+    Looks tiers up in order (fastest first) and back-fills the faster tiers
+    on a hit further down, keeping the entry's original write time so it
+    expires in them no later than where it was found. Writes go to every
+    tier.
+    """
+
+    def __init__(self, tiers: List) -> None:
+        self.tiers = tiers
+
+    def get(self, key: str) -> Optional[str]:
+        for index, tier in enumerate(self.tiers):
+            entry = tier.get_entry(key)
+            if entry is not None:
+                value, created_at = entry
+                for faster in self.tiers[:index]:
+                    faster.set(key, value, created_at=created_at)
+                return value
+        return None
+
+    def set(self, key: str, value: str) -> None:
+        for tier in self.tiers:
+            tier.set(key, value)
+
+    def delete(self, key: str) -> None:
+        for tier in self.tiers:
+            tier.delete(key)
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into one: the first caller
+    runs `fn`, the others block until it finishes and share its result (or
+    its exception).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[str, "_Flight"] = {}
+
+    def do(self, key: str, fn: Callable[[], T]) -> Tuple[T, bool]:
+        """Return (result, shared); `shared` is True for callers that waited on another."""
+        with self._lock:
+            flight = self._calls.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._calls[key] = _Flight()
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+        try:
+            flight.result = fn()
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            flight.done.set()
+        return flight.result, False
+
+
+class _Flight:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
@@ -1,12 +1,166 @@
-from typing import List
+import math
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+TokenCounter = Callable[[str], int]
+
+DEFAULT_MODEL_ID = "gemini-2.5-flash"
+
+# Average characters per token by model family, measured on English prose.
+# Used when no exact tokenizer has been registered for a model.
+CHARS_PER_TOKEN: Dict[str, float] = {
+    "gemini": 4.0,
+    "gpt": 4.0,
+    "claude": 3.5,
+}
+_DEFAULT_CHARS_PER_TOKEN = 4.0
+
+_TOKENIZERS: Dict[str, TokenCounter] = {}
+
+ELLIPSIS = " […]"
+_HEADING = re.compile(r"^(#{1,6}\s+\S.*|\*\*[^*\n]+\*\*:?)\s*$")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def register_tokenizer(model_prefix: str, counter: TokenCounter) -> None:
+    """Use `counter` for exact token counts on models whose id starts with `model_prefix`."""
+    _TOKENIZERS[model_prefix] = counter
+
+
+def _lookup(table: Dict[str, object], model_id: str):
+    for prefix in sorted(table, key=len, reverse=True):
+        if model_id.startswith(prefix):
+            return table[prefix]
+    return None
+
+
+def count_tokens(text: str, model_id: Optional[str] = None) -> int:
+    """Token count of `text` for `model_id` (exact if a tokenizer is registered, else estimated)."""
+    if not text:
+        return 0
+    model_id = model_id or DEFAULT_MODEL_ID
+    counter = _lookup(_TOKENIZERS, model_id)
+    if counter is not None:
+        return counter(text)
+    ratio = _lookup(CHARS_PER_TOKEN, model_id) or _DEFAULT_CHARS_PER_TOKEN
+    return max(1, math.ceil(len(text) / ratio))
+
+
+def split_sections(text: str) -> List[Tuple[str, str]]:
+    """
+    Split markdown into (heading, body) pairs.
+
+    Headings are `#` lines or bold-only lines such as `**Key Facts:**`.
+    Text before the first heading is returned with an empty heading.
+    """
+    sections: List[Tuple[str, str]] = []
+    heading, body = "", []
+    for line in text.splitlines():
+        if _HEADING.match(line.strip()):
+            if heading or any(b.strip() for b in body):
+                sections.append((heading, "\n".join(body).strip("\n")))
+            heading, body = line, []
+        else:
+            body.append(line)
+    if heading or any(b.strip() for b in body):
+        sections.append((heading, "\n".join(body).strip("\n")))
+    return sections
+
+
+def _take_words(text: str, max_tokens: int, model_id: Optional[str]) -> str:
+    words = text.split()
+    lo, hi = 0, len(words)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens(" ".join(words[:mid]), model_id) <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return " ".join(words[:lo])
+
+
+def _shrink(body: str, max_tokens: int, model_id: Optional[str]) -> str:
+    """Keep whole paragraphs, then whole sentences, from the start of `body`."""
+    if count_tokens(body, model_id) <= max_tokens:
+        return body
+    budget = max_tokens - count_tokens(ELLIPSIS, model_id)
+    kept: List[str] = []
+    for block in body.split("\n\n"):
+        cost = count_tokens(block + "\n\n", model_id)
+        if cost <= budget:
+            kept.append(block)
+            budget -= cost
+            continue
+        # First block that does not fit: take what sentences (or list lines) still fit.
+        pieces = [p for p in re.split(r"\n|" + _SENTENCE_END.pattern, block) if p.strip()]
+        partial: List[str] = []
+        for piece in pieces:
+            cost = count_tokens(piece + " ", model_id)
+            if cost > budget:
+                if not kept and not partial:
+                    # A single run-on sentence: fall back to whole words.
+                    partial.append(_take_words(piece, budget, model_id))
+                break
+            partial.append(piece)
+            budget -= cost
+        if any(partial):
+            kept.append(" ".join(partial))
+        break
+    return ("\n\n".join(kept) + ELLIPSIS).strip()
+
+
+def _allocate(sizes: List[int], budget: int, floor: int = 40) -> List[int]:
+    """
+    Split `budget` across sections: each first gets up to `floor` tokens so
+    short sections survive intact, then the rest is shared in proportion to
+    what each section still needs.
+    """
+    alloc = [min(size, floor) for size in sizes]
+    if sum(alloc) >= budget:
+        scale = budget / max(1, sum(alloc))
+        return [int(a * scale) for a in alloc]
+    remaining = budget - sum(alloc)
+    needs = [size - a for size, a in zip(sizes, alloc)]
+    total_need = sum(needs)
+    if total_need:
+        share = min(1.0, remaining / total_need)
+        alloc = [a + int(need * share) for a, need in zip(alloc, needs)]
+    return alloc
+
+
+def compact_to_budget(text: str, max_tokens: int, model_id: Optional[str] = None) -> str:
+    """
+    Fit `text` into `max_tokens` by document structure.
+
+    Every heading is kept; section bodies shrink in proportion to their size,
+    keeping each section's leading paragraphs and sentences. Text without
+    headings is treated as a single section.
+    """
+    if count_tokens(text, model_id) <= max_tokens:
+        return text
+    sections = split_sections(text)
+    heading_cost = sum(count_tokens(h + "\n\n", model_id) for h, _ in sections)
+    if heading_cost >= max_tokens:
+        # Not even the skeleton fits; keep as many leading headings as possible.
+        return _shrink("\n".join(h for h, _ in sections if h), max_tokens, model_id)
+
+    sizes = [count_tokens(body, model_id) for _, body in sections]
+    budgets = _allocate(sizes, max_tokens - heading_cost)
+    parts = []
+    for (heading, body), budget in zip(sections, budgets):
+        shrunk = _shrink(body, budget, model_id) if body else ""
+        if shrunk == ELLIPSIS.strip() and heading:
+            shrunk = ""
+        parts.append("\n".join(p for p in (heading, shrunk) if p))
+    return "\n\n".join(p for p in parts if p)
 
 
 def truncate_text(text: str, max_chars: int = 8000) -> str:
     """
     Simple context compaction by character length.
 
-    You can later replace this by a true LLM-based summarizer if you want,
-    but this already counts as explicit context management.
+    Kept for callers that budget in characters; pipeline stages use
+    `compact_to_budget`, which does not drop whole sections.
     """
     if len(text) <= max_chars:
         return text
@@ -15,10 +169,23 @@ def truncate_text(text: str, max_chars: int = 8000) -> str:
     return head + "\n\n...[content truncated for brevity]...\n\n" + tail
 
 
-def compact_history(messages: List[str], max_chars: int = 8000) -> str:
+def compact_history(messages: List[str], max_tokens: int = 2000, model_id: Optional[str] = None) -> str:
     """
     Turn a history of messages into a compact single string.
-    Newest messages are kept, older ones truncated.
+    Newest messages are kept whole; the oldest one that does not fit is
+    compacted into what is left, and anything older is dropped.
     """
-    combined = "\n\n---\n\n".join(messages)
-    return truncate_text(combined, max_chars=max_chars)
+    separator = "\n\n---\n\n"
+    budget = max_tokens
+    kept: List[str] = []
+    for message in reversed(messages):
+        cost = count_tokens(message + separator, model_id)
+        if cost <= budget:
+            kept.append(message)
+            budget -= cost
+            continue
+        compacted = compact_to_budget(message, budget, model_id) if budget > 0 else ""
+        if compacted.strip() and compacted.strip() != ELLIPSIS.strip():
+            kept.append(compacted)
+        break
+    return separator.join(reversed(kept))
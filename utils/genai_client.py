@@ -0,0 +1,53 @@
+import threading
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    # imported where used: google-adk and google-genai take a second to load
+    from google.adk.models.google_llm import Gemini
+    from google.genai import Client
+
+_lock = threading.Lock()
+_client: Optional["Client"] = None
+_models: Dict[str, "Gemini"] = {}
+
+
+def get_client() -> "Client":
+    """
+    Process-wide GenAI client for direct (synchronous) SDK calls such as the
+    grounded search tool. One client means one pool of kept-alive connections.
+    """
+    global _client
+    if _client is None:
+        from google.genai import Client
+
+        with _lock:
+            if _client is None:
+                _client = Client()
+    return _client
+
+
+def shared_model(model_id: str) -> "Gemini":
+    """
+    One ADK Gemini model object per model id. Agents that share it also share
+    its API client (ADK keeps one per event loop) instead of each agent
+    resolving its own.
+    """
+    from google.adk.models.google_llm import Gemini
+
+    with _lock:
+        model = _models.get(model_id)
+        if model is None:
+            model = _models[model_id] = Gemini(model=model_id)
+        return model
+
+
+def share_agent_models(agent_list) -> None:
+    for _agent in agent_list:
+        if isinstance(_agent.model, str) and _agent.model:
+            _agent.model = shared_model(_agent.model)
+
+
+def agent_model_id(agent) -> str:
+    """Model id of an agent whose `model` is either a string or a model object."""
+    model = getattr(agent, "model", "")
+    return model if isinstance(model, str) else getattr(model, "model", type(model).__name__)
@@ -0,0 +1,255 @@
+import bisect
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+Labels = Tuple[Tuple[str, str], ...]
+Sample = Tuple[str, Dict[str, str], float]
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120, 300)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072)
+
+# USD per million (input, output) tokens, matched by model id prefix
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gemini-2.5-pro": (1.25, 10.0),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.0-flash": (0.10, 0.40),
+}
+
+
+def token_cost(model_id: Optional[str], input_tokens: int, output_tokens: int) -> float:
+    """Estimated USD cost of one call; 0 for models without a known price."""
+    for prefix in sorted(MODEL_PRICES, key=len, reverse=True):
+        if model_id and model_id.startswith(prefix):
+            price_in, price_out = MODEL_PRICES[prefix]
+            return (input_tokens * price_in + output_tokens * price_out) / 1_000_000
+    return 0.0
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate by linear interpolation inside the bucket, like histogram_quantile()."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+
+def _key(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    pairs = [f'{k}="{_escape(v)}"' for k, v in labels]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class MetricsRegistry:
+    """
+    Process-wide counters and histograms keyed by metric name and labels,
+    rendered in the Prometheus text exposition format. Collectors registered
+    with `register_collector` add gauges computed at scrape time (e.g. the
+    rate limiter's state).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._buckets: Dict[str, Sequence[float]] = {}
+        self._help: Dict[str, str] = {}
+        self._collectors: Dict[str, Callable[[], Iterable[Sample]]] = {}
+
+    def describe(self, name: str, help_text: str, buckets: Optional[Sequence[float]] = None) -> None:
+        self._help[name] = help_text
+        if buckets is not None:
+            self._buckets[name] = buckets
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = _key(labels)
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            key = _key(labels)
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self._buckets.get(name, LATENCY_BUCKETS))
+            histogram.observe(value)
+
+    def register_collector(self, name: str, collector: Callable[[], Iterable[Sample]]) -> None:
+        """Add (or replace) a source of (metric, labels, value) gauge samples read at render time."""
+        self._collectors[name] = collector
+
+    def reset(self) -> None:
+        """Drop every recorded series; descriptions and collectors stay."""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def counter_value(self, name: str, **labels: str) -> float:
+        """Sum of a counter over every series matching `labels`."""
+        wanted = set(_key(labels))
+        with self._lock:
+            return sum(v for k, v in self._counters.get(name, {}).items() if wanted <= set(k))
+
+    def histogram(self, name: str, **labels: str) -> Histogram:
+        """Merge of every series of a histogram matching `labels`."""
+        wanted = set(_key(labels))
+        merged = Histogram(self._buckets.get(name, LATENCY_BUCKETS))
+        with self._lock:
+            for key, histogram in self._histograms.get(name, {}).items():
+                if wanted <= set(key):
+                    merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+                    merged.sum += histogram.sum
+                    merged.count += histogram.count
+        return merged
+
+    def label_values(self, name: str, label: str) -> List[str]:
+        with self._lock:
+            series = list(self._histograms.get(name, {})) + list(self._counters.get(name, {}))
+        return sorted({v for key in series for k, v in key if k == label})
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        with self._lock:
+            counters = {n: dict(s) for n, s in self._counters.items()}
+            histograms = {
+                n: {k: (list(h.counts), h.sum, h.count, h.buckets) for k, h in s.items()}
+                for n, s in self._histograms.items()
+            }
+        for name in sorted(counters):
+            lines += [f"# HELP {name} {self._help.get(name, name)}", f"# TYPE {name} counter"]
+            for key, value in sorted(counters[name].items()):
+                lines.append(f"{name}{_format_labels(key)} {value:g}")
+        for name in sorted(histograms):
+            lines += [f"# HELP {name} {self._help.get(name, name)}", f"# TYPE {name} histogram"]
+            for key, (counts, total, count, buckets) in sorted(histograms[name].items()):
+                cumulative = 0
+                for le, n in zip([f"{b:g}" for b in buckets] + ["+Inf"], counts):
+                    cumulative += n
+                    lines.append(f"{name}_bucket{_format_labels(key + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(key)} {total:g}")
+                lines.append(f"{name}_count{_format_labels(key)} {count}")
+        gauges: Dict[str, List[Tuple[Dict[str, str], float]]] = {}
+        for collector in list(self._collectors.values()):
+            try:
+                for name, labels, value in collector():
+                    gauges.setdefault(name, []).append((labels, value))
+            except Exception:
+                # a broken collector must not take the endpoint down
+                continue
+        for name in sorted(gauges):
+            lines += [f"# HELP {name} {self._help.get(name, name)}", f"# TYPE {name} gauge"]
+            for labels, value in gauges[name]:
+                lines.append(f"{name}{_format_labels(_key(labels))} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+metrics.describe("agent_latency_seconds", "Wall time of one agent call, retries included")
+metrics.describe("agent_ttft_seconds", "Time to the first streamed token of an agent call")
+metrics.describe("agent_queue_wait_seconds", "Time an agent call waited for the rate limiter before its first attempt")
+metrics.describe("agent_input_tokens", "Prompt tokens per agent call, from GenAI usage metadata", TOKEN_BUCKETS)
+metrics.describe("agent_output_tokens", "Output tokens per agent call, from GenAI usage metadata", TOKEN_BUCKETS)
+metrics.describe("agent_cost_usd_total", "Estimated spend from token usage and MODEL_PRICES")
+metrics.describe("agent_calls_total", "Agent calls by outcome (ok, error, cached)")
+metrics.describe("agent_tool_calls_total", "Tool calls requested by agents")
+metrics.describe("stage_latency_seconds", "Wall time of one pipeline stage")
+
+
+def agent_summary(registry: MetricsRegistry = metrics) -> List[Dict[str, float]]:
+    """Per-agent rows (calls, p50/p95 latency, p95 TTFT, tokens, cost, tools, cache hits), slowest p95 first."""
+    rows = []
+    for agent in registry.label_values("agent_calls_total", "agent"):
+        latency = registry.histogram("agent_latency_seconds", agent=agent)
+        rows.append(
+            {
+                "agent": agent,
+                "calls": registry.counter_value("agent_calls_total", agent=agent),
+                "cache_hits": registry.counter_value("agent_calls_total", agent=agent, outcome="cached"),
+                "errors": registry.counter_value("agent_calls_total", agent=agent, outcome="error"),
+                "p50_sec": round(latency.quantile(0.5), 2),
+                "p95_sec": round(latency.quantile(0.95), 2),
+                "ttft_p95_sec": round(registry.histogram("agent_ttft_seconds", agent=agent).quantile(0.95), 2),
+                "input_tokens": int(registry.histogram("agent_input_tokens", agent=agent).sum),
+                "output_tokens": int(registry.histogram("agent_output_tokens", agent=agent).sum),
+                "tool_calls": registry.counter_value("agent_tool_calls_total", agent=agent),
+                "cost_usd": round(registry.counter_value("agent_cost_usd_total", agent=agent), 4),
+            }
+        )
+    return sorted(rows, key=lambda r: r["p95_sec"], reverse=True)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry = metrics
+
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+
+def serve_metrics(port: Optional[int] = None, host: str = "127.0.0.1") -> Optional[int]:
+    """
+    Serve GET /metrics on a daemon thread; once per process. The port comes
+    from METRICS_PORT when not given, and 0 there disables the endpoint.
+    Returns the bound port, or None when disabled or the port is taken.
+    """
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return _server.server_address[1]
+        port = int(os.getenv("METRICS_PORT", "0")) if port is None else port
+        if not port:
+            return None
+        try:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError:
+            return None
+        threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+        return _server.server_address[1]
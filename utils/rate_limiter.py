@@ -0,0 +1,266 @@
+import asyncio
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from app_logging.logger import app_logger
+from utils.context_manager import count_tokens
+from utils.metrics import metrics
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+def estimate_tokens(text: str) -> int:
+    """Token estimate used for tokens-per-minute budgeting."""
+    return max(1, count_tokens(text))
+
+
+class TokenBucket:
+    """
+    Refills `rate_per_min` units per minute up to `capacity`; never blocks
+    itself. A rate of 0 means no limit.
+    """
+
+    def __init__(self, rate_per_min: float, capacity: Optional[float] = None) -> None:
+        self.rate_per_min = rate_per_min
+        self.capacity = capacity if capacity is not None else rate_per_min
+        self.available = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        if self.rate_per_min <= 0:
+            return
+        self.available = min(self.capacity, self.available + (now - self._updated) * self.rate_per_min / 60.0)
+        self._updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """
+        Take `amount` (going into debt if needed) and return how long the
+        caller must wait before the reservation is covered.
+        """
+        if self.rate_per_min <= 0:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        self.available -= amount
+        if self.available >= 0:
+            return 0.0
+        return -self.available * 60.0 / self.rate_per_min
+
+
+class RateLimiter:
+    """
+    Client-side limiter shared by every Gemini caller in the process.
+
+    Two token buckets cap requests and estimated tokens per minute. A 429
+    pauses all callers until its Retry-After has passed and halves the
+    request rate; each success restores it a little (AIMD) up to the
+    configured limit. A limit of 0 leaves that bucket unlimited; without a
+    request limit, a 429 only pauses callers for its Retry-After.
+    """
+
+    def __init__(self, requests_per_min: float = 0, tokens_per_min: float = 0, min_requests_per_min: float = 2) -> None:
+        self.max_requests_per_min = requests_per_min
+        self.min_requests_per_min = min_requests_per_min
+        self.requests = TokenBucket(requests_per_min)
+        self.tokens = TokenBucket(tokens_per_min)
+        self._lock = threading.Lock()
+        self._blocked_until = 0.0
+        self._counters = {
+            "acquired": 0,
+            "waited": 0,
+            "wait_sec": 0.0,
+            "throttled": 0,
+            "retries": 0,
+            "failures": 0,
+        }
+
+    def _reserve(self, est_tokens: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            wait = max(
+                self._blocked_until - now,
+                self.requests.reserve(1, now),
+                self.tokens.reserve(est_tokens, now),
+            )
+            self._counters["acquired"] += 1
+            if wait > 0:
+                self._counters["waited"] += 1
+                self._counters["wait_sec"] += wait
+            return wait
+
+    def acquire(self, est_tokens: int = 0) -> float:
+        wait = self._reserve(est_tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, est_tokens: int = 0) -> float:
+        wait = self._reserve(est_tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def on_success(self) -> None:
+        with self._lock:
+            rate = self.requests.rate_per_min
+            if rate < self.max_requests_per_min:
+                self.requests.rate_per_min = min(self.max_requests_per_min, rate * 1.05)
+
+    def on_throttled(self, retry_after: Optional[float]) -> None:
+        with self._lock:
+            self._counters["throttled"] += 1
+            if self.max_requests_per_min > 0:
+                self.requests.rate_per_min = max(self.min_requests_per_min, self.requests.rate_per_min / 2)
+            if retry_after:
+                self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            self.requests._refill(now)
+            self.tokens._refill(now)
+            return {
+                **self._counters,
+                "wait_sec": round(self._counters["wait_sec"], 3),
+                "requests_per_min": round(self.requests.rate_per_min, 2),
+                "requests_available": round(self.requests.available, 2),
+                "tokens_available": round(self.tokens.available),
+                "blocked_sec": round(max(0.0, self._blocked_until - now), 2),
+            }
+
+
+def status_code(exc: BaseException) -> Optional[int]:
+    for attr in ("code", "status_code", "status"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(exc, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """Seconds from a Retry-After header, or a RetryInfo `retryDelay` in the error body."""
+    headers = getattr(exc, "headers", None) or getattr(getattr(exc, "response", None), "headers", None)
+    if headers is not None:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                pass
+    match = re.search(r"retryDelay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s", str(getattr(exc, "details", "") or exc))
+    return float(match.group(1)) if match else None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    code = status_code(exc)
+    if code is not None:
+        return code in RETRYABLE_STATUS
+    return isinstance(exc, (ConnectionError, TimeoutError))
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, never shorter than the server's Retry-After."""
+
+    def __init__(self, max_attempts: int = 5, base_delay: float = 1.0, max_delay: float = 60.0) -> None:
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, exc: BaseException) -> float:
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        hinted = retry_after(exc)
+        return max(backoff, hinted) if hinted else backoff
+
+
+def _on_error(limiter: RateLimiter, policy: RetryPolicy, name: str, attempt: int, exc: BaseException) -> Optional[float]:
+    """Record a failed attempt; return the delay before retrying, or None to give up."""
+    if not is_retryable(exc) or attempt + 1 >= policy.max_attempts:
+        limiter.count("failures")
+        return None
+    if status_code(exc) == 429:
+        limiter.on_throttled(retry_after(exc))
+    limiter.count("retries")
+    delay = policy.delay(attempt, exc)
+    app_logger.log_event(
+        event_type="retry",
+        agent=name,
+        step="rate_limit",
+        message=f"Retrying after {type(exc).__name__}: {exc}",
+        duration_sec=delay,
+        extra={"attempt": attempt + 1, "status": status_code(exc), **limiter.metrics()},
+    )
+    return delay
+
+
+def call_with_retry(
+    fn: Callable[[], T],
+    name: str,
+    est_tokens: int = 0,
+    limiter: Optional[RateLimiter] = None,
+    policy: Optional[RetryPolicy] = None,
+) -> T:
+    limiter = limiter or gemini_limiter
+    policy = policy or default_retry_policy
+    attempt = 0
+    while True:
+        limiter.acquire(est_tokens)
+        try:
+            result = fn()
+        except Exception as exc:
+            delay = _on_error(limiter, policy, name, attempt, exc)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            attempt += 1
+            continue
+        limiter.on_success()
+        return result
+
+
+async def call_with_retry_async(
+    fn: Callable[[], Awaitable[T]],
+    name: str,
+    est_tokens: int = 0,
+    limiter: Optional[RateLimiter] = None,
+    policy: Optional[RetryPolicy] = None,
+) -> T:
+    limiter = limiter or gemini_limiter
+    policy = policy or default_retry_policy
+    attempt = 0
+    while True:
+        await limiter.acquire_async(est_tokens)
+        try:
+            result = await fn()
+        except Exception as exc:
+            delay = _on_error(limiter, policy, name, attempt, exc)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+        limiter.on_success()
+        return result
+
+
+# unlimited unless GEMINI_RPM / GEMINI_TPM are set, e.g. to the project's quota
+gemini_limiter = RateLimiter(
+    requests_per_min=float(os.getenv("GEMINI_RPM", "0")),
+    tokens_per_min=float(os.getenv("GEMINI_TPM", "0")),
+)
+default_retry_policy = RetryPolicy(max_attempts=int(os.getenv("GEMINI_MAX_ATTEMPTS", "5")))
+metrics.register_collector(
+    "gemini_limiter",
+    lambda: [(f"gemini_limiter_{name}", {}, value) for name, value in gemini_limiter.metrics().items()],
+)
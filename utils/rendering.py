@@ -0,0 +1,11 @@
+# Where a partially streamed frame may be cut so words are never split.
+BOUNDARIES = {"word": " ", "line": "\n", "paragraph": "\n\n"}
+
+
+def cut_frame(text: str, boundary: str = "word") -> str:
+    """
+    The part of a still-streaming text that is safe to draw: everything up
+    to its last `boundary`, so a frame never ends mid-word.
+    """
+    cut = text.rfind(BOUNDARIES[boundary])
+    return text[:cut] if cut > 0 else text